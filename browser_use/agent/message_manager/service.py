@@ -14,16 +14,21 @@ from pydantic import BaseModel
 from browser_use.agent.message_manager.views import MessageMetadata
 from browser_use.agent.prompts import AgentMessagePrompt
 from browser_use.agent.views import ActionResult, AgentOutput, AgentStepInfo, MessageManagerState
+from browser_use.browser.screenshot import image_size
 from browser_use.browser.views import BrowserState
 from browser_use.utils import time_execution_sync
 
 logger = logging.getLogger(__name__)
 
+# Size of the screenshot image_tokens is the cost of. Smaller images (e.g. with screenshot_max_size) count in proportion
+# to their pixels, larger ones (e.g. at a device pixel ratio of 2) count as image_tokens like any screenshot
+IMAGE_TOKENS_REFERENCE_SIZE = (1280, 1100)
+
 
 class MessageManagerSettings(BaseModel):
 	max_input_tokens: int = 128000
 	estimated_characters_per_token: int = 3
-	image_tokens: int = 800
+	image_tokens: int = 800  # of a screenshot, ones downscaled below 1280x1100 count less
 	include_attributes: list[str] = []
 	message_context: str | None = None
 	sensitive_data: dict[str, str] | None = None
@@ -246,7 +251,7 @@ class MessageManager:
 		if isinstance(message.content, list):
 			for item in message.content:
 				if 'image_url' in item:
-					tokens += self.settings.image_tokens
+					tokens += self._count_image_tokens(item)
 				elif isinstance(item, dict) and 'text' in item:
 					tokens += self._count_text_tokens(item['text'])
 		else:
@@ -256,6 +261,18 @@ class MessageManager:
 			tokens += self._count_text_tokens(msg)
 		return tokens
 
+	def _count_image_tokens(self, item: dict) -> int:
+		"""Tokens of an image, less than image_tokens if the size in the header of a base64 data url is below the reference"""
+		image_url = item['image_url']
+		url = image_url.get('url', '') if isinstance(image_url, dict) else image_url
+		size = image_size(url.partition('base64,')[2]) if 'base64,' in url else None
+		if size is None:
+			return self.settings.image_tokens
+		width, height = size
+		reference_width, reference_height = IMAGE_TOKENS_REFERENCE_SIZE
+		scale = min(width * height / (reference_width * reference_height), 1)
+		return max(1, round(self.settings.image_tokens * scale))
+
 	def _count_text_tokens(self, text: str) -> int:
 		"""Count tokens in a text string"""
 		tokens = len(text) // self.settings.estimated_characters_per_token  # Rough estimate if no tokenizer available
@@ -275,11 +292,12 @@ class MessageManager:
 			for item in msg.message.content:
 				if 'image_url' in item:
 					msg.message.content.remove(item)
-					diff -= self.settings.image_tokens
-					msg.metadata.tokens -= self.settings.image_tokens
-					self.state.history.current_tokens -= self.settings.image_tokens
+					image_tokens = self._count_image_tokens(item)
+					diff -= image_tokens
+					msg.metadata.tokens -= image_tokens
+					self.state.history.current_tokens -= image_tokens
 					logger.debug(
-						f'Removed image with {self.settings.image_tokens} tokens - total tokens now: {self.state.history.current_tokens}/{self.settings.max_input_tokens}'
+						f'Removed image with {image_tokens} tokens - total tokens now: {self.state.history.current_tokens}/{self.settings.max_input_tokens}'
 					)
 				elif 'text' in item and isinstance(item, dict):
 					text += item['text']
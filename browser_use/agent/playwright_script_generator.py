@@ -341,8 +341,8 @@ class PlaywrightScriptGenerator:
 			script_lines.extend(
 				[
 					f'            print(f"Attempting to close tab with page_id {page_id} ({step_info_str})")',
-					f'            if {page_id} < len(context.pages):',
-					f'                target_page = context.pages[{page_id}]',
+					f'            target_page = tabs.page({page_id})',
+					'            if target_page:',
 					'                await target_page.close()',
 					'                await page.wait_for_timeout(500)',
 					'                if context.pages: page = context.pages[-1]',  # Switch to last page
@@ -365,8 +365,9 @@ class PlaywrightScriptGenerator:
 			script_lines.extend(
 				[
 					f'            print(f"Switching to tab with page_id {page_id} ({step_info_str})")',
-					f'            if {page_id} < len(context.pages):',
-					f'                page = context.pages[{page_id}]',
+					f'            target_page = tabs.page({page_id})',
+					'            if target_page:',
+					'                page = target_page',
 					'                await page.bring_to_front()',
 					"                await page.wait_for_load_state('load', timeout=15000)",
 					'                await page.wait_for_timeout(500)',
@@ -625,6 +626,8 @@ class PlaywrightScriptGenerator:
 
 		script_lines.extend(
 			[
+				'            # Tab ids of the actions, given out as the tabs open',
+				'            tabs = TabIds(context)',
 				'            # Initial page handling',
 				'            if context.pages:',
 				'                page = context.pages[0]',
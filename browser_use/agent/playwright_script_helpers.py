@@ -1,4 +1,6 @@
-from patchright.async_api import Page
+import itertools
+
+from patchright.async_api import BrowserContext, Page
 
 
 # --- Helper Function for Replacing Sensitive Data ---
@@ -12,6 +14,27 @@ def replace_sensitive_data(text: str, sensitive_map: dict) -> str:
 	return text
 
 
+# --- Helper Class for Tab Ids ---
+class TabIds:
+	"""Ids of the open tabs like the agent gives them out: in the order the tabs open, never reused for a later tab."""
+
+	def __init__(self, context: BrowserContext):
+		self._page_ids = itertools.count()
+		self.pages: dict[int, Page] = {}
+		for page in context.pages:
+			self.register(page)
+		context.on('page', self.register)
+
+	def register(self, page: Page) -> None:
+		if page not in self.pages.values():
+			self.pages[next(self._page_ids)] = page
+
+	def page(self, page_id: int) -> Page | None:
+		"""The open tab with the id, None if it was closed or never opened"""
+		page = self.pages.get(page_id)
+		return page if page is not None and not page.is_closed() else None
+
+
 # --- Helper Function for Robust Action Execution ---
 class PlaywrightActionError(Exception):
 	"""Custom exception for errors during Playwright script action execution."""
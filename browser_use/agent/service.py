@@ -444,7 +444,10 @@ class Agent(Generic[Context]):
 		tokens = 0
 
 		try:
-			state = await self.browser_context.get_state(cache_clickable_elements_hashes=True)
+			# The screenshot is only taken if the LLM sees it or the GIF shows it
+			state = await self.browser_context.get_state(
+				cache_clickable_elements_hashes=True, screenshot=self.settings.use_vision or bool(self.settings.generate_gif)
+			)
 			current_page = await self.browser_context.get_current_page()
 
 			# generate procedural memory if needed
@@ -977,7 +980,7 @@ class Agent(Generic[Context]):
 
 		for i, action in enumerate(actions):
 			if action.get_index() is not None and i != 0:
-				new_state = await self.browser_context.get_state(cache_clickable_elements_hashes=False)
+				new_state = await self.browser_context.get_state(cache_clickable_elements_hashes=False, screenshot=False)
 				new_selector_map = new_state.selector_map
 
 				# Detect index change after previous action
@@ -1017,7 +1020,7 @@ class Agent(Generic[Context]):
 				if results[-1].is_done or results[-1].error or i == len(actions) - 1:
 					break
 
-				await asyncio.sleep(self.browser_context.config.wait_between_actions)
+				await self.browser_context.wait_until_settled(self.browser_context.config.wait_between_actions)
 				# hash all elements. if it is a subset of cached_state its fine - else break (new elements on page)
 
 			except asyncio.CancelledError:
@@ -1044,7 +1047,9 @@ class Agent(Generic[Context]):
 		)
 
 		if self.browser_context.session:
-			state = await self.browser_context.get_state(cache_clickable_elements_hashes=False)
+			state = await self.browser_context.get_state(
+				cache_clickable_elements_hashes=False, screenshot=self.settings.use_vision
+			)
 			content = AgentMessagePrompt(
 				state=state,
 				result=self.state.last_result,
@@ -1154,7 +1159,7 @@ class Agent(Generic[Context]):
 
 	async def _execute_history_step(self, history_item: AgentHistory, delay: float) -> list[ActionResult]:
 		"""Execute a single step from history with element validation"""
-		state = await self.browser_context.get_state(cache_clickable_elements_hashes=False)
+		state = await self.browser_context.get_state(cache_clickable_elements_hashes=False, screenshot=False)
 		if not state or not history_item.model_output:
 			raise ValueError('Invalid state or model output')
 		updated_actions = []
@@ -12,10 +12,9 @@ import re
 import time
 import uuid
 from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal
 
 import anyio
-from patchright._impl._errors import TimeoutError
 from patchright.async_api import Browser as PlaywrightBrowser
 from patchright.async_api import (
 	BrowserContext as PlaywrightBrowserContext,
@@ -27,6 +26,13 @@ from patchright.async_api import (
 )
 from pydantic import BaseModel, ConfigDict, Field
 
+from browser_use.browser.downloads import DOWNLOAD_IDLE_TIME, DOWNLOAD_START_TIMEOUT, DOWNLOADS_CLOSE_TIMEOUT, DownloadManager
+from browser_use.browser.handles import ElementHandleCache
+from browser_use.browser.network import NetworkTracker
+from browser_use.browser.screencast import Screencast
+from browser_use.browser.tabs import TabRegistry
+from browser_use.browser.targets import TargetRegistry
+from browser_use.browser.timing import PageLoadProfiles, PageLoadTiming
 from browser_use.browser.views import (
 	BrowserError,
 	BrowserState,
@@ -34,6 +40,7 @@ from browser_use.browser.views import (
 	URLNotAllowedError,
 )
 from browser_use.dom.clickable_element_processor.service import ClickableElementProcessor
+from browser_use.dom.highlights import draw_highlights
 from browser_use.dom.service import DomService
 from browser_use.dom.views import DOMElementNode, SelectorMap
 from browser_use.utils import time_execution_async, time_execution_sync
@@ -51,6 +58,69 @@ BROWSER_NAVBAR_HEIGHT = {
 	'linux': 90,
 }.get(platform.system().lower(), 85)
 
+# Resolves once the document had no DOM mutations for quietMs and runs no finite animations, checked every animation
+# frame (every 50 ms in background tabs, where frames are paused). The MutationObserver stays installed on the
+# document, so a page that is already settled resolves on the first check. Mutations of the highlight overlays are
+# not page activity. Returns whether the page settled within maxWait.
+WAIT_UNTIL_SETTLED_JS = """
+async ({ quietMs, maxWait, scroll }) => {
+	const start = performance.now();
+	let settle = window.__browserUseSettle;
+	if (!settle || settle.root !== document.documentElement) {
+		settle = window.__browserUseSettle = { root: document.documentElement, lastMutation: start, lastScroll: start };
+		// Scrolling of the window and of scroll containers, a smooth scroll fires one per frame
+		window.addEventListener('scroll', () => { settle.lastScroll = performance.now(); }, { capture: true, passive: true });
+		const isOverlay = (node) => {
+			const element = node.nodeType === Node.ELEMENT_NODE ? node : node.parentElement;
+			return !!(element && element.closest('#playwright-highlight-container'));
+		};
+		settle.observer = new MutationObserver((records) => {
+			if (records.some((record) => !isOverlay(record.target))) {
+				settle.lastMutation = performance.now();
+			}
+		});
+		settle.observer.observe(document.documentElement, {
+			subtree: true,
+			childList: true,
+			attributes: true,
+			characterData: true,
+		});
+	}
+
+	const isAnimating = () => {
+		if (!document.getAnimations) return false;
+		return document.getAnimations().some((animation) => {
+			if (animation.playState !== 'running') return false;
+			const timing = animation.effect && animation.effect.getComputedTiming();
+			return !!timing && timing.iterations !== Infinity;  // spinners never stop
+		});
+	};
+	const nextFrame = () => new Promise((resolve) => {
+		const timer = setTimeout(resolve, 50);
+		requestAnimationFrame(() => {
+			clearTimeout(timer);
+			resolve();
+		});
+	});
+
+	// With scroll, the page also has to stop scrolling. A smooth scroll that was just started moves from the next
+	// frame on, so the position is compared from frame to frame, starting with the next one.
+	let position = scroll ? [window.scrollX, window.scrollY] : null;
+	if (scroll) await nextFrame();
+	while (true) {
+		const now = performance.now();
+		let scrolling = false;
+		if (scroll) {
+			scrolling = window.scrollX !== position[0] || window.scrollY !== position[1] || now - settle.lastScroll < quietMs;
+			position = [window.scrollX, window.scrollY];
+		}
+		if (!scrolling && now - settle.lastMutation >= quietMs && !isAnimating()) return true;
+		if (now - start >= maxWait) return false;
+		await nextFrame();
+	}
+}
+"""
+
 
 class BrowserContextConfig(BaseModel):
 	"""
@@ -64,7 +134,8 @@ class BrowserContextConfig(BaseModel):
 			Disable browser security features (dangerous, but cross-origin iframe support requires it)
 
 	    minimum_wait_page_load_time: 0.5
-	        Minimum time to wait before getting page state for LLM input
+	        Time the page gets to settle (no DOM mutations or animations) before getting page state for LLM input,
+	        counted from the start of the page load. A page that is already settled is not waited on.
 
 		wait_for_network_idle_page_load_time: 1.0
 			Time to wait for network requests to finish before getting page state.
@@ -73,8 +144,31 @@ class BrowserContextConfig(BaseModel):
 	    maximum_wait_page_load_time: 5.0
 	        Maximum time to wait for page load before proceeding anyway
 
+	    adaptive_page_load_timing: False
+	        Learn how long the pages of each domain and route take to become stable, and size the three waits above
+	        from it (see browser_use.browser.timing). The values above are used until a route or domain is profiled.
+
+	    page_load_profiles_file: None
+	        Path to a file the page load profiles are kept in, so they survive restarts
+
 	    wait_between_actions: 1.0
-	        Time to wait between multiple per step actions
+	        Maximum time to wait for the page to settle between multiple per step actions
+
+	    screenshot_format: 'png'
+	        Format of the screenshots: 'png', 'jpeg' or 'webp'. JPEG and WebP are several times smaller.
+
+	    screenshot_quality: None
+	        Quality (0-100) of JPEG and WebP screenshots, the browser's default if None
+
+	    screenshot_max_size: None
+	        Longest edge of the screenshots in pixels, larger ones are scaled down by the browser (e.g. 1024).
+	        Screenshots below 1280x1100 count as fewer image tokens when the agent trims its messages.
+
+	    screencast_screenshots: False
+	        Stream the agent's page with a CDP screencast and use its latest frame as the screenshot, instead of
+	        capturing one per step. Cheap screenshots for every step, e.g. for GIF recordings of the history.
+	        Frames are JPEG unless screenshot_format is 'png'. After highlights were drawn, only a frame that arrives
+	        after them is used, otherwise the page is captured.
 
 	    window_width: 1280
 	    window_height: 1100
@@ -88,7 +182,8 @@ class BrowserContextConfig(BaseModel):
 	        Path to save video recordings
 
 	    save_downloads_path: None
-	        Path to save downloads to
+	        Path to save downloads to. Downloads of all tabs are saved in the background as soon as they start, a click
+	        reports the download it started without waiting for one when it started none.
 
 	    trace_path: None
 	        Path to save trace files. It will auto name the file with the TRACE_PATH/{context_id}.zip
@@ -102,9 +197,37 @@ class BrowserContextConfig(BaseModel):
 	    highlight_elements: True
 	        Highlight elements in the DOM on the screen
 
+	    composite_highlights: False
+	        Draw the highlights onto the screenshot in Python (in a worker thread, needs Pillow) instead of injecting overlays into the page. The page is never modified and the screenshot is taken while the DOM is extracted, except with cross_origin_iframes, whose frames still get overlays: then the screenshot waits for the extraction.
+
 	    viewport_expansion: 0
 	        Viewport expansion in pixels. This amount will increase the number of elements which are included in the state what the LLM will see. If set to -1, all elements will be included (this leads to high token usage). If set to 0, only the elements which are visible in the viewport will be included.
 
+	    incremental_dom_extraction: False
+	        Keep a MutationObserver in the page and only re-walk the subtrees that changed since the last step, splicing them into a copy of the previous DOM tree. Scrolling, resizing, new positioned elements (overlays, dialogs) or large changes fall back to a full walk.
+
+	    compact_dom_payload: False
+	        Let buildDomTree.js return its result as one JSON string of parallel arrays with interned strings instead of one object per node. Cuts transfer and decode time on large pages, and the returned tree is array-backed, so it needs much less memory.
+
+	    spatial_hit_testing: False
+	        Resolve which elements are on top (not covered by others) for all elements at once from a grid of their rects, and only hit-test the overlapping ones. Much fewer layout queries on large pages, compare both modes with debug logging (PERF_METRICS).
+
+	    streaming_dom_extraction: False
+	        Walk the DOM in short time slices, yielding the main thread to the page in between, and build the tree from the chunks while the walk goes on. Keeps heavy pages responsive during extraction. Not combined with incremental_dom_extraction.
+
+	    dom_extraction_max_nodes: None
+	        With streaming_dom_extraction, stop the walk after this many nodes. The tree is truncated, elements further down the page are missing.
+
+	    dom_extraction_max_time: None
+	        With streaming_dom_extraction, stop the walk after this many seconds. The tree is truncated, elements further down the page are missing.
+
+	    cross_origin_iframes: False
+	        Also extract the content of visible cross-origin iframes (payment forms, SSO widgets), which the page itself cannot look into. The frames are extracted concurrently with the page and get highlight indices after the page's own elements. Not combined with incremental_dom_extraction, compact_dom_payload or streaming_dom_extraction: with those the frames are skipped.
+
+	    dom_extraction_engine: 'js'
+	        'js' walks the page with buildDomTree.js. 'snapshot' builds the DOM tree from a single CDP DOMSnapshot.captureSnapshot (computed styles, layout boxes and paint order of the whole page) in Python, much faster on big pages. Chromium only, falls back to 'js' otherwise. The options above that tune the buildDomTree.js walk do not apply to it.
+	        'accessibility' builds it from Chrome's accessibility tree (roles, names, values and states, no layout) for agents with use_vision=False: the whole document is listed and no highlights are drawn, a cheaper and shorter state for form-heavy pages. Chromium only, falls back to 'js' otherwise.
+
 	    allowed_domains: None
 	        List of allowed domains that can be accessed. If None, all domains are allowed.
 	        Example: ['example.com', 'api.example.com']
@@ -112,6 +235,11 @@ class BrowserContextConfig(BaseModel):
 	    include_dynamic_attributes: bool = True
 	        Include dynamic attributes in the CSS selector. If you want to reuse the css_selectors, it might be better to set this to False.
 
+	    coordinate_clicks: False
+	        Click elements that were top-most and in the viewport at the centre of their extracted box with the mouse, after
+	        one elementFromPoint check that the element is still there, instead of locating the element first. Other
+	        elements, and elements that moved, are clicked the usual way.
+
 		  http_credentials: None
 	  Dictionary with HTTP basic authentication credentials for corporate intranets (only supports one set of credentials for all URLs at the moment), e.g.
 	  {"username": "bill", "password": "pa55w0rd"}
@@ -150,6 +278,13 @@ class BrowserContextConfig(BaseModel):
 	maximum_wait_page_load_time: float = 5
 	wait_between_actions: float = 0.5
 
+	screenshot_format: Literal['png', 'jpeg', 'webp'] = 'png'
+	screenshot_quality: int | None = None
+	screenshot_max_size: int | None = None
+	screencast_screenshots: bool = False
+	adaptive_page_load_timing: bool = False
+	page_load_profiles_file: str | None = None
+
 	disable_security: bool = False  # disable_security=True is dangerous as any malicious URL visited could embed an iframe for the user's bank, and use their cookies to steal money
 
 	window_width: int = 1280
@@ -164,9 +299,19 @@ class BrowserContextConfig(BaseModel):
 	user_agent: str | None = None
 
 	highlight_elements: bool = True
+	composite_highlights: bool = False
 	viewport_expansion: int = 0
+	incremental_dom_extraction: bool = False
+	compact_dom_payload: bool = False
+	spatial_hit_testing: bool = False
+	streaming_dom_extraction: bool = False
+	dom_extraction_max_nodes: int | None = None
+	dom_extraction_max_time: float | None = None
+	cross_origin_iframes: bool = False
+	dom_extraction_engine: Literal['js', 'snapshot', 'accessibility'] = 'js'
 	allowed_domains: list[str] | None = None
 	include_dynamic_attributes: bool = True
+	coordinate_clicks: bool = False
 	http_credentials: dict[str, str] | None = None
 
 	keep_alive: bool = Field(default=False, alias='_force_keep_context_alive')  # used to be called _force_keep_context_alive
@@ -232,6 +377,28 @@ class BrowserContext:
 		self.agent_current_page: Page | None = None  # The tab the agent intends to interact with
 		self.human_current_page: Page | None = None  # The tab currently shown in the browser UI
 
+		# One DomService per tab, so state kept between steps (e.g. for incremental extraction) stays paired with its page
+		self._dom_services: dict[Page, DomService] = {}
+		# One NetworkTracker per tab, it sees the requests of the page between steps as well
+		self._network_trackers: dict[Page, NetworkTracker] = {}
+		# The screencast of the agent's page, with screencast_screenshots
+		self._screencasts: dict[Page, Screencast] = {}
+		# Ids, urls and titles of the open tabs
+		self._tabs = TabRegistry()
+		# CDP target ids of the tabs, with cdp_url
+		self._targets = TargetRegistry()
+		# Handles of the elements of the current state (metrics() counts lookups and disposals)
+		self.element_handles = ElementHandleCache()
+		# Downloads of all tabs, saved to save_downloads_path in the background
+		self._downloads: DownloadManager | None = None
+		if self.config.save_downloads_path:
+			self._downloads = DownloadManager(self.config.save_downloads_path)
+
+		# Observed page load times, with adaptive_page_load_timing (metrics() lists them per domain and route)
+		self.page_load_profiles: PageLoadProfiles | None = None
+		if self.config.adaptive_page_load_timing:
+			self.page_load_profiles = PageLoadProfiles()
+
 	async def __aenter__(self):
 		"""Async context manager entry"""
 		await self._initialize_session()
@@ -258,7 +425,12 @@ class BrowserContext:
 					logger.debug(f'Failed to remove CDP listener: {e}')
 				self._page_event_handler = None
 
+			await self.element_handles.invalidate()
+			await self._targets.stop()
+			if self._downloads is not None:
+				await self._downloads.wait(DOWNLOADS_CLOSE_TIMEOUT)
 			await self.save_cookies()
+			await self.save_page_load_profiles()
 
 			if self.config.trace_path:
 				try:
@@ -279,6 +451,10 @@ class BrowserContext:
 			self.agent_current_page = None
 			self.human_current_page = None
 			self.session = None
+			self._dom_services = {}
+			self._network_trackers = {}
+			self._screencasts = {}
+			self._tabs = TabRegistry()
 			self._page_event_handler = None
 
 	def __del__(self):
@@ -308,6 +484,12 @@ class BrowserContext:
 
 		# auto-attach the foregrounding-detection listener to all new pages opened
 		context.on('page', self._add_tab_foregrounding_listener)
+		# new tabs get their id when they open, the ones open already when the tabs are listed first
+		context.on('page', lambda page: self._tabs.register(page))
+		if self._downloads is not None:
+			context.on('page', self._downloads.register)
+			for page in context.pages:
+				self._downloads.register(page)
 
 		# Get or create a page to use
 		pages = context.pages
@@ -319,17 +501,13 @@ class BrowserContext:
 
 		current_page = None
 		if self.browser.config.cdp_url:
+			try:
+				await self._targets.start(playwright_browser)
+			except Exception as e:
+				logger.debug(f'Failed to start the CDP target registry: {e}')
 			# If we have a saved target ID, try to find and activate it
 			if self.state.target_id:
-				targets = await self._get_cdp_targets()
-				for target in targets:
-					if target['targetId'] == self.state.target_id:
-						# Find matching page by URL
-						for page in pages:
-							if page.url == target['url']:
-								current_page = page
-								break
-						break
+				current_page = await self._targets.page(self.state.target_id, pages)
 
 		# If no target ID or couldn't find it, use existing page or create new
 		if not current_page:
@@ -348,11 +526,7 @@ class BrowserContext:
 
 			# Get target ID for the active page
 			if self.browser.config.cdp_url:
-				targets = await self._get_cdp_targets()
-				for target in targets:
-					if target['url'] == current_page.url:
-						self.state.target_id = target['targetId']
-						break
+				self.state.target_id = await self._targets.target_id(current_page)
 
 		# Bring page to front
 		logger.debug('🫨  Bringing tab to front: %s', current_page)
@@ -667,6 +841,8 @@ class BrowserContext:
 				except json.JSONDecodeError as e:
 					logger.error(f'Failed to parse cookies file: {str(e)}')
 
+		await self.load_page_load_profiles()
+
 		init_script = """
 			// Permissions
 			const originalQuery = window.navigator.permissions.query;
@@ -733,174 +909,38 @@ class BrowserContext:
 		except Exception as e:
 			logger.debug(f'Failed to set viewport size for page: {e}')
 
-	async def _wait_for_stable_network(self):
+	async def _wait_for_stable_network(self, timing: PageLoadTiming | None = None) -> bool | None:
+		"""Returns whether the network became idle, None if it cannot be tracked"""
+		timing = timing or self._default_page_load_timing()
 		page = await self.get_agent_current_page()
+		tracker = await self._get_network_tracker(page)
+		if tracker is None:
+			return None
 
-		pending_requests = set()
-		last_activity = asyncio.get_event_loop().time()
-
-		# Define relevant resource types and content types
-		RELEVANT_RESOURCE_TYPES = {
-			'document',
-			'stylesheet',
-			'image',
-			'font',
-			'script',
-			'iframe',
-		}
-
-		RELEVANT_CONTENT_TYPES = {
-			'text/html',
-			'text/css',
-			'application/javascript',
-			'image/',
-			'font/',
-			'application/json',
-		}
-
-		# Additional patterns to filter out
-		IGNORED_URL_PATTERNS = {
-			# Analytics and tracking
-			'analytics',
-			'tracking',
-			'telemetry',
-			'beacon',
-			'metrics',
-			# Ad-related
-			'doubleclick',
-			'adsystem',
-			'adserver',
-			'advertising',
-			# Social media widgets
-			'facebook.com/plugins',
-			'platform.twitter',
-			'linkedin.com/embed',
-			# Live chat and support
-			'livechat',
-			'zendesk',
-			'intercom',
-			'crisp.chat',
-			'hotjar',
-			# Push notifications
-			'push-notifications',
-			'onesignal',
-			'pushwoosh',
-			# Background sync/heartbeat
-			'heartbeat',
-			'ping',
-			'alive',
-			# WebRTC and streaming
-			'webrtc',
-			'rtmp://',
-			'wss://',
-			# Common CDNs for dynamic content
-			'cloudfront.net',
-			'fastly.net',
-		}
-
-		async def on_request(request):
-			# Filter by resource type
-			if request.resource_type not in RELEVANT_RESOURCE_TYPES:
-				return
-
-			# Filter out streaming, websocket, and other real-time requests
-			if request.resource_type in {
-				'websocket',
-				'media',
-				'eventsource',
-				'manifest',
-				'other',
-			}:
-				return
-
-			# Filter out by URL patterns
-			url = request.url.lower()
-			if any(pattern in url for pattern in IGNORED_URL_PATTERNS):
-				return
-
-			# Filter out data URLs and blob URLs
-			if url.startswith(('data:', 'blob:')):
-				return
-
-			# Filter out requests with certain headers
-			headers = request.headers
-			if headers.get('purpose') == 'prefetch' or headers.get('sec-fetch-dest') in [
-				'video',
-				'audio',
-			]:
-				return
-
-			nonlocal last_activity
-			pending_requests.add(request)
-			last_activity = asyncio.get_event_loop().time()
-			# logger.debug(f'Request started: {request.url} ({request.resource_type})')
-
-		async def on_response(response):
-			request = response.request
-			if request not in pending_requests:
-				return
-
-			# Filter by content type if available
-			content_type = response.headers.get('content-type', '').lower()
-
-			# Skip if content type indicates streaming or real-time data
-			if any(
-				t in content_type
-				for t in [
-					'streaming',
-					'video',
-					'audio',
-					'webm',
-					'mp4',
-					'event-stream',
-					'websocket',
-					'protobuf',
-				]
-			):
-				pending_requests.remove(request)
-				return
-
-			# Only process relevant content types
-			if not any(ct in content_type for ct in RELEVANT_CONTENT_TYPES):
-				pending_requests.remove(request)
-				return
-
-			# Skip if response is too large (likely not essential for page load)
-			content_length = response.headers.get('content-length')
-			if content_length and int(content_length) > 5 * 1024 * 1024:  # 5MB
-				pending_requests.remove(request)
-				return
-
-			nonlocal last_activity
-			pending_requests.remove(request)
-			last_activity = asyncio.get_event_loop().time()
-			# logger.debug(f'Request resolved: {request.url} ({content_type})')
-
-		# Attach event listeners
-		page.on('request', on_request)
-		page.on('response', on_response)
-
-		try:
-			# Wait for idle time
-			start_time = asyncio.get_event_loop().time()
-			while True:
-				await asyncio.sleep(0.1)
-				now = asyncio.get_event_loop().time()
-				if len(pending_requests) == 0 and (now - last_activity) >= self.config.wait_for_network_idle_page_load_time:
-					break
-				if now - start_time > self.config.maximum_wait_page_load_time:
-					logger.debug(
-						f'Network timeout after {self.config.maximum_wait_page_load_time}s with {len(pending_requests)} '
-						f'pending requests: {[r.url for r in pending_requests]}'
-					)
-					break
+		settled = await tracker.wait_for_idle(timing.wait_for_network_idle_page_load_time, timing.maximum_wait_page_load_time)
+		if not settled:
+			logger.debug(
+				f'Network timeout after {timing.maximum_wait_page_load_time:.2f}s with {len(tracker.pending)} '
+				f'pending requests: {[url for url, _ in tracker.pending.values()]}'
+			)
+			return False
 
-		finally:
-			# Clean up event listeners
-			page.remove_listener('request', on_request)
-			page.remove_listener('response', on_response)
+		logger.debug(f'⚖️  Network stabilized for {timing.wait_for_network_idle_page_load_time:.2f} seconds')
+		return True
 
-		logger.debug(f'⚖️  Network stabilized for {self.config.wait_for_network_idle_page_load_time} seconds')
+	async def _get_network_tracker(self, page: Page) -> NetworkTracker | None:
+		"""Get the NetworkTracker for a page, started on first use and kept until the page closes"""
+		tracker = self._network_trackers.get(page)
+		if tracker is None:
+			self._network_trackers = {p: t for p, t in self._network_trackers.items() if not p.is_closed()}
+			tracker = NetworkTracker(page)
+			try:
+				await tracker.start()
+			except Exception as e:
+				logger.debug(f'Network tracking is not available for {page.url}: {e}')
+				return None
+			self._network_trackers[page] = tracker
+		return tracker
 
 	async def _wait_for_page_and_frames_load(self, timeout_overwrite: float | None = None):
 		"""
@@ -910,10 +950,12 @@ class BrowserContext:
 		"""
 		# Start timing
 		start_time = time.time()
+		timing = await self._page_load_timing()
 
 		# Wait for page load
+		network_idle = None
 		try:
-			await self._wait_for_stable_network()
+			network_idle = await self._wait_for_stable_network(timing)
 
 			# Check if the loaded URL is allowed
 			page = await self.get_agent_current_page()
@@ -924,15 +966,100 @@ class BrowserContext:
 			logger.warning('⚠️  Page load failed, continuing...')
 			pass
 
-		# Calculate remaining time to meet minimum WAIT_TIME
+		# Give the page the rest of the minimum wait time to settle, a settled page does not wait
 		elapsed = time.time() - start_time
-		remaining = max((timeout_overwrite or self.config.minimum_wait_page_load_time) - elapsed, 0)
+		remaining = max((timeout_overwrite or timing.minimum_wait_page_load_time) - elapsed, 0)
 
-		logger.debug(f'--Page loaded in {elapsed:.2f} seconds, waiting for additional {remaining:.2f} seconds')
+		logger.debug(f'--Page loaded in {elapsed:.2f} seconds, waiting up to {remaining:.2f} seconds for it to settle')
 
-		# Sleep remaining time if needed
+		dom_settled = True
 		if remaining > 0:
-			await asyncio.sleep(remaining)
+			dom_settled = await self.wait_until_settled(remaining)
+
+		if self.page_load_profiles is not None and network_idle is not None:
+			# The idle window is waited on by every load, it is not part of the time the page needed
+			stable = network_idle and dom_settled
+			waited = time.time() - start_time
+			observed = waited - timing.wait_for_network_idle_page_load_time if stable else waited
+			page = await self.get_agent_current_page()
+			self.page_load_profiles.record(page.url, max(observed, 0), timed_out=not stable)
+
+	def _default_page_load_timing(self) -> PageLoadTiming:
+		return PageLoadTiming(
+			minimum_wait_page_load_time=self.config.minimum_wait_page_load_time,
+			wait_for_network_idle_page_load_time=self.config.wait_for_network_idle_page_load_time,
+			maximum_wait_page_load_time=self.config.maximum_wait_page_load_time,
+		)
+
+	async def _page_load_timing(self) -> PageLoadTiming:
+		"""The waits for a load of the current page, from its profile with adaptive_page_load_timing"""
+		default = self._default_page_load_timing()
+		if self.page_load_profiles is None:
+			return default
+		page = await self.get_agent_current_page()
+		timing = self.page_load_profiles.timing(page.url, default)
+		if timing is not default:
+			logger.debug(
+				f'Page load profile of {page.url}: minimum {timing.minimum_wait_page_load_time:.2f}s, network idle '
+				f'{timing.wait_for_network_idle_page_load_time:.2f}s, maximum {timing.maximum_wait_page_load_time:.2f}s'
+			)
+		return timing
+
+	async def load_page_load_profiles(self) -> None:
+		"""Load the page load profiles from page_load_profiles_file"""
+		if self.page_load_profiles is None or not self.config.page_load_profiles_file:
+			return
+		if not os.path.exists(self.config.page_load_profiles_file):
+			return
+		try:
+			async with await anyio.open_file(self.config.page_load_profiles_file, 'r') as f:
+				self.page_load_profiles = PageLoadProfiles.from_dict(json.loads(await f.read()))
+			logger.debug(
+				f'⏱️  Loaded {len(self.page_load_profiles.samples)} page load profiles from {self.config.page_load_profiles_file}'
+			)
+		except (OSError, ValueError, KeyError, TypeError) as e:
+			logger.warning(f'Failed to load page load profiles: {str(e)}')
+
+	async def save_page_load_profiles(self) -> None:
+		"""Save the page load profiles to page_load_profiles_file"""
+		if self.page_load_profiles is None or not self.config.page_load_profiles_file:
+			return
+		try:
+			dirname = os.path.dirname(self.config.page_load_profiles_file)
+			if dirname:
+				os.makedirs(dirname, exist_ok=True)
+
+			async with await anyio.open_file(self.config.page_load_profiles_file, 'w') as f:
+				await f.write(json.dumps(self.page_load_profiles.to_dict()))
+		except Exception as e:
+			logger.warning(f'❌  Failed to save page load profiles: {str(e)}')
+
+	async def wait_until_settled(self, max_wait: float | None = None, quiet_time: float = 0.1, scroll: bool = False) -> bool:
+		"""
+		Waits until the DOM of the current page had no mutations for quiet_time seconds and no (finite) animations
+		are running, at most max_wait seconds (default: wait_between_actions). Returns immediately if the page is
+		already settled. With scroll, the page also has to stop scrolling (e.g. after a smooth scroll was started),
+		which takes at least a frame.
+
+		Returns whether the page settled, False as well if it could not be checked (e.g. it navigated meanwhile).
+		"""
+		if max_wait is None:
+			max_wait = self.config.wait_between_actions
+		if max_wait <= 0:
+			return True
+
+		page = await self.get_agent_current_page()
+		try:
+			# Timers are throttled in background tabs, the page is not waited on for much longer than max_wait
+			return await asyncio.wait_for(
+				page.evaluate(
+					WAIT_UNTIL_SETTLED_JS, {'quietMs': quiet_time * 1000, 'maxWait': max_wait * 1000, 'scroll': scroll}
+				),
+				max_wait + 1,
+			)
+		except Exception as e:
+			logger.debug(f'Failed to wait for the page to settle: {type(e).__name__}: {e}')
+			return False
 
 	def _is_url_allowed(self, url: str) -> bool:
 		"""Check if a URL is allowed based on the whitelist configuration."""
@@ -1029,9 +1156,11 @@ class BrowserContext:
 		if is_foreground:
 			self.human_current_page = None
 
-		# Switch to the first available tab if any exist
-		if session.context.pages:
-			await self.switch_to_tab(0)
+		# Switch to the first available tab if any exist, tab ids are not positions in the pages list
+		self._tabs.sync(session.context.pages)
+		page_id = self._tabs.first_page_id()
+		if page_id is not None:
+			await self.switch_to_tab(page_id)
 			# switch_to_tab already updates both tab references
 
 		# Otherwise, the browser will be closed
@@ -1118,15 +1247,17 @@ class BrowserContext:
 		return structure
 
 	@time_execution_sync('--get_state')  # This decorator might need to be updated to handle async
-	async def get_state(self, cache_clickable_elements_hashes: bool) -> BrowserState:
+	async def get_state(self, cache_clickable_elements_hashes: bool, screenshot: bool = True) -> BrowserState:
 		"""Get the current state of the browser
 
 		cache_clickable_elements_hashes: bool
 			If True, cache the clickable elements hashes for the current state. This is used to calculate which elements are new to the llm (from last message) -> reduces token usage.
+		screenshot: bool
+			If False, no screenshot is taken (state.screenshot is None), e.g. for agents without vision.
 		"""
 		await self._wait_for_page_and_frames_load()
 		session = await self.get_session()
-		updated_state = await self._get_updated_state()
+		updated_state = await self._get_updated_state(screenshot=screenshot)
 
 		# Find out which elements are new
 		# Do this only if url has not changed
@@ -1150,6 +1281,7 @@ class BrowserContext:
 				hashes=ClickableElementProcessor.get_clickable_elements_hashes(updated_state.element_tree),
 			)
 
+		await self.element_handles.invalidate()
 		session.cached_state = updated_state
 
 		# Save cookies if a file is specified
@@ -1158,29 +1290,67 @@ class BrowserContext:
 
 		return session.cached_state
 
-	async def _get_updated_state(self, focus_element: int = -1) -> BrowserState:
+	async def _get_updated_state(self, focus_element: int = -1, screenshot: bool = True) -> BrowserState:
 		"""Update and return state."""
 		session = await self.get_session()
 
-		# Check if current page is still valid, if not switch to another available page
 		try:
 			page = await self.get_agent_current_page()
-			# Test if page is still accessible
-			await page.evaluate('1')
 		except Exception as e:
 			logger.debug(f'👋  Current page is no longer accessible: {str(e)}')
 			raise BrowserError('Browser closed: no valid pages available')
 
+		# Tab titles do not depend on the current page, collect them while it is processed
+		tabs_task = asyncio.create_task(self.get_tabs_info())
+
 		try:
-			await self.remove_highlights()
-			dom_service = DomService(page)
-			content = await dom_service.get_clickable_elements(
+			# Highlights removal, DOM tree, title and scroll position in a single evaluation
+			dom_service = self._get_dom_service(page)
+			composite_highlights = screenshot and self.config.highlight_elements and self.config.composite_highlights
+			page_state_task = dom_service.get_page_state(
 				focus_element=focus_element,
 				viewport_expansion=self.config.viewport_expansion,
 				highlight_elements=self.config.highlight_elements,
+				incremental=self.config.incremental_dom_extraction,
+				compact_payload=self.config.compact_dom_payload,
+				spatial_hit_testing=self.config.spatial_hit_testing,
+				stream=self.config.streaming_dom_extraction,
+				max_nodes=self.config.dom_extraction_max_nodes,
+				max_time=self.config.dom_extraction_max_time,
+				cross_origin_frames=self.config.cross_origin_iframes,
+				engine=self.config.dom_extraction_engine,
+				draw_highlights=not composite_highlights,
 			)
 
-			tabs_info = await self.get_tabs_info()
+			if not screenshot:
+				(content, page_info), tabs_info = await asyncio.gather(page_state_task, tabs_task)
+				screenshot_b64 = None
+			elif composite_highlights:
+				if self.config.cross_origin_iframes:
+					# Overlays are still drawn into cross-origin frames, the screenshot has to show them
+					content, page_info = await page_state_task
+					screenshot_b64, tabs_info = await asyncio.gather(self.take_screenshot(), tabs_task)
+				else:
+					# The page is not modified, the screenshot can be taken while the DOM is extracted
+					(content, page_info), screenshot_b64, tabs_info = await asyncio.gather(
+						page_state_task, self.take_screenshot(), tabs_task
+					)
+				if dom_service.highlight_rects:
+					try:
+						screenshot_b64 = await asyncio.to_thread(
+							draw_highlights,
+							screenshot_b64,
+							dom_service.highlight_rects,
+							page_info.viewport_width if page_info is not None else None,
+						)
+					except ImportError:
+						logger.warning('composite_highlights needs Pillow (pip install pillow), the screenshot has no highlights')
+			else:
+				content, page_info = await page_state_task
+				# The screenshot has to show the new highlights, the tab titles can finish meanwhile.
+				# A screencast frame from before they were drawn does not.
+				newer_than = time.monotonic() if self.config.highlight_elements else None
+				screenshot_b64, tabs_info = await asyncio.gather(self.take_screenshot(newer_than=newer_than), tabs_task)
 
 			# Get all cross-origin iframes within the page and open them in new tabs
 			# mark the titles of the new tabs so the LLM knows to check them for additional content
@@ -1202,8 +1372,18 @@ class BrowserContext:
 			# 		)
 			# 	)
 
-			screenshot_b64 = await self.take_screenshot()
-			pixels_above, pixels_below = await self.get_scroll_info(page)
+			if page_info is not None:
+				title = page_info.title
+				pixels_above, pixels_below = page_info.pixels_above, page_info.pixels_below
+				# The title read with the DOM is newer than the cached one, e.g. of single page apps that set it later
+				self._tabs.set_title(page, title)
+				tab = self._tabs.tabs.get(page)
+				for tab_info in tabs_info:
+					if tab is not None and tab_info.page_id == tab.page_id:
+						tab_info.title = title
+			else:
+				title = await page.title()
+				pixels_above, pixels_below = await self.get_scroll_info(page)
 
 			# Find the agent's active tab ID
 			agent_current_page_id = 0
@@ -1217,7 +1397,7 @@ class BrowserContext:
 				element_tree=content.element_tree,
 				selector_map=content.selector_map,
 				url=page.url,
-				title=await page.title(),
+				title=title,
 				tabs=tabs_info,
 				screenshot=screenshot_b64,
 				pixels_above=pixels_above,
@@ -1226,35 +1406,146 @@ class BrowserContext:
 
 			return self.current_state
 		except Exception as e:
+			tabs_task.cancel()
+
+			# Check if current page is still valid, only done when something failed to save a round-trip per step
+			try:
+				await page.evaluate('1')
+			except Exception as page_error:
+				logger.debug(f'👋  Current page is no longer accessible: {str(page_error)}')
+				raise BrowserError('Browser closed: no valid pages available')
+
 			logger.error(f'❌  Failed to update state: {str(e)}')
 			# Return last known good state if available
 			if hasattr(self, 'current_state'):
 				return self.current_state
 			raise
 
+	def _get_dom_service(self, page: Page) -> DomService:
+		"""Get the DomService for a page, dropping the ones of closed pages"""
+		dom_service = self._dom_services.get(page)
+		if dom_service is None:
+			self._dom_services = {p: service for p, service in self._dom_services.items() if not p.is_closed()}
+			dom_service = self._dom_services[page] = DomService(page)
+		return dom_service
+
 	# region - Browser Actions
 	@time_execution_async('--take_screenshot')
-	async def take_screenshot(self, full_page: bool = False) -> str:
+	async def take_screenshot(
+		self,
+		full_page: bool = False,
+		format: Literal['png', 'jpeg', 'webp'] | None = None,
+		quality: int | None = None,
+		max_size: int | None = None,
+		newer_than: float | None = None,
+	) -> str:
 		"""
-		Returns a base64 encoded screenshot of the current page.
+		Returns a base64 encoded screenshot of the current page, of the viewport unless full_page.
+
+		format, quality (jpeg and webp) and max_size (the longest edge in pixels, larger screenshots are scaled down
+		by the browser) default to screenshot_format, screenshot_quality and screenshot_max_size of the config.
+		With screencast_screenshots and the defaults, the latest frame of the screencast of the page is returned,
+		if newer_than is given only a frame received after that time.monotonic() timestamp.
 		"""
 		page = await self.get_agent_current_page()
+		if self.config.screencast_screenshots and not full_page and format is None and quality is None and max_size is None:
+			screencast = await self._get_screencast(page)
+			screenshot_b64 = await screencast.screenshot(newer_than) if screencast is not None else None
+			if screenshot_b64 is not None:
+				return screenshot_b64
+
+		format = format or self.config.screenshot_format
+		quality = quality if quality is not None else self.config.screenshot_quality
+		max_size = max_size if max_size is not None else self.config.screenshot_max_size
 
 		# We no longer force tabs to the foreground as it disrupts user focus
 		# await page.bring_to_front()
 		await page.wait_for_load_state()
 
+		if format == 'webp' or max_size:
+			try:
+				return await self._capture_screenshot(page, full_page, format, quality, max_size)
+			except Exception as e:
+				logger.debug(f'Failed to capture the screenshot with CDP, falling back to a full size one: {e}')
+				format = 'jpeg' if format == 'jpeg' else 'png'
+
 		screenshot = await page.screenshot(
 			full_page=full_page,
 			animations='disabled',
+			type=format,
+			quality=quality if format == 'jpeg' else None,
 		)
 
-		screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
+		# Encoding a full resolution screenshot takes a few milliseconds, not on the event loop
+		screenshot_b64 = await asyncio.to_thread(lambda: base64.b64encode(screenshot).decode('utf-8'))
 
 		# await self.remove_highlights()
 
 		return screenshot_b64
 
+	async def _get_screencast(self, page: Page) -> Screencast | None:
+		"""Get the Screencast of a page, started on first use. Only the agent's page is streamed, the others are stopped."""
+		screencast = self._screencasts.get(page)
+		if screencast is None:
+			for other in self._screencasts.values():
+				await other.stop()
+			# Screencasts have no WebP, their frames are scaled to fit a square of the maximum size
+			screencast = Screencast(
+				page,
+				format='png' if self.config.screenshot_format == 'png' else 'jpeg',
+				quality=self.config.screenshot_quality,
+				max_width=self.config.screenshot_max_size,
+				max_height=self.config.screenshot_max_size,
+			)
+			try:
+				await screencast.start()
+			except Exception as e:
+				logger.debug(f'Screencast is not available for {page.url}: {e}')
+				self._screencasts = {}
+				return None
+			self._screencasts = {page: screencast}
+		return screencast
+
+	async def _capture_screenshot(
+		self, page: Page, full_page: bool, format: str, quality: int | None, max_size: int | None
+	) -> str:
+		"""
+		Screenshot with CDP Page.captureScreenshot, for the formats and scaling Playwright does not offer.
+		The browser encodes and scales the image and returns it as base64 already.
+		"""
+		area = await page.evaluate(
+			"""(fullPage) => {
+				const viewport = window.visualViewport;
+				const root = document.documentElement;
+				return fullPage
+					? { x: 0, y: 0, width: root.scrollWidth, height: root.scrollHeight, dpr: window.devicePixelRatio }
+					: {
+						x: viewport ? viewport.pageLeft : window.scrollX,
+						y: viewport ? viewport.pageTop : window.scrollY,
+						width: viewport ? viewport.width : window.innerWidth,
+						height: viewport ? viewport.height : window.innerHeight,
+						dpr: window.devicePixelRatio,
+					};
+			}""",
+			full_page,
+		)
+		# The image has clip size * scale * device pixel ratio pixels
+		scale = 1.0
+		if max_size:
+			scale = min(1.0, max_size / (max(area['width'], area['height']) * (area['dpr'] or 1)))
+
+		params: dict = {
+			'format': format,
+			'clip': {'x': area['x'], 'y': area['y'], 'width': area['width'], 'height': area['height'], 'scale': scale},
+			'captureBeyondViewport': full_page,
+		}
+		if quality is not None and format != 'png':
+			params['quality'] = quality
+
+		session = await self._get_dom_service(page).get_cdp_session()
+		result = await session.send('Page.captureScreenshot', params)
+		return result['data']
+
 	@time_execution_async('--remove_highlights')
 	async def remove_highlights(self):
 		"""
@@ -1266,6 +1557,12 @@ class BrowserContext:
 			await page.evaluate(
 				"""
                 try {
+                    // Tear down the overlay layer of buildDomTree.js, its scroll and resize listeners included
+                    const layer = window.__browserUseHighlightLayer;
+                    if (layer) {
+                        layer.destroy();
+                    }
+
                     // Remove the highlight container and all its contents
                     const container = document.getElementById('playwright-highlight-container');
                     if (container) {
@@ -1460,7 +1757,34 @@ class BrowserContext:
 
 	@time_execution_async('--get_locate_element')
 	async def get_locate_element(self, element: DOMElementNode) -> ElementHandle | None:
-		current_frame = await self.get_agent_current_page()
+		"""
+		Handle of an element of the tree, looked up once per state: elements of the current state are cached by
+		highlight index until the next state, then all handles are disposed (see ElementHandleCache).
+		"""
+		page = await self.get_agent_current_page()
+		state = (await self.get_session()).cached_state
+		index = element.highlight_index
+		cacheable = state is not None and index is not None and state.selector_map.get(index) is element
+		if cacheable:
+			element_handle = self.element_handles.get(state, page, index)
+			if element_handle is not None:
+				return element_handle
+
+		element_handle = await self._locate_element(page, element)
+		if element_handle is not None:
+			if cacheable:
+				await self.element_handles.put(state, page, index, element_handle)
+			else:
+				self.element_handles.track(element_handle)
+		return element_handle
+
+	async def _locate_element(self, page: Page, element: DOMElementNode) -> ElementHandle | None:
+		current_frame = page
+
+		# The reference recorded during the extraction, selectors are only the fallback
+		element_handle = await self._get_dom_service(current_frame).resolve_element(element)
+		if element_handle is not None:
+			return element_handle
 
 		# Start with the target element and collect all parents
 		parents: list[DOMElementNode] = []
@@ -1606,15 +1930,10 @@ class BrowserContext:
 			except Exception:
 				pass
 
-			# Get element properties to determine input method
-			tag_handle = await element_handle.get_property('tagName')
-			tag_name = (await tag_handle.json_value()).lower()
-			is_contenteditable = await element_handle.get_property('isContentEditable')
-			readonly_handle = await element_handle.get_property('readOnly')
-			disabled_handle = await element_handle.get_property('disabled')
-
-			readonly = await readonly_handle.json_value() if readonly_handle else False
-			disabled = await disabled_handle.json_value() if disabled_handle else False
+			# Get element properties to determine input method, in one call instead of a remote object per property
+			tag_name, is_contenteditable, readonly, disabled = await element_handle.evaluate(
+				'el => [el.tagName.toLowerCase(), el.isContentEditable, !!el.readOnly, !!el.disabled]'
+			)
 
 			# always click the element first to make sure it's in the focus
 			try:
@@ -1626,7 +1945,7 @@ class BrowserContext:
 				pass
 
 			try:
-				if (await is_contenteditable.json_value() or tag_name == 'input') and not (readonly or disabled):
+				if (is_contenteditable or tag_name == 'input') and not (readonly or disabled):
 					await element_handle.evaluate('el => {el.textContent = ""; el.value = "";}')
 					await element_handle.type(text, delay=5)
 				else:
@@ -1652,38 +1971,29 @@ class BrowserContext:
 			# if element_node.highlight_index is not None:
 			# 	await self._update_state(focus_element=element_node.highlight_index)
 
+			async def perform_click(click_func):
+				"""Performs the actual click, handling both download
+				and navigation scenarios. Returns the path a download started by the click is saved to."""
+				mark = self._downloads.mark() if self._downloads is not None else 0
+				await click_func()
+				await page.wait_for_load_state()
+				await self._check_and_handle_navigation(page)
+				if self._downloads is not None:
+					# The download is saved in the background, clicks that start none only wait for the network to settle
+					downloads = await self._downloads.started_during(mark, lambda: self._wait_for_download_start(page))
+					if downloads:
+						return downloads[0].path
+
+			if self.config.coordinate_clicks:
+				point = await self._get_dom_service(page).click_point(element_node)
+				if point is not None:
+					return await perform_click(lambda: page.mouse.click(*point))
+
 			element_handle = await self.get_locate_element(element_node)
 
 			if element_handle is None:
 				raise Exception(f'Element: {repr(element_node)} not found')
 
-			async def perform_click(click_func):
-				"""Performs the actual click, handling both download
-				and navigation scenarios."""
-				if self.config.save_downloads_path:
-					try:
-						# Try short-timeout expect_download to detect a file download has been been triggered
-						async with page.expect_download(timeout=5000) as download_info:
-							await click_func()
-						download = await download_info.value
-						# Determine file path
-						suggested_filename = download.suggested_filename
-						unique_filename = await self._get_unique_filename(self.config.save_downloads_path, suggested_filename)
-						download_path = os.path.join(self.config.save_downloads_path, unique_filename)
-						await download.save_as(download_path)
-						logger.debug(f'⬇️  Download triggered. Saved file to: {download_path}')
-						return download_path
-					except TimeoutError:
-						# If no download is triggered, treat as normal click
-						logger.debug('No download triggered within timeout. Checking navigation...')
-						await page.wait_for_load_state()
-						await self._check_and_handle_navigation(page)
-				else:
-					# Standard click logic if no download is expected
-					await click_func()
-					await page.wait_for_load_state()
-					await self._check_and_handle_navigation(page)
-
 			try:
 				return await perform_click(lambda: element_handle.click(timeout=1500))
 			except URLNotAllowedError as e:
@@ -1703,44 +2013,31 @@ class BrowserContext:
 
 	@time_execution_async('--get_tabs_info')
 	async def get_tabs_info(self) -> list[TabInfo]:
-		"""Get information about all tabs"""
+		"""Get information about all tabs, from the tab registry (only titles not known yet are fetched)"""
 		session = await self.get_session()
-
-		tabs_info = []
-		for page_id, page in enumerate(session.context.pages):
-			try:
-				tab_info = TabInfo(page_id=page_id, url=page.url, title=await asyncio.wait_for(page.title(), timeout=1))
-			except TimeoutError:
-				# page.title() can hang forever on tabs that are crashed/disappeared/about:blank
-				# we dont want to try automating those tabs because they will hang the whole script
-				logger.debug('⚠  Failed to get tab info for tab #%s: %s (ignoring)', page_id, page.url)
-				tab_info = TabInfo(page_id=page_id, url='about:blank', title='ignore this tab and do not use it')
-			tabs_info.append(tab_info)
-
-		return tabs_info
+		return await self._tabs.get_tabs_info(session.context.pages)
 
 	@time_execution_async('--switch_to_tab')
 	async def switch_to_tab(self, page_id: int) -> None:
-		"""Switch to a specific tab by its page_id"""
+		"""Switch to a specific tab by its page_id, negative ones count from the most recently opened tab (-1)"""
 		session = await self.get_session()
 		pages = session.context.pages
 
-		if page_id >= len(pages):
+		if page_id < 0:
+			page = pages[page_id] if page_id >= -len(pages) else None
+		else:
+			self._tabs.sync(pages)
+			page = self._tabs.page(page_id)
+		if page is None:
 			raise BrowserError(f'No tab found with page_id: {page_id}')
 
-		page = pages[page_id]
-
 		# Check if the tab's URL is allowed before switching
 		if not self._is_url_allowed(page.url):
 			raise BrowserError(f'Cannot switch to tab with non-allowed URL: {page.url}')
 
 		# Update target ID if using CDP
 		if self.browser.config.cdp_url:
-			targets = await self._get_cdp_targets()
-			for target in targets:
-				if target['url'] == page.url:
-					self.state.target_id = target['targetId']
-					break
+			self.state.target_id = await self._targets.target_id(page)
 
 		# Update both tab references - agent wants this tab, and it's now in the foreground
 		self.agent_current_page = page
@@ -1777,11 +2074,7 @@ class BrowserContext:
 
 		# Get target ID for new page if using CDP
 		if self.browser.config.cdp_url:
-			targets = await self._get_cdp_targets()
-			for target in targets:
-				if target['url'] == new_page.url:
-					self.state.target_id = target['targetId']
-					break
+			self.state.target_id = await self._targets.target_id(new_page)
 
 	# region - Helper methods for easier access to the DOM
 
@@ -1864,36 +2157,15 @@ class BrowserContext:
 		for page in pages:
 			await page.close()
 
+		await self.element_handles.invalidate()
 		session.cached_state = None
 		self.state.target_id = None
 
-	async def _get_unique_filename(self, directory, filename):
-		"""Generate a unique filename by appending (1), (2), etc., if a file already exists."""
-		base, ext = os.path.splitext(filename)
-		counter = 1
-		new_filename = filename
-		while os.path.exists(os.path.join(directory, new_filename)):
-			new_filename = f'{base} ({counter}){ext}'
-			counter += 1
-		return new_filename
-
-	async def _get_cdp_targets(self) -> list[dict]:
-		"""Get all CDP targets directly using CDP protocol"""
-		if not self.browser.config.cdp_url or not self.session:
-			return []
-
-		try:
-			pages = self.session.context.pages
-			if not pages:
-				return []
-
-			cdp_session = await pages[0].context.new_cdp_session(pages[0])
-			result = await cdp_session.send('Target.getTargets')
-			await cdp_session.detach()
-			return result.get('targetInfos', [])
-		except Exception as e:
-			logger.debug(f'Failed to get CDP targets: {e}')
-			return []
+	async def _wait_for_download_start(self, page: Page) -> None:
+		"""Waits until an action can no longer start a download: the network of the page is quiet"""
+		tracker = await self._get_network_tracker(page)
+		if tracker is not None:
+			await tracker.wait_for_idle(DOWNLOAD_IDLE_TIME, DOWNLOAD_START_TIMEOUT)
 
 	async def _resize_window(self, context: PlaywrightBrowserContext) -> None:
 		"""Resize the browser window to match the configured size"""
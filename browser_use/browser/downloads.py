@@ -0,0 +1,119 @@
+"""
+Downloads of all tabs, saved in the background from the moment they start.
+
+Every page reports its downloads with a 'download' event. They are saved to save_downloads_path while the agent goes
+on. An action only looks at the downloads that started while it ran, and stops looking once the page settled, instead of
+waiting for a download that may never come.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from patchright.async_api import Download, Page
+
+logger = logging.getLogger(__name__)
+
+# Quiet network time after an action, once the page is this quiet the action did not start a download
+DOWNLOAD_IDLE_TIME = 0.1
+# Longest an action waits for a download to start when the network of the page does not get quiet
+DOWNLOAD_START_TIMEOUT = 2.0
+# Longest the browser context waits for downloads that are still being saved when it is closed
+DOWNLOADS_CLOSE_TIMEOUT = 30.0
+
+
+@dataclass
+class DownloadRecord:
+	url: str
+	path: str  # where the file is saved, known as soon as the download starts
+	started_at: float = field(default_factory=time.monotonic)
+	task: asyncio.Task | None = None  # saves the file, done once it is complete
+	error: str | None = None
+
+	@property
+	def done(self) -> bool:
+		return self.task is not None and self.task.done()
+
+
+class DownloadManager:
+	def __init__(self, directory: str):
+		self.directory = directory
+		self.downloads: list[DownloadRecord] = []
+		self._pages: set[Page] = set()
+		# File names taken by downloads still being saved, the files do not exist yet
+		self._reserved: set[str] = set()
+		# Set whenever a download starts, wakes up the actions waiting for one
+		self._started = asyncio.Event()
+
+	def register(self, page: Page) -> None:
+		if page in self._pages:
+			return
+		self._pages.add(page)
+		page.on('download', self._on_download)
+		page.on('close', lambda _: self._pages.discard(page))
+
+	def mark(self) -> int:
+		"""Marks the start of an action, see started_since()"""
+		return len(self.downloads)
+
+	def started_since(self, mark: int) -> list[DownloadRecord]:
+		return self.downloads[mark:]
+
+	async def started_during(self, mark: int, settled: Callable[[], Awaitable]) -> list[DownloadRecord]:
+		"""
+		The downloads an action started: the ones that started since mark, or the first one that starts until settled()
+		(e.g. waiting for the network of the page to be idle) is done. Returns as soon as either happens.
+		"""
+		if not self.started_since(mark):
+			waiting = asyncio.ensure_future(settled())
+			while not self.started_since(mark) and not waiting.done():
+				self._started.clear()
+				started = asyncio.ensure_future(self._started.wait())
+				await asyncio.wait({waiting, started}, return_when=asyncio.FIRST_COMPLETED)
+				started.cancel()
+			if not waiting.done():
+				waiting.cancel()
+			elif waiting.exception() is not None:
+				logger.debug(f'Failed to wait for the page to settle after the action: {waiting.exception()}')
+		return self.started_since(mark)
+
+	async def wait(self, timeout: float) -> None:
+		"""Waits for the downloads that are still being saved, e.g. before the browser context is closed"""
+		pending = [record.task for record in self.downloads if record.task is not None and not record.task.done()]
+		if not pending:
+			return
+		logger.info(f'⬇️  Waiting for {len(pending)} download(s) to finish')
+		_, not_done = await asyncio.wait(pending, timeout=timeout)
+		if not_done:
+			logger.warning(f'⚠️  {len(not_done)} download(s) did not finish within {timeout} seconds')
+
+	def _on_download(self, download: Download) -> None:
+		record = DownloadRecord(url=download.url, path=self._unique_path(download.suggested_filename))
+		record.task = asyncio.ensure_future(self._save(download, record))
+		self.downloads.append(record)
+		self._started.set()
+		logger.debug(f'⬇️  Download started: {record.url} -> {record.path}')
+
+	async def _save(self, download: Download, record: DownloadRecord) -> None:
+		try:
+			await download.save_as(record.path)
+			logger.debug(f'⬇️  Download finished. Saved file to: {record.path}')
+		except Exception as e:
+			record.error = str(e)
+			logger.warning(f'❌  Failed to save download {record.url}: {e}')
+		finally:
+			self._reserved.discard(record.path)
+
+	def _unique_path(self, filename: str) -> str:
+		"""Path in the download directory, with (1), (2), etc. appended if the name is taken"""
+		base, ext = os.path.splitext(filename)
+		counter = 1
+		path = os.path.join(self.directory, filename)
+		while os.path.exists(path) or path in self._reserved:
+			path = os.path.join(self.directory, f'{base} ({counter}){ext}')
+			counter += 1
+		self._reserved.add(path)
+		return path
@@ -0,0 +1,77 @@
+"""
+Element handles of the current browser state, looked up once per element and disposed together.
+
+Every ElementHandle holds a remote object in the page until it is disposed. The handles that actions look up for the
+elements of a BrowserState are kept by highlight index while that state is current: looking up the same element again
+reuses its handle, and once the state is replaced all of them are released at once.
+"""
+
+import asyncio
+import logging
+
+from patchright.async_api import ElementHandle, Page
+
+from browser_use.browser.views import BrowserState
+
+logger = logging.getLogger(__name__)
+
+
+class ElementHandleCache:
+	def __init__(self):
+		self.state: BrowserState | None = None
+		self.page: Page | None = None
+		self.handles: dict[int, ElementHandle] = {}  # highlight index -> handle
+		# Handles of elements that are not in the current state (e.g. from an older tree), released with the others
+		self.untracked: list[ElementHandle] = []
+
+		self.hits = 0
+		self.misses = 0
+		self.disposed = 0
+		self.dispose_failures = 0
+
+	def get(self, state: BrowserState, page: Page, index: int) -> ElementHandle | None:
+		handle = self.handles.get(index) if state is self.state and page is self.page else None
+		if handle is None:
+			self.misses += 1
+		else:
+			self.hits += 1
+		return handle
+
+	async def put(self, state: BrowserState, page: Page, index: int, handle: ElementHandle) -> None:
+		if state is not self.state or page is not self.page:
+			await self.invalidate()
+			self.state, self.page = state, page
+		previous = self.handles.get(index)
+		if previous is not None and previous is not handle:
+			self.untracked.append(previous)
+		self.handles[index] = handle
+
+	def track(self, handle: ElementHandle) -> None:
+		"""Release a handle that is not cached together with the cached ones"""
+		self.untracked.append(handle)
+
+	async def invalidate(self) -> None:
+		"""Dispose all handles, called whenever the current state is replaced"""
+		handles = [*self.handles.values(), *self.untracked]
+		self.state, self.page = None, None
+		self.handles, self.untracked = {}, []
+		if not handles:
+			return
+
+		# Handles of closed pages or navigated documents fail to dispose, their remote objects are gone already
+		results = await asyncio.gather(*(handle.dispose() for handle in handles), return_exceptions=True)
+		failures = [result for result in results if isinstance(result, Exception)]
+		self.disposed += len(handles) - len(failures)
+		self.dispose_failures += len(failures)
+		if failures:
+			logger.debug(f'Failed to dispose {len(failures)} of {len(handles)} element handles: {failures[0]}')
+
+	def metrics(self) -> dict:
+		"""Counters since the context was created, `live` is the number of handles held right now"""
+		return {
+			'hits': self.hits,
+			'misses': self.misses,
+			'live': len(self.handles) + len(self.untracked),
+			'disposed': self.disposed,
+			'dispose_failures': self.dispose_failures,
+		}
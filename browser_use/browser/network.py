@@ -0,0 +1,211 @@
+"""
+Tracks the requests a page is waiting on, to know when its network has settled.
+
+One NetworkTracker lives as long as its page: it listens to the CDP Network domain on a session of its own and keeps
+the number of relevant requests in flight and the time of the last activity. Browsers without CDP (Firefox, WebKit)
+report the same requests with Playwright's request events instead. Waiting for the network to be idle sleeps until a
+request starts or ends instead of polling.
+"""
+
+import asyncio
+import logging
+import re
+import time
+
+from patchright.async_api import CDPSession, Page, Request, Response
+
+logger = logging.getLogger(__name__)
+
+# Requests the page load waits for, by CDP resource type
+RELEVANT_RESOURCE_TYPES = {
+	'Document',
+	'Stylesheet',
+	'Image',
+	'Font',
+	'Script',
+}
+
+# Responses that count as page activity, by content type
+RELEVANT_CONTENT_TYPES = re.compile(r'text/html|text/css|application/javascript|image/|font/|application/json')
+
+# Responses that are streamed or real-time data, they never count as activity
+STREAMING_CONTENT_TYPES = re.compile(r'streaming|video|audio|webm|mp4|event-stream|websocket|protobuf')
+
+# Additional patterns to filter out
+IGNORED_URL_PATTERNS = {
+	# Analytics and tracking
+	'analytics',
+	'tracking',
+	'telemetry',
+	'beacon',
+	'metrics',
+	# Ad-related
+	'doubleclick',
+	'adsystem',
+	'adserver',
+	'advertising',
+	# Social media widgets
+	'facebook.com/plugins',
+	'platform.twitter',
+	'linkedin.com/embed',
+	# Live chat and support
+	'livechat',
+	'zendesk',
+	'intercom',
+	'crisp.chat',
+	'hotjar',
+	# Push notifications
+	'push-notifications',
+	'onesignal',
+	'pushwoosh',
+	# Background sync/heartbeat
+	'heartbeat',
+	'ping',
+	'alive',
+	# WebRTC and streaming
+	'webrtc',
+	'rtmp://',
+	'wss://',
+	# Common CDNs for dynamic content
+	'cloudfront.net',
+	'fastly.net',
+}
+
+# One pass over the url instead of one substring search per pattern, data: and blob: urls are ignored as well
+IGNORED_URL_RE = re.compile(
+	r'^(?:data|blob):|' + '|'.join(re.escape(pattern) for pattern in sorted(IGNORED_URL_PATTERNS)), re.IGNORECASE
+)
+
+# Responses larger than this are not essential for the page load
+MAX_RELEVANT_CONTENT_LENGTH = 5 * 1024 * 1024
+
+
+class NetworkTracker:
+	"""
+	In-flight requests of one page, fed by CDP Network events.
+
+	A request is in flight from Network.requestWillBeSent until its response headers arrive or it fails. Redirects
+	keep it in flight, they reuse the request id. A wait forgets the requests that have been in flight for longer than
+	it waits at most (long-polling, hung or never answered ones), they would keep every later wait from settling.
+	"""
+
+	def __init__(self, page: Page):
+		self.page = page
+		# CDP request id (the Request without CDP) -> url, time.monotonic() when it was sent
+		self.pending: dict[str | Request, tuple[str, float]] = {}
+		self.last_activity = time.monotonic()
+		self._session: CDPSession | None = None
+		self._listens_to_page = False
+		# Set whenever a request starts or ends, wakes up the waiters to check again
+		self._changed = asyncio.Event()
+
+	async def start(self) -> None:
+		try:
+			session = await self.page.context.new_cdp_session(self.page)
+		except Exception as e:
+			logger.debug(f'Tracking the network of {self.page.url} with request events, no CDP session: {e}')
+			self.page.on('request', self._on_page_request)
+			self.page.on('response', self._on_page_response)
+			self.page.on('requestfailed', self._on_page_request_failed)
+			self._listens_to_page = True
+			return
+		session.on('Network.requestWillBeSent', self._on_request)
+		session.on('Network.responseReceived', self._on_response)
+		session.on('Network.loadingFailed', self._on_done)
+		await session.send('Network.enable')
+		self._session = session
+
+	async def stop(self) -> None:
+		if self._listens_to_page:
+			self._listens_to_page = False
+			self.page.remove_listener('request', self._on_page_request)
+			self.page.remove_listener('response', self._on_page_response)
+			self.page.remove_listener('requestfailed', self._on_page_request_failed)
+		session, self._session = self._session, None
+		if session is not None:
+			try:
+				await session.detach()
+			except Exception as e:
+				logger.debug(f'Failed to detach the network tracker: {e}')
+
+	@staticmethod
+	def is_relevant(resource_type: str | None, url: str) -> bool:
+		return resource_type in RELEVANT_RESOURCE_TYPES and not IGNORED_URL_RE.search(url)
+
+	def _on_request(self, event: dict) -> None:
+		request_id = event['requestId']
+		if request_id in self.pending:
+			return  # redirect of a request in flight
+		url = event['request']['url']
+		if not self.is_relevant(event.get('type'), url):
+			return
+		self.last_activity = time.monotonic()
+		self.pending[request_id] = (url, self.last_activity)
+		self._changed.set()
+
+	def _on_response(self, event: dict) -> None:
+		if self.pending.pop(event['requestId'], None) is None:
+			return
+		response = event['response']
+		headers = {name.lower(): value for name, value in response.get('headers', {}).items()}
+		content_type = (headers.get('content-type') or response.get('mimeType') or '').lower()
+		content_length = headers.get('content-length')
+		if (
+			not STREAMING_CONTENT_TYPES.search(content_type)
+			and RELEVANT_CONTENT_TYPES.search(content_type)
+			and not (content_length and content_length.isdigit() and int(content_length) > MAX_RELEVANT_CONTENT_LENGTH)
+		):
+			self.last_activity = time.monotonic()
+		self._changed.set()
+
+	def _on_done(self, event: dict) -> None:
+		if self.pending.pop(event['requestId'], None) is not None:
+			self._changed.set()
+
+	# Playwright's request events, as the CDP events they stand for. A redirect ends the request with its response,
+	# the redirected request is a new one.
+	def _on_page_request(self, request: Request) -> None:
+		self._on_request({'requestId': request, 'request': {'url': request.url}, 'type': request.resource_type.capitalize()})
+
+	def _on_page_response(self, response: Response) -> None:
+		self._on_response({'requestId': response.request, 'response': {'headers': response.headers}})
+
+	def _on_page_request_failed(self, request: Request) -> None:
+		self._on_done({'requestId': request})
+
+	def _drop_stale(self, max_age: float) -> None:
+		"""Forgets the requests in flight for longer than max_age seconds"""
+		sent_before = time.monotonic() - max_age
+		for request_id, (url, sent_at) in list(self.pending.items()):
+			if sent_at < sent_before:
+				logger.debug(f'Not waiting for a request in flight for more than {max_age} seconds: {url}')
+				del self.pending[request_id]
+
+	async def wait_for_idle(self, idle_time: float, timeout: float) -> bool:
+		"""
+		Waits until no relevant request is in flight and none started or finished for idle_time seconds.
+		Requests in flight for longer than timeout seconds are not waited for.
+		Returns False if the network did not settle within timeout seconds.
+		"""
+		deadline = time.monotonic() + timeout
+		while True:
+			now = time.monotonic()
+			if now < deadline:
+				# At the deadline the requests sent right before the wait are as old, they did not settle
+				self._drop_stale(timeout)
+			if self.pending:
+				quiet_for = None
+				# Check again when the oldest request becomes stale
+				wake_in = min(sent_at for _, sent_at in self.pending.values()) + timeout - now
+			else:
+				quiet_for = wake_in = idle_time - (now - self.last_activity)
+			if quiet_for is not None and quiet_for <= 0:
+				return True
+			if now >= deadline:
+				return False
+
+			self._changed.clear()
+			try:
+				await asyncio.wait_for(self._changed.wait(), min(deadline - now, wake_in))
+			except asyncio.TimeoutError:
+				pass
@@ -0,0 +1,111 @@
+"""
+Screenshots from a CDP screencast of the page instead of a capture per step.
+
+With Page.startScreencast the browser pushes a frame whenever the page is repainted. The last few frames are kept in a
+ring buffer, so a screenshot is the latest frame instead of a capture that has to wait for the page and encode a new
+image. A page that was not repainted sends no frames: its latest frame still shows it.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from patchright.async_api import CDPSession, Page
+
+logger = logging.getLogger(__name__)
+
+# Frames kept per page
+SCREENCAST_BUFFER_SIZE = 8
+# How long a screenshot waits for the first frame of a new screencast before the page is captured instead
+FIRST_FRAME_TIMEOUT = 0.5
+# How long a screenshot waits for a new frame, the page may be repainting
+NEW_FRAME_TIMEOUT = 0.1
+
+
+@dataclass
+class ScreencastFrame:
+	data: str  # base64
+	received_at: float  # time.monotonic()
+	metadata: dict  # deviceWidth, deviceHeight, scrollOffsetX, scrollOffsetY, ... of Page.screencastFrame
+
+
+class Screencast:
+	"""The screencast of one page, see Page.startScreencast for format, quality, max_width and max_height"""
+
+	def __init__(
+		self,
+		page: Page,
+		format: str = 'jpeg',
+		quality: int | None = None,
+		max_width: int | None = None,
+		max_height: int | None = None,
+	):
+		self.page = page
+		self.params: dict = {'format': format, 'everyNthFrame': 1}
+		if quality is not None and format == 'jpeg':
+			self.params['quality'] = quality
+		if max_width:
+			self.params['maxWidth'] = max_width
+		if max_height:
+			self.params['maxHeight'] = max_height
+
+		self.frames: deque[ScreencastFrame] = deque(maxlen=SCREENCAST_BUFFER_SIZE)
+		self._session: CDPSession | None = None
+		self._new_frame = asyncio.Event()
+		# Frame acks in flight, referenced until they are sent
+		self._acks: set[asyncio.Task] = set()
+		# When the previous screenshot was taken, frames after it are new
+		self._taken_at = 0.0
+
+	async def start(self) -> None:
+		session = await self.page.context.new_cdp_session(self.page)
+		session.on('Page.screencastFrame', self._on_frame)
+		await session.send('Page.startScreencast', self.params)
+		self._session = session
+
+	async def stop(self) -> None:
+		session, self._session = self._session, None
+		if session is None:
+			return
+		try:
+			await session.send('Page.stopScreencast')
+			await session.detach()
+		except Exception as e:
+			logger.debug(f'Failed to stop the screencast: {e}')
+
+	def _on_frame(self, event: dict) -> None:
+		self.frames.append(ScreencastFrame(data=event['data'], received_at=time.monotonic(), metadata=event['metadata']))
+		self._new_frame.set()
+		# The browser sends the next frame once this one is acknowledged
+		if self._session is not None:
+			ack = asyncio.ensure_future(self._session.send('Page.screencastFrameAck', {'sessionId': event['sessionId']}))
+			self._acks.add(ack)
+			ack.add_done_callback(self._on_ack_done)
+
+	def _on_ack_done(self, ack: asyncio.Task) -> None:
+		self._acks.discard(ack)
+		if not ack.cancelled() and ack.exception() is not None:
+			logger.debug(f'Failed to acknowledge a screencast frame: {ack.exception()}')
+
+	async def screenshot(self, newer_than: float | None = None) -> str | None:
+		"""
+		The latest frame, after waiting briefly for one newer than the previous screenshot.
+		None if the screencast has not sent any frame yet.
+
+		With newer_than (a time.monotonic() timestamp, e.g. taken once the highlights were drawn into the page), only
+		a frame received after it is returned, None if none arrives in time and the page has to be captured instead.
+		"""
+		timeout = NEW_FRAME_TIMEOUT if self.frames else FIRST_FRAME_TIMEOUT
+		since = self._taken_at if newer_than is None else newer_than
+		if not self.frames or self.frames[-1].received_at <= since:
+			self._new_frame.clear()
+			try:
+				await asyncio.wait_for(self._new_frame.wait(), timeout)
+			except asyncio.TimeoutError:
+				pass  # not repainted since, the latest frame still shows the page
+		if not self.frames or (newer_than is not None and self.frames[-1].received_at <= newer_than):
+			return None
+		self._taken_at = time.monotonic()
+		return self.frames[-1].data
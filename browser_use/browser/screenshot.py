@@ -0,0 +1,62 @@
+"""
+Format and size of base64 screenshots, read from their headers without decoding the image.
+"""
+
+import base64
+import struct
+
+# base64 prefixes of the formats screenshots are taken in
+MIME_TYPES = {
+	'iVBORw0KGgo': 'image/png',
+	'/9j/': 'image/jpeg',
+	'UklGR': 'image/webp',
+}
+
+# The headers of all formats are in the first bytes, the frame header of a JPEG comes after its tables
+HEADER_BASE64_LENGTH = 64 * 1024
+
+# JPEG markers of the frame headers that hold the size (SOF0-SOF15 without DHT, JPG and DAC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def image_mime_type(screenshot_b64: str) -> str:
+	for prefix, mime_type in MIME_TYPES.items():
+		if screenshot_b64.startswith(prefix):
+			return mime_type
+	return 'image/png'
+
+
+def image_size(screenshot_b64: str) -> tuple[int, int] | None:
+	"""(width, height) of a base64 PNG, JPEG or WebP image, None if the header cannot be read"""
+	try:
+		header = base64.b64decode(screenshot_b64[:HEADER_BASE64_LENGTH])
+	except ValueError:
+		return None
+
+	if header[:8] == b'\x89PNG\r\n\x1a\n' and len(header) >= 24:
+		return struct.unpack('>II', header[16:24])
+
+	if header[:4] == b'RIFF' and header[8:12] == b'WEBP' and len(header) >= 30:
+		chunk = header[12:16]
+		if chunk == b'VP8 ':
+			width, height = struct.unpack('<HH', header[26:30])
+			return width & 0x3FFF, height & 0x3FFF
+		if chunk == b'VP8L':
+			bits = int.from_bytes(header[21:25], 'little')
+			return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+		if chunk == b'VP8X':
+			return int.from_bytes(header[24:27], 'little') + 1, int.from_bytes(header[27:30], 'little') + 1
+		return None
+
+	if header[:2] == b'\xff\xd8':
+		position = 2
+		while position + 9 <= len(header):
+			if header[position] != 0xFF:
+				return None
+			marker = header[position + 1]
+			if marker in JPEG_SOF_MARKERS:
+				height, width = struct.unpack('>HH', header[position + 5 : position + 9])
+				return width, height
+			(length,) = struct.unpack('>H', header[position + 2 : position + 4])
+			position += 2 + length
+	return None
@@ -0,0 +1,123 @@
+"""
+Registry of the open tabs, kept up to date by page events instead of being queried for every state.
+
+Every tab gets an id when it is first seen, one more than the last id given out, and keeps it until it is closed: closing
+a tab does not renumber the others and its id is not given to a later tab. Titles are cached and refreshed when the page navigates or loads, concurrently for all
+tabs, so listing the tabs usually does not wait on any page.
+"""
+
+import asyncio
+import itertools
+import logging
+from dataclasses import dataclass
+
+from patchright.async_api import Frame, Page
+
+from browser_use.browser.views import TabInfo
+
+logger = logging.getLogger(__name__)
+
+# page.title() can hang forever on tabs that are crashed/disappeared/about:blank
+TITLE_TIMEOUT = 1
+
+
+@dataclass
+class Tab:
+	page_id: int
+	url: str
+	title: str | None = None  # None until fetched, and again after a navigation
+	unresponsive: bool = False
+
+
+class TabRegistry:
+	def __init__(self):
+		self.tabs: dict[Page, Tab] = {}
+		self._page_ids = itertools.count()
+		# Title refreshes in flight, one per page
+		self._refreshes: dict[Page, asyncio.Task] = {}
+
+	def register(self, page: Page) -> Tab:
+		"""Start tracking a page, pages that are already tracked keep their id"""
+		tab = self.tabs.get(page)
+		if tab is not None:
+			return tab
+		tab = self.tabs[page] = Tab(page_id=next(self._page_ids), url=page.url)
+
+		def on_navigated(frame: Frame) -> None:
+			if frame == page.main_frame:
+				tab.url = frame.url
+				tab.title = None
+
+		page.on('framenavigated', on_navigated)
+		page.on('domcontentloaded', lambda _: self._refresh_soon(page))
+		page.on('load', lambda _: self._refresh_soon(page))
+		page.on('close', lambda _: self.unregister(page))
+		return tab
+
+	def unregister(self, page: Page) -> None:
+		self.tabs.pop(page, None)
+		refresh = self._refreshes.pop(page, None)
+		if refresh is not None:
+			refresh.cancel()
+
+	def sync(self, pages: list[Page]) -> None:
+		"""Track the pages that are not tracked yet (opened before the registry existed) and drop closed ones"""
+		for page in list(self.tabs):
+			if page.is_closed():
+				self.unregister(page)
+		for page in pages:
+			if page not in self.tabs and not page.is_closed():
+				self.register(page)
+
+	def page(self, page_id: int) -> Page | None:
+		return next((page for page, tab in self.tabs.items() if tab.page_id == page_id), None)
+
+	def first_page_id(self) -> int | None:
+		"""The id of the oldest open tab, None if there is none"""
+		return min((tab.page_id for tab in self.tabs.values()), default=None)
+
+	def set_title(self, page: Page, title: str) -> None:
+		"""Title of a page read some other way, e.g. with the DOM of the current page"""
+		tab = self.tabs.get(page)
+		if tab is not None:
+			tab.url, tab.title, tab.unresponsive = page.url, title, False
+
+	async def get_tabs_info(self, pages: list[Page]) -> list[TabInfo]:
+		"""The open tabs by id, only the titles that are not known yet are fetched (concurrently)"""
+		self.sync(pages)
+		stale = [page for page, tab in self.tabs.items() if tab.title is None]
+		if stale:
+			await asyncio.gather(*(self._refresh_soon(page) for page in stale))
+
+		tabs_info = []
+		for tab in sorted(self.tabs.values(), key=lambda tab: tab.page_id):
+			if tab.unresponsive:
+				# we dont want to try automating those tabs because they will hang the whole script
+				tabs_info.append(TabInfo(page_id=tab.page_id, url='about:blank', title='ignore this tab and do not use it'))
+			else:
+				tabs_info.append(TabInfo(page_id=tab.page_id, url=tab.url, title=tab.title or ''))
+		return tabs_info
+
+	def _refresh_soon(self, page: Page) -> asyncio.Task:
+		"""Fetch the title of a page in the background, joining a refresh that is already running"""
+		refresh = self._refreshes.get(page)
+		if refresh is None or refresh.done():
+			refresh = self._refreshes[page] = asyncio.ensure_future(self._refresh(page))
+		return refresh
+
+	async def _refresh(self, page: Page) -> None:
+		tab = self.tabs.get(page)
+		if tab is None:
+			return
+		try:
+			title = await asyncio.wait_for(page.title(), timeout=TITLE_TIMEOUT)
+		except asyncio.TimeoutError:
+			logger.debug('⚠  Failed to get tab info for tab #%s: %s (ignoring)', tab.page_id, page.url)
+			tab.url, tab.title, tab.unresponsive = page.url, '', True
+			return
+		except Exception as e:
+			# The page navigated or closed meanwhile, the next event refreshes it again
+			logger.debug(f'Failed to get the title of tab #{tab.page_id}: {type(e).__name__}: {e}')
+			tab.url, tab.title = page.url, tab.title or ''
+			return
+		tab.url, tab.title, tab.unresponsive = page.url, title, False
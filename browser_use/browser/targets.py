@@ -0,0 +1,99 @@
+"""
+Registry of the CDP targets of the browser, kept up to date by Target events instead of being listed for every lookup.
+
+A browser session with target discovery reports every target when it is created, changed (e.g. navigated) or
+destroyed. A page gets the target on its url that no other page has. Only if there is no such target or several, e.g.
+two tabs on the same url, the target id is asked from the page itself, on a session attached to it. The target id of a
+page is kept until the page closes.
+"""
+
+import asyncio
+import logging
+
+from patchright.async_api import Browser, CDPSession, Page
+
+logger = logging.getLogger(__name__)
+
+
+class TargetRegistry:
+	def __init__(self):
+		self.targets: dict[str, dict] = {}  # target id -> TargetInfo (type, url, title, attached, ...)
+		self.page_targets: dict[Page, str] = {}  # page -> target id
+		self._session: CDPSession | None = None
+
+	async def start(self, browser: Browser) -> None:
+		session = await browser.new_browser_cdp_session()
+		session.on('Target.targetCreated', self._on_target_changed)
+		session.on('Target.targetInfoChanged', self._on_target_changed)
+		session.on('Target.targetDestroyed', self._on_target_destroyed)
+		# Reports all existing targets with Target.targetCreated right away
+		await session.send('Target.setDiscoverTargets', {'discover': True})
+		self._session = session
+
+	async def stop(self) -> None:
+		session, self._session = self._session, None
+		if session is not None:
+			try:
+				await session.detach()
+			except Exception as e:
+				logger.debug(f'Failed to detach the target registry: {e}')
+		self.targets = {}
+		self.page_targets = {}
+
+	def _on_target_changed(self, event: dict) -> None:
+		target_info = event['targetInfo']
+		self.targets[target_info['targetId']] = target_info
+
+	def _on_target_destroyed(self, event: dict) -> None:
+		target_id = event['targetId']
+		self.targets.pop(target_id, None)
+		for page in [page for page, page_target_id in self.page_targets.items() if page_target_id == target_id]:
+			del self.page_targets[page]
+
+	async def target_id(self, page: Page) -> str | None:
+		"""The target id of a page, looked up on first use. None if the browser has no CDP."""
+		target_id = self.page_targets.get(page)
+		if target_id is not None or page.is_closed():
+			return target_id
+		target_id = self._match_target(page) or await self._ask_target_id(page)
+		if target_id is None:
+			return None
+
+		if page not in self.page_targets:
+			page.on('close', lambda _: self.page_targets.pop(page, None))
+		self.page_targets[page] = target_id
+		return target_id
+
+	def _match_target(self, page: Page) -> str | None:
+		"""The only page target on the url of the page that is not the target of another page, None if there are several"""
+		if self._session is None:
+			return None  # without Target events the infos are not kept up to date
+		taken = set(self.page_targets.values())
+		matches = [
+			target_id
+			for target_id, target_info in self.targets.items()
+			if target_info.get('type') == 'page' and target_info.get('url') == page.url and target_id not in taken
+		]
+		return matches[0] if len(matches) == 1 else None
+
+	async def _ask_target_id(self, page: Page) -> str | None:
+		try:
+			session = await page.context.new_cdp_session(page)
+			try:
+				# Without a target id, the info of the target the session is attached to
+				target_info = (await session.send('Target.getTargetInfo'))['targetInfo']
+			finally:
+				await session.detach()
+		except Exception as e:
+			logger.debug(f'Failed to get the target id of {page.url}: {e}')
+			return None
+
+		self.targets.setdefault(target_info['targetId'], target_info)
+		return target_info['targetId']
+
+	async def page(self, target_id: str, pages: list[Page]) -> Page | None:
+		"""The page of a target among the given ones, None if the target is gone"""
+		if self._session is not None and target_id not in self.targets:
+			return None
+		target_ids = await asyncio.gather(*(self.target_id(page) for page in pages))
+		return next((page for page, page_target_id in zip(pages, target_ids) if page_target_id == target_id), None)
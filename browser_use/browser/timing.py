@@ -0,0 +1,160 @@
+"""
+Page load timing profiles, learned per domain and route.
+
+Every page load records how long the page took to become stable (its network idle and its DOM settled). The waits of
+the next loads of the same route, or of the same domain while the route has few samples, are sized from the
+decayed p50/p95 of these observations instead of the global constants of BrowserContextConfig.
+"""
+
+import re
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+# Observations kept per route, older ones weigh less
+MAX_SAMPLES = 50
+# Weight of an observation relative to the next newer one
+DECAY = 0.9
+# Observations a profile needs before it sizes the waits
+MIN_SAMPLES = 3
+# Path segments that make up a route, deeper ones are dropped
+MAX_ROUTE_DEPTH = 3
+# Path segments that are ids (numbers, uuids, hashes, tokens) and not part of the route
+ID_SEGMENT_RE = re.compile(r'\d+|[0-9a-fA-F-]{8,}|(?=[\w-]*\d)[\w-]{6,}|[\w-]{24,}')
+# Route of the profile that covers all routes of a domain
+ANY_ROUTE = '*'
+# Shortest network idle window a fast domain gets
+MIN_NETWORK_IDLE = 0.1
+# Shortest maximum wait a fast domain gets
+MIN_MAXIMUM_WAIT = 1.0
+
+
+@dataclass
+class PageLoadTiming:
+	"""The waits of one page load, in seconds, see the fields of the same name in BrowserContextConfig"""
+
+	minimum_wait_page_load_time: float
+	wait_for_network_idle_page_load_time: float
+	maximum_wait_page_load_time: float
+
+
+def route_of(url: str) -> tuple[str, str]:
+	"""Domain and route pattern of a url, e.g. ('shop.example.com', '/orders/:id')"""
+	parsed = urlparse(url)
+	segments = [segment for segment in parsed.path.split('/') if segment][:MAX_ROUTE_DEPTH]
+	route = '/'.join(':id' if ID_SEGMENT_RE.fullmatch(segment) else segment.lower() for segment in segments)
+	return (parsed.hostname or '').lower(), f'/{route}'
+
+
+class PageLoadProfiles:
+	"""
+	Observed time-to-stable per (domain, route), and per domain under the route '*'.
+
+	The store is plain data: to_dict() and from_dict() are what BrowserContext writes to and reads from
+	page_load_profiles_file.
+	"""
+
+	def __init__(self):
+		# (domain, route) -> observations in seconds, oldest first
+		self.samples: dict[tuple[str, str], list[float]] = {}
+		# (domain, route) -> loads that did not become stable within their maximum wait
+		self.timeouts: dict[tuple[str, str], int] = {}
+
+	def record(self, url: str, seconds: float, timed_out: bool = False) -> None:
+		"""
+		Records a page load. A load that timed out is only counted: the time it was waited on is the maximum wait, not
+		its time to stable, and as a sample it would push the p95 and with it the next maximum wait up.
+		"""
+		domain, route = route_of(url)
+		if not domain:
+			return  # about:blank, data: urls and the like
+		for key in ((domain, route), (domain, ANY_ROUTE)):
+			if timed_out:
+				self.timeouts[key] = self.timeouts.get(key, 0) + 1
+				continue
+			samples = self.samples.setdefault(key, [])
+			samples.append(round(seconds, 3))
+			del samples[:-MAX_SAMPLES]
+
+	def quantiles(self, url: str) -> tuple[float, float] | None:
+		"""Decayed (p50, p95) of the route of the url, of its domain if the route has too few observations"""
+		domain, route = route_of(url)
+		for key in ((domain, route), (domain, ANY_ROUTE)):
+			samples = self.samples.get(key)
+			if samples and len(samples) >= MIN_SAMPLES:
+				return _weighted_quantile(samples, 0.5), _weighted_quantile(samples, 0.95)
+		return None
+
+	def timing(self, url: str, default: PageLoadTiming) -> PageLoadTiming:
+		"""
+		The waits for a load of the url: default until its route or domain has a profile.
+
+		The maximum wait covers twice the p95 (at most twice the default), the DOM gets until the p50 to settle
+		(at least the default minimum) and fast domains get a shorter network idle window (at most the default one).
+		"""
+		quantiles = self.quantiles(url)
+		if quantiles is None:
+			return default
+		p50, p95 = quantiles
+
+		network_idle = min(default.wait_for_network_idle_page_load_time, max(MIN_NETWORK_IDLE, p50))
+		maximum = min(default.maximum_wait_page_load_time * 2, max(MIN_MAXIMUM_WAIT, p95 * 2 + network_idle))
+		minimum = min(maximum, max(default.minimum_wait_page_load_time, p50))
+		return PageLoadTiming(
+			minimum_wait_page_load_time=minimum,
+			wait_for_network_idle_page_load_time=network_idle,
+			maximum_wait_page_load_time=maximum,
+		)
+
+	def metrics(self) -> list[dict]:
+		"""One row per profile: domain, route, samples, timeouts, p50 and p95 in seconds (None without samples)"""
+		rows = []
+		for domain, route in sorted(self.samples.keys() | self.timeouts.keys()):
+			samples = self.samples.get((domain, route), [])
+			rows.append(
+				{
+					'domain': domain,
+					'route': route,
+					'samples': len(samples),
+					'timeouts': self.timeouts.get((domain, route), 0),
+					'p50': _weighted_quantile(samples, 0.5) if samples else None,
+					'p95': _weighted_quantile(samples, 0.95) if samples else None,
+				}
+			)
+		return rows
+
+	def to_dict(self) -> dict:
+		return {
+			'version': 1,
+			'profiles': [
+				{
+					'domain': domain,
+					'route': route,
+					'samples': self.samples.get((domain, route), []),
+					'timeouts': self.timeouts.get((domain, route), 0),
+				}
+				for domain, route in sorted(self.samples.keys() | self.timeouts.keys())
+			],
+		}
+
+	@classmethod
+	def from_dict(cls, data: dict) -> 'PageLoadProfiles':
+		profiles = cls()
+		for profile in data.get('profiles', []):
+			key = (profile['domain'], profile['route'])
+			if profile['samples']:
+				profiles.samples[key] = [float(sample) for sample in profile['samples']][-MAX_SAMPLES:]
+			if profile.get('timeouts'):
+				profiles.timeouts[key] = int(profile['timeouts'])
+		return profiles
+
+
+def _weighted_quantile(samples: list[float], quantile: float) -> float:
+	"""Quantile of the samples (oldest first), each weighing DECAY times the next newer one"""
+	weighted = sorted((sample, DECAY ** (len(samples) - 1 - age)) for age, sample in enumerate(samples))
+	target = quantile * sum(weight for _, weight in weighted)
+	cumulative = 0.0
+	for sample, weight in weighted:
+		cumulative += weight
+		if cumulative >= target:
+			return sample
+	return weighted[-1][0]
@@ -136,7 +136,7 @@ class Controller(Generic[Context]):
 			try:
 				download_path = await browser._click_element_node(element_node)
 				if download_path:
-					msg = f'💾  Downloaded file to {download_path}'
+					msg = f'💾  Downloading file to {download_path}'
 				else:
 					msg = f'🖱️  Clicked button with index {params.index}: {element_node.get_all_text_till_next_clickable_element(max_depth=2)}'
 
@@ -333,7 +333,7 @@ class Controller(Generic[Context]):
 						# First check if element exists and is visible
 						if await locator.count() > 0 and await locator.first.is_visible():
 							await locator.first.scroll_into_view_if_needed()
-							await asyncio.sleep(0.5)  # Wait for scroll to complete
+							await browser.wait_until_settled(0.5, scroll=True)  # Wait for scroll to complete
 							msg = f'🔍  Scrolled to text: {text}'
 							logger.info(msg)
 							return ActionResult(extracted_content=msg, include_in_memory=True)
@@ -749,16 +749,16 @@ class Controller(Generic[Context]):
 
 			await page.keyboard.press('Enter')  # make sure we dont delete current cell contents if we were last editing
 			await page.keyboard.press('Escape')  # to clear current focus (otherwise select range popup is additive)
-			await asyncio.sleep(0.1)
+			await browser.wait_until_settled(0.1)
 			await page.keyboard.press('Home')  # move cursor to the top left of the sheet first
 			await page.keyboard.press('ArrowUp')
-			await asyncio.sleep(0.1)
+			await browser.wait_until_settled(0.1)
 			await page.keyboard.press('Control+G')  # open the goto range popup
-			await asyncio.sleep(0.2)
+			await browser.wait_until_settled(0.2)
 			await page.keyboard.type(cell_or_range, delay=0.05)
-			await asyncio.sleep(0.2)
+			await browser.wait_until_settled(0.2)
 			await page.keyboard.press('Enter')
-			await asyncio.sleep(0.2)
+			await browser.wait_until_settled(0.2)
 			await page.keyboard.press('Escape')  # to make sure the popup still closes in the case where the jump failed
 			return ActionResult(extracted_content=f'Selected cell {cell_or_range}', include_in_memory=False)
 
@@ -771,7 +771,7 @@ class Controller(Generic[Context]):
 			await select_cell_or_range(browser, cell_or_range)
 
 			await page.keyboard.press('ControlOrMeta+C')
-			await asyncio.sleep(0.1)
+			await asyncio.sleep(0.1)  # copying does not change the page, give the clipboard time
 			extracted_tsv = await page.evaluate('() => navigator.clipboard.readText()')
 			return ActionResult(extracted_content=extracted_tsv, include_in_memory=True)
 
@@ -0,0 +1,224 @@
+"""
+Builds the DOM tree from Chrome's accessibility tree (CDP Accessibility.getFullAXTree) instead of walking the page.
+
+Only roles, names, values and states are used, no layout: every element that is exposed to assistive technology is
+part of the tree, hidden ones (display: none, visibility: hidden, aria-hidden) are already pruned by the browser.
+AX nodes are mapped back to their DOM elements by backend node id (DOM.getDocument with pierce) for xpaths and
+attributes, so actions locate the elements the same way as with buildDomTree.js.
+"""
+
+from browser_use.dom.views import DOMElementNode, DOMTextNode, PageInfo, SelectorMap
+
+ELEMENT_NODE = 1
+
+# Roles the agent can act on
+AX_INTERACTIVE_ROLES = {
+	'button',
+	'link',
+	'textbox',
+	'searchbox',
+	'combobox',
+	'checkbox',
+	'radio',
+	'switch',
+	'slider',
+	'spinbutton',
+	'menuitem',
+	'menuitemcheckbox',
+	'menuitemradio',
+	'option',
+	'tab',
+	'treeitem',
+	'listbox',
+	'DisclosureTriangle',
+}
+# Text nodes, their name is the text
+AX_TEXT_ROLES = {'StaticText'}
+# Leaves whose name is their only content
+AX_NAMED_LEAF_ROLES = {'image', 'img'}
+# States written to the attributes of an element, under their ARIA name
+AX_STATES = ('checked', 'expanded', 'selected', 'pressed')
+# Elements that are part of every page, their AX nodes do not get a node of their own
+TRANSPARENT_TAGS = {'html', 'body'}
+
+
+class AccessibilityProcessor:
+	"""
+	Turns the results of Accessibility.getFullAXTree (one per frame, the main frame first) and
+	DOM.getDocument(depth=-1, pierce=True) into a tree of DOMElementNode for the text representation of the page.
+	"""
+
+	def __init__(self, ax_trees: list[list[dict]], document: dict):
+		self.ax_trees = [{node['nodeId']: node for node in nodes} for nodes in ax_trees]
+		self.document = document
+		# backend node id -> (tag name, xpath, attributes, has a shadow root, backend node id of the content document)
+		self.elements: dict[int, tuple[str, str, dict[str, str], bool, int | None]] = {}
+		self._index_document(document)
+
+		# Frame documents by the backend id of their document node
+		self.frame_roots: dict[int, tuple[int, dict]] = {}
+		self.roots: list[dict | None] = []
+		for tree_index, nodes in enumerate(self.ax_trees):
+			root = next((node for node in nodes.values() if not node.get('parentId')), None)
+			self.roots.append(root)
+			if root is not None and root.get('backendDOMNodeId') is not None:
+				self.frame_roots[root['backendDOMNodeId']] = (tree_index, root)
+
+	def page_info(self, layout_metrics: dict) -> PageInfo:
+		viewport = layout_metrics.get('cssLayoutViewport') or layout_metrics['layoutViewport']
+		visual_viewport = layout_metrics.get('cssVisualViewport') or layout_metrics.get('visualViewport', {})
+		content_size = layout_metrics.get('cssContentSize') or layout_metrics.get('contentSize', {})
+		root = self.roots[0] if self.roots else None
+		return PageInfo(
+			url=self.document.get('documentURL', ''),
+			title=_value(root.get('name')) if root else '',
+			scroll_y=int(visual_viewport.get('pageY', 0)),
+			viewport_width=int(viewport['clientWidth']),
+			viewport_height=int(viewport['clientHeight']),
+			scroll_height=int(content_size.get('height', 0)),
+		)
+
+	def build(self) -> tuple[DOMElementNode, SelectorMap]:
+		"""
+		Every interactive AX node gets a highlight index in document order, its accessible name is its text.
+		Nested interactive nodes are highlighted as well, like distinct interactions in buildDomTree.js.
+		"""
+		root = DOMElementNode(
+			tag_name='body', xpath='/body', attributes={}, children=[], is_visible=True, is_top_element=True, parent=None
+		)
+		selector_map: SelectorMap = {}
+		if not self.roots or self.roots[0] is None:
+			return root, selector_map
+
+		# (tree index, AX node id, parent node, the text of the nearest highlighted ancestor is its name, inside an editable)
+		stack: list[tuple[int, str, DOMElementNode, bool, bool]] = []
+		self._push_children(stack, 0, self.roots[0], root, False, False)
+		while stack:
+			tree_index, node_id, parent, named_text, in_editable = stack.pop()
+			ax_node = self.ax_trees[tree_index].get(node_id)
+			if ax_node is None:
+				continue
+
+			role = _value(ax_node.get('role'))
+			if role in AX_TEXT_ROLES:
+				name = _value(ax_node.get('name'))
+				if name and not named_text and not ax_node.get('ignored'):
+					parent.children.append(DOMTextNode(text=name, is_visible=True, parent=parent))
+				continue  # the inline text boxes below only split the text into lines
+
+			element = self.elements.get(ax_node.get('backendDOMNodeId'))
+			if ax_node.get('ignored') or element is None or element[0] in TRANSPARENT_TAGS:
+				self._push_children(stack, tree_index, ax_node, parent, named_text, in_editable)
+				continue
+
+			tag_name, xpath, dom_attributes, shadow_root, content_document = element
+			properties = {prop['name']: _value(prop.get('value')) for prop in ax_node.get('properties', [])}
+			node = DOMElementNode(
+				tag_name=tag_name,
+				xpath=xpath,
+				attributes=self._attributes(dom_attributes, ax_node, properties),
+				children=[],
+				is_visible=True,
+				is_top_element=True,
+				is_in_viewport=True,
+				shadow_root=shadow_root,
+				parent=parent,
+			)
+			parent.children.append(node)
+
+			name = _value(ax_node.get('name'))
+			if self._is_interactive(role, properties, in_editable):
+				node.is_interactive = True
+				node.highlight_index = len(selector_map)
+				node.backend_node_id = ax_node.get('backendDOMNodeId')
+				selector_map[node.highlight_index] = node
+				if name:
+					node.children.append(DOMTextNode(text=name, is_visible=True, parent=node))
+				named_text = True
+				if tag_name == 'select':
+					continue  # the options are read with get_dropdown_options, the name is the selected one
+			elif role in AX_NAMED_LEAF_ROLES and name and not named_text:
+				node.children.append(DOMTextNode(text=name, is_visible=True, parent=node))
+
+			in_editable = in_editable or bool(properties.get('editable'))
+			if tag_name == 'iframe' and not ax_node.get('childIds') and content_document in self.frame_roots:
+				frame_tree_index, frame_root = self.frame_roots[content_document]
+				self._push_children(stack, frame_tree_index, frame_root, node, named_text, in_editable)
+			else:
+				self._push_children(stack, tree_index, ax_node, node, named_text, in_editable)
+
+		return root, selector_map
+
+	@staticmethod
+	def _push_children(
+		stack: list, tree_index: int, ax_node: dict, parent: DOMElementNode, named_text: bool, in_editable: bool
+	) -> None:
+		stack.extend(
+			(tree_index, child_id, parent, named_text, in_editable) for child_id in reversed(ax_node.get('childIds', []))
+		)
+
+	@staticmethod
+	def _is_interactive(role: str, properties: dict, in_editable: bool) -> bool:
+		if properties.get('disabled'):
+			return False
+		if role in AX_INTERACTIVE_ROLES:
+			return True
+		# contenteditable hosts, their descendants are editable as well
+		return bool(properties.get('editable')) and not in_editable
+
+	@staticmethod
+	def _attributes(dom_attributes: dict[str, str], ax_node: dict, properties: dict) -> dict[str, str]:
+		"""The DOM attributes with the current value and states of the control"""
+		attributes = dict(dom_attributes)
+		value = _value(ax_node.get('value'))
+		if value not in (None, ''):
+			attributes['value'] = str(value)
+		for state in AX_STATES:
+			if state in properties and properties[state] not in (None, 'false', False):
+				attributes[f'aria-{state}'] = str(properties[state]).lower()
+		return attributes
+
+	def _index_document(self, document: dict) -> None:
+		"""XPaths of all elements, relative to their document or shadow root, the same paths buildDomTree.js builds"""
+		# (DOM node, its xpath if it is an element, None for shadow roots)
+		stack: list[tuple[dict, str | None]] = [(document, '')]
+		while stack:
+			node, xpath = stack.pop()
+			is_element = node.get('nodeType') == ELEMENT_NODE
+			if is_element:
+				content_document = node.get('contentDocument')
+				raw = node.get('attributes', [])
+				self.elements[node['backendNodeId']] = (
+					(node.get('localName') or node['nodeName']).lower(),
+					xpath,
+					{raw[i]: raw[i + 1] for i in range(0, len(raw) - 1, 2)},
+					bool(node.get('shadowRoots')),
+					content_document['backendNodeId'] if content_document else None,
+				)
+				# Shadow roots and frame documents start new paths
+				stack.extend((shadow_root, None) for shadow_root in node.get('shadowRoots', []))
+				if content_document:
+					stack.append((content_document, ''))
+
+			children = node.get('children', [])
+			counts: dict[str, int] = {}
+			for child in children:
+				if child.get('nodeType') == ELEMENT_NODE:
+					counts[child['nodeName']] = counts.get(child['nodeName'], 0) + 1
+			seen: dict[str, int] = {}
+			for child in children:
+				if child.get('nodeType') != ELEMENT_NODE:
+					continue  # text, comments and doctypes have no elements below them
+				name = child['nodeName']
+				seen[name] = seen.get(name, 0) + 1
+				segment = (child.get('localName') or name).lower()
+				if is_element and counts[name] > 1:
+					segment += f'[{seen[name]}]'
+				if xpath is None:
+					stack.append((child, ''))  # direct child of a shadow root, getXPathTree stops before it
+				else:
+					stack.append((child, f'{xpath}/{segment}' if xpath else segment))
+
+
+def _value(ax_value: dict | None):
+	return ax_value.get('value') if ax_value else None
@@ -4,10 +4,54 @@
     focusHighlightIndex: -1,
     viewportExpansion: 0,
     debugMode: false,
+    trackMutations: false,
+    incremental: false,
+    highlightOnly: null,
+    compactPayload: false,
+    removeHighlights: false,
+    includePageInfo: false,
+    spatialHitTesting: false,
+    stream: null,
+    streamNext: false,
+    deferHighlights: false,
+    drawDeferredHighlights: null,
+    highlightRects: null,
+    measureHighlights: false,
   }
 ) => {
   const { doHighlightElements, focusHighlightIndex, viewportExpansion, debugMode } = args;
+  const trackMutations = args.trackMutations || false;
+  const incremental = args.incremental || false;
+  const highlightOnly = args.highlightOnly || null;
+  const compactPayload = args.compactPayload || false;
+  const removeHighlights = args.removeHighlights || false;
+  const includePageInfo = args.includePageInfo || false;
+  // Streamed extraction: { sliceMs, maxNodes, maxTime }, see startStream
+  const streamOptions = args.stream || null;
+  const streamNext = args.streamNext || false;
+  const spatialHitTesting = (args.spatialHitTesting || false) && !streamOptions;
+  // Cross-origin frames are extracted separately, their overlays are drawn once Python knows
+  // the highlight index offset of the frame: { offset, focus }, see drawDeferredHighlights
+  const deferHighlights = args.deferHighlights || false;
+  const drawDeferredHighlights = args.drawDeferredHighlights || null;
+  // [[highlightIndex, [left, top, width, height]]] in viewport coordinates, for trees built outside of this script
+  const highlightRects = args.highlightRects || null;
+  // Record the rects of the highlights instead of drawing them, the page is not modified.
+  // Collected by the caller from MEASURED_HIGHLIGHTS_KEY, see CALL_BUILD_DOM_TREE_JS in service.py
+  const measureHighlights = args.measureHighlights || false;
+  const MEASURED_HIGHLIGHTS_KEY = "__browserUseMeasuredHighlights";
+  if (measureHighlights && !args.streamNext) delete window[MEASURED_HIGHLIGHTS_KEY];
   let highlightIndex = 0; // Reset highlight index
+  // Overlays are drawn during the walk, except for incremental walks where the
+  // final highlight indices are only known once Python has patched its tree
+  let drawHighlights = doHighlightElements && !deferHighlights;
+
+  // [highlightIndex, element, parentIframe] of the overlays left for a drawDeferredHighlights call
+  const DEFERRED_HIGHLIGHTS_KEY = "__browserUseDeferredHighlights";
+  const DEFERRED_HIGHLIGHTS = deferHighlights ? [] : null;
+  if (DEFERRED_HIGHLIGHTS) {
+    Object.defineProperty(window, DEFERRED_HIGHLIGHTS_KEY, { value: DEFERRED_HIGHLIGHTS, configurable: true, enumerable: false });
+  }
 
   // Add timing stack to handle recursion
   const TIMING_STACK = {
@@ -66,12 +110,24 @@
       domOperations: {
         getBoundingClientRect: 0,
         getComputedStyle: 0,
+        elementFromPoint: 0,
       },
       domOperationCounts: {
         getBoundingClientRect: 0,
         getComputedStyle: 0,
+        elementFromPoint: 0,
       }
-    }
+    },
+    spatialHitTesting: spatialHitTesting ? {
+      candidates: 0,
+      occluders: 0,
+      resolvedFromGrid: 0,
+      hitTests: 0,
+      gridCells: 0,
+      collectTime: 0,
+      gridTime: 0,
+      resolveTime: 0,
+    } : null,
   } : null;
 
   // Simple timing helper that only runs in debug mode
@@ -217,253 +273,450 @@
   // Add a WeakMap cache for XPath strings
   const xpathCache = new WeakMap();
 
-  // Initialize once and reuse
-  const viewportObserver = new IntersectionObserver(
-    (entries) => {
-      entries.forEach(entry => {
-        elementVisibilityMap.set(entry.target, entry.isIntersecting);
-      });
-    },
-    { rootMargin: `${viewportExpansion}px` }
-  );
-
   /**
-   * Highlights an element in the DOM and returns the index of the next element.
+   * Persistent mutation tracker used by incremental extraction.
+   *
+   * It lives on the window between calls (and is dropped on navigation together
+   * with the document), keeps a registry of every element that made it into the
+   * last tree, and records which parts of the DOM changed since the last walk.
    */
-  function highlightElement(element, index, parentIframe = null) {
-    pushTiming('highlighting');
-    
-    if (!element) return index;
+  const MUTATION_TRACKER_KEY = "__browserUseMutationTracker";
+  const MAX_DIRTY_NODES = 2000;
+
+  function getMutationTracker() {
+    let tracker = window[MUTATION_TRACKER_KEY];
+    if (tracker) return tracker;
+
+    tracker = {
+      nextId: 1,
+      ids: new WeakMap(), // element -> registry id
+      elements: new Map(), // registry id -> WeakRef(element)
+      contexts: new WeakMap(), // element -> { parentIframe, isParentHighlighted }
+      observedRoots: new WeakSet(),
+      dirtyNodes: new Set(),
+      addedElements: new Set(), // can cover elements outside of their subtree if they are positioned
+      dirtyAll: true, // nothing has been walked yet
+      scrollPosition: null, // [scrollX, scrollY, innerWidth, innerHeight] of the last walk
+      observer: null,
+      recordMutations: null,
+    };
 
-    // Store overlays and the single label for updating
-    const overlays = [];
-    let label = null;
-    let labelWidth = 20;
-    let labelHeight = 16;
-    let cleanupFn = null;
+    const markAllDirty = () => {
+      tracker.dirtyAll = true;
+      tracker.dirtyNodes.clear();
+      tracker.addedElements.clear();
+    };
 
-    try {
-      // Create or get highlight container
-      let container = document.getElementById(HIGHLIGHT_CONTAINER_ID);
-      if (!container) {
-        container = document.createElement("div");
-        container.id = HIGHLIGHT_CONTAINER_ID;
-        container.style.position = "fixed";
-        container.style.pointerEvents = "none";
-        container.style.top = "0";
-        container.style.left = "0";
-        container.style.width = "100%";
-        container.style.height = "100%";
-        container.style.zIndex = "2147483640";
-        container.style.backgroundColor = 'transparent';
-        document.body.appendChild(container);
+    tracker.recordMutations = (records) => {
+      if (tracker.dirtyAll) return;
+      for (const record of records) {
+        if (isHighlightMutation(record)) continue;
+        tracker.dirtyNodes.add(record.target);
+        for (const node of record.addedNodes) {
+          if (node.nodeType === Node.ELEMENT_NODE) tracker.addedElements.add(node);
+        }
       }
+      if (tracker.dirtyNodes.size + tracker.addedElements.size > MAX_DIRTY_NODES) markAllDirty();
+    };
+    tracker.observer = new MutationObserver(tracker.recordMutations);
 
-      // Get element client rects
-      const rects = element.getClientRects(); // Use getClientRects()
-
-      if (!rects || rects.length === 0) return index; // Exit if no rects
-
-      // Generate a color based on the index
-      const colors = [
-        "#FF0000",
-        "#00FF00",
-        "#0000FF",
-        "#FFA500",
-        "#800080",
-        "#008080",
-        "#FF69B4",
-        "#4B0082",
-        "#FF4500",
-        "#2E8B57",
-        "#DC143C",
-        "#4682B4",
-      ];
-      const colorIndex = index % colors.length;
-      const baseColor = colors[colorIndex];
-      const backgroundColor = baseColor + "1A"; // 10% opacity version of the color
-
-      // Get iframe offset if necessary
-      let iframeOffset = { x: 0, y: 0 };
-      if (parentIframe) {
-        const iframeRect = parentIframe.getBoundingClientRect(); // Keep getBoundingClientRect for iframe offset
-        iframeOffset.x = iframeRect.left;
-        iframeOffset.y = iframeRect.top;
-      }
+    // Scrolling and resizing change viewport/top-element state without touching the DOM. The events
+    // may not have fired yet for a scroll right before the walk, see collectDirtySubtreeRoots.
+    window.addEventListener("scroll", markAllDirty, { capture: true, passive: true });
+    window.addEventListener("resize", markAllDirty, { passive: true });
 
-      // Create fragment to hold overlay elements
-      const fragment = document.createDocumentFragment();
+    Object.defineProperty(window, MUTATION_TRACKER_KEY, {
+      value: tracker,
+      configurable: true,
+      enumerable: false,
+    });
+    return tracker;
+  }
 
-      // Create highlight overlays for each client rect
-      for (const rect of rects) {
-        if (rect.width === 0 || rect.height === 0) continue; // Skip empty rects
+  function isInsideHighlightContainer(node) {
+    let current = node;
+    while (current) {
+      if (current.id === HIGHLIGHT_CONTAINER_ID) return true;
+      current = current.parentNode;
+    }
+    return false;
+  }
+
+  // Our own overlays must not invalidate the tree they are drawn for
+  function isHighlightMutation(record) {
+    if (record.type === "attributes" && record.attributeName === "browser-user-highlight-id") {
+      return true;
+    }
+    if (isInsideHighlightContainer(record.target)) return true;
+    if (record.type === "childList") {
+      const changed = [...record.addedNodes, ...record.removedNodes];
+      return changed.length > 0 && changed.every((n) => n.id === HIGHLIGHT_CONTAINER_ID);
+    }
+    return false;
+  }
 
-        const overlay = document.createElement("div");
-        overlay.style.position = "fixed";
-        overlay.style.border = `2px solid ${baseColor}`;
-        overlay.style.backgroundColor = backgroundColor;
-        overlay.style.pointerEvents = "none";
-        overlay.style.boxSizing = "border-box";
+  function observeMutationRoot(tracker, root) {
+    if (!tracker || !root || tracker.observedRoots.has(root)) return;
+    try {
+      tracker.observer.observe(root, {
+        subtree: true,
+        childList: true,
+        attributes: true,
+        characterData: true,
+      });
+      tracker.observedRoots.add(root);
+    } catch (e) {
+      console.warn("Unable to observe mutations:", e);
+    }
+  }
 
-        const top = rect.top + iframeOffset.y;
-        const left = rect.left + iframeOffset.x;
+  function registerElement(tracker, element, parentIframe, isParentHighlighted) {
+    let registryId = tracker.ids.get(element);
+    if (registryId === undefined) {
+      registryId = tracker.nextId++;
+      tracker.ids.set(element, registryId);
+    }
+    tracker.elements.set(registryId, new WeakRef(element));
+    tracker.contexts.set(element, { parentIframe, isParentHighlighted });
+    return registryId;
+  }
 
-        overlay.style.top = `${top}px`;
-        overlay.style.left = `${left}px`;
-        overlay.style.width = `${rect.width}px`;
-        overlay.style.height = `${rect.height}px`;
+  function lookupRegisteredElement(tracker, registryId) {
+    const ref = tracker.elements.get(registryId);
+    const element = ref ? ref.deref() : null;
+    return element && element.isConnected ? element : null;
+  }
 
-        fragment.appendChild(overlay);
-        overlays.push({ element: overlay, initialRect: rect }); // Store overlay and its rect
+  /**
+   * References to the elements that got a highlight index, kept on the window between calls.
+   *
+   * Actions resolve the element of an index by its reference (see RESOLVE_ELEMENT_REF_JS in
+   * service.py) instead of querying the page again with a selector. An element keeps its
+   * reference across walks, and the registry only holds weak references to the elements.
+   */
+  const ELEMENT_REFS_KEY = "__browserUseElementRefs";
+
+  function registerElementRef(element) {
+    let refs = window[ELEMENT_REFS_KEY];
+    if (!refs) {
+      // Ids start at a random offset, so a reference from an earlier document never resolves to an element of this one
+      refs = { nextId: Math.floor(Math.random() * 2 ** 31) * 2 ** 20 + 1, ids: new WeakMap(), elements: new Map() };
+      Object.defineProperty(window, ELEMENT_REFS_KEY, { value: refs, configurable: true, enumerable: false });
+    }
+    let ref = refs.ids.get(element);
+    if (ref === undefined) {
+      ref = refs.nextId++;
+      refs.ids.set(element, ref);
+    }
+    if (!refs.elements.has(ref)) refs.elements.set(ref, new WeakRef(element));
+    return ref;
+  }
+
+  // A full walk registers all current elements again, references of removed ones would only pile up
+  function pruneElementRefs() {
+    const refs = window[ELEMENT_REFS_KEY];
+    if (!refs) return;
+    for (const [ref, weakRef] of refs.elements) {
+      const element = weakRef.deref();
+      if (!element || !element.isConnected) refs.elements.delete(ref);
+    }
+  }
+
+  // Parent lookup that steps out of shadow roots and same-origin iframe documents
+  function getParentAcrossBoundaries(node) {
+    if (node.parentNode) {
+      if (node.parentNode instanceof ShadowRoot) return node.parentNode.host;
+      if (node.parentNode.nodeType === Node.DOCUMENT_NODE) {
+        const frame = node.parentNode.defaultView ? node.parentNode.defaultView.frameElement : null;
+        return frame || null;
       }
+      return node.parentNode;
+    }
+    if (node instanceof ShadowRoot) return node.host;
+    return null;
+  }
 
-      // Create and position a single label relative to the first rect
-      const firstRect = rects[0];
-      label = document.createElement("div");
-      label.className = "playwright-highlight-label";
-      label.style.position = "fixed";
-      label.style.background = baseColor;
-      label.style.color = "white";
-      label.style.padding = "1px 4px";
-      label.style.borderRadius = "4px";
-      label.style.fontSize = `${Math.min(12, Math.max(8, firstRect.height / 2))}px`;
-      label.textContent = index;
-
-      labelWidth = label.offsetWidth > 0 ? label.offsetWidth : labelWidth; // Update actual width if possible
-      labelHeight = label.offsetHeight > 0 ? label.offsetHeight : labelHeight; // Update actual height if possible
-
-      const firstRectTop = firstRect.top + iframeOffset.y;
-      const firstRectLeft = firstRect.left + iframeOffset.x;
-
-      let labelTop = firstRectTop + 2;
-      let labelLeft = firstRectLeft + firstRect.width - labelWidth - 2;
-
-      // Adjust label position if first rect is too small
-      if (firstRect.width < labelWidth + 4 || firstRect.height < labelHeight + 4) {
-        labelTop = firstRectTop - labelHeight - 2;
-        labelLeft = firstRectLeft + firstRect.width - labelWidth; // Align with right edge
-        if (labelLeft < iframeOffset.x) labelLeft = firstRectLeft; // Prevent going off-left
+  function nearestRegisteredElement(tracker, node) {
+    let current = node;
+    while (current) {
+      if (current.nodeType === Node.ELEMENT_NODE && current.isConnected && tracker.ids.has(current)) {
+        return current;
       }
+      current = getParentAcrossBoundaries(current);
+    }
+    return null;
+  }
+
+  /**
+   * Resolves the recorded mutations to the smallest set of registered elements
+   * whose subtrees have to be walked again. Returns null if a full walk is needed.
+   */
+  function collectDirtySubtreeRoots(tracker) {
+    if (tracker.dirtyAll) return null;
+    if (!tracker.scrollPosition || currentScrollPosition().some((value, i) => value !== tracker.scrollPosition[i])) {
+      return null;
+    }
+    // Positioned elements (overlays, dialogs, dropdowns) can cover elements anywhere on the page
+    for (const element of tracker.addedElements) {
+      if (!element.isConnected) continue;
+      const position = getCachedComputedStyle(element)?.position;
+      if (position === 'fixed' || position === 'absolute' || position === 'sticky') return null;
+    }
 
-      // Ensure label stays within viewport bounds slightly better
-      labelTop = Math.max(0, Math.min(labelTop, window.innerHeight - labelHeight));
-      labelLeft = Math.max(0, Math.min(labelLeft, window.innerWidth - labelWidth));
+    const candidates = new Set();
+    for (const node of tracker.dirtyNodes) {
+      // Attribute changes on <html> (themes, layout classes) can restyle the whole page
+      if (node === document.documentElement) return null;
+      const element = nearestRegisteredElement(tracker, node);
+      if (element) candidates.add(element);
+    }
 
+    const roots = [];
+    for (const element of candidates) {
+      let ancestor = getParentAcrossBoundaries(element);
+      let covered = false;
+      while (ancestor) {
+        if (candidates.has(ancestor)) {
+          covered = true;
+          break;
+        }
+        ancestor = getParentAcrossBoundaries(ancestor);
+      }
+      if (covered) continue;
+      // The root itself changed, nothing to gain from an incremental walk
+      if (element === document.body || !tracker.contexts.has(element)) return null;
+      roots.push(element);
+    }
+    return roots;
+  }
 
-      label.style.top = `${labelTop}px`;
-      label.style.left = `${labelLeft}px`;
+  function currentScrollPosition() {
+    return [window.scrollX, window.scrollY, window.innerWidth, window.innerHeight];
+  }
+
+  // Initialize once and reuse
+  const viewportObserver = new IntersectionObserver(
+    (entries) => {
+      entries.forEach(entry => {
+        elementVisibilityMap.set(entry.target, entry.isIntersecting);
+      });
+    },
+    { rootMargin: `${viewportExpansion}px` }
+  );
 
-      fragment.appendChild(label);
+  const HIGHLIGHT_LAYER_KEY = "__browserUseHighlightLayer";
+  const HIGHLIGHT_COLORS = [
+    "#FF0000",
+    "#00FF00",
+    "#0000FF",
+    "#FFA500",
+    "#800080",
+    "#008080",
+    "#FF69B4",
+    "#4B0082",
+    "#FF4500",
+    "#2E8B57",
+    "#DC143C",
+    "#4682B4",
+  ];
+  const HIGHLIGHT_LABEL_WIDTH = 20;
+  const HIGHLIGHT_LABEL_HEIGHT = 16;
 
-      // Update positions on scroll/resize
-      const updatePositions = () => {
-        const newRects = element.getClientRects(); // Get fresh rects
-        let newIframeOffset = { x: 0, y: 0 };
+  /**
+   * Returns the overlay layer of the document, created on first use.
+   *
+   * All highlights share one container and one scroll and one resize listener. Moving the
+   * overlays is batched into one update per animation frame, which reads the rects of all
+   * highlighted elements before it writes any style. destroy() removes the listeners and the
+   * container, cleanupHighlights and BrowserContext.remove_highlights call it.
+   */
+  function getHighlightLayer() {
+    let layer = window[HIGHLIGHT_LAYER_KEY];
+    if (layer && layer.container.isConnected) return layer;
+    if (layer) layer.destroy(); // the container was removed from the page
+
+    const container = document.createElement("div");
+    container.id = HIGHLIGHT_CONTAINER_ID;
+    container.style.position = "fixed";
+    container.style.pointerEvents = "none";
+    container.style.top = "0";
+    container.style.left = "0";
+    container.style.width = "100%";
+    container.style.height = "100%";
+    container.style.zIndex = "2147483640";
+    container.style.backgroundColor = 'transparent';
+    document.body.appendChild(container);
+
+    const highlights = [];
+    let frame = null;
+    const update = () => {
+      frame = null;
+      const tracked = highlights.filter((highlight) => highlight.element);
+      const rects = tracked.map(readHighlightRects);
+      tracked.forEach((highlight, i) => positionHighlight(highlight, rects[i]));
+    };
+    const scheduleUpdate = () => {
+      if (frame === null) frame = requestAnimationFrame(update);
+    };
+    window.addEventListener("scroll", scheduleUpdate, true);
+    window.addEventListener("resize", scheduleUpdate);
+
+    layer = {
+      container,
+      highlights,
+      destroy() {
+        window.removeEventListener("scroll", scheduleUpdate, true);
+        window.removeEventListener("resize", scheduleUpdate);
+        if (frame !== null) cancelAnimationFrame(frame);
+        container.remove();
+        highlights.length = 0;
+        if (window[HIGHLIGHT_LAYER_KEY] === layer) delete window[HIGHLIGHT_LAYER_KEY];
+      },
+    };
+    window[HIGHLIGHT_LAYER_KEY] = layer;
+    return layer;
+  }
 
-        if (parentIframe) {
-          const iframeRect = parentIframe.getBoundingClientRect(); // Keep getBoundingClientRect for iframe
-          newIframeOffset.x = iframeRect.left;
-          newIframeOffset.y = iframeRect.top;
-        }
+  /**
+   * Current client rects of a highlighted element as [left, top, width, height] in the
+   * coordinates of the top document.
+   */
+  function readHighlightRects(highlight) {
+    let offsetX = 0;
+    let offsetY = 0;
+    if (highlight.parentIframe) {
+      const iframeRect = highlight.parentIframe.getBoundingClientRect();
+      offsetX = iframeRect.left;
+      offsetY = iframeRect.top;
+    }
+    const rects = Array.from(highlight.element.getClientRects(), (rect) => [
+      rect.left + offsetX,
+      rect.top + offsetY,
+      rect.width,
+      rect.height,
+    ]);
+    rects.offsetX = offsetX;
+    return rects;
+  }
 
-        // Update each overlay
-        overlays.forEach((overlayData, i) => {
-          if (i < newRects.length) { // Check if rect still exists
-            const newRect = newRects[i];
-            const newTop = newRect.top + newIframeOffset.y;
-            const newLeft = newRect.left + newIframeOffset.x;
-
-            overlayData.element.style.top = `${newTop}px`;
-            overlayData.element.style.left = `${newLeft}px`;
-            overlayData.element.style.width = `${newRect.width}px`;
-            overlayData.element.style.height = `${newRect.height}px`;
-            overlayData.element.style.display = (newRect.width === 0 || newRect.height === 0) ? 'none' : 'block';
-          } else {
-            // If fewer rects now, hide extra overlays
-            overlayData.element.style.display = 'none';
-          }
-        });
+  /**
+   * Adds the overlays and the index label of one highlight to the layer. `element` is null for
+   * static highlights, which are not moved on scroll.
+   */
+  function addHighlight(index, rects, element = null, parentIframe = null) {
+    const layer = getHighlightLayer();
+    const color = HIGHLIGHT_COLORS[index % HIGHLIGHT_COLORS.length];
+
+    const label = document.createElement("div");
+    label.className = "playwright-highlight-label";
+    label.style.position = "fixed";
+    label.style.background = color;
+    label.style.color = "white";
+    label.style.padding = "1px 4px";
+    label.style.borderRadius = "4px";
+    label.style.fontSize = `${Math.min(12, Math.max(8, rects[0][3] / 2))}px`;
+    label.textContent = index;
+
+    const highlight = { element, parentIframe, color, container: layer.container, overlays: [], label };
+    positionHighlight(highlight, rects);
+    layer.container.appendChild(label);
+    layer.highlights.push(highlight);
+  }
 
-        // If there are fewer new rects than overlays, hide the extras
-        if (newRects.length < overlays.length) {
-          for (let i = newRects.length; i < overlays.length; i++) {
-            overlays[i].element.style.display = 'none';
-          }
-        }
+  /**
+   * Moves the overlays and the label of a highlight to the given rects, one overlay per rect.
+   */
+  function positionHighlight(highlight, rects) {
+    const { overlays, label } = highlight;
+    while (overlays.length < rects.length) {
+      const overlay = document.createElement("div");
+      overlay.style.position = "fixed";
+      overlay.style.border = `2px solid ${highlight.color}`;
+      overlay.style.backgroundColor = highlight.color + "1A"; // 10% opacity version of the color
+      overlay.style.pointerEvents = "none";
+      overlay.style.boxSizing = "border-box";
+      highlight.container.insertBefore(overlay, label.parentNode ? label : null);
+      overlays.push(overlay);
+    }
 
-        // Update label position based on the first new rect
-        if (label && newRects.length > 0) {
-          const firstNewRect = newRects[0];
-          const firstNewRectTop = firstNewRect.top + newIframeOffset.y;
-          const firstNewRectLeft = firstNewRect.left + newIframeOffset.x;
+    overlays.forEach((overlay, i) => {
+      const rect = rects[i];
+      if (!rect || rect[2] === 0 || rect[3] === 0) {
+        overlay.style.display = 'none';
+        return;
+      }
+      const [left, top, width, height] = rect;
+      overlay.style.top = `${top}px`;
+      overlay.style.left = `${left}px`;
+      overlay.style.width = `${width}px`;
+      overlay.style.height = `${height}px`;
+      overlay.style.display = 'block';
+    });
 
-          let newLabelTop = firstNewRectTop + 2;
-          let newLabelLeft = firstNewRectLeft + firstNewRect.width - labelWidth - 2;
+    if (rects.length === 0) {
+      label.style.display = 'none'; // Hide label if element has no rects anymore
+      return;
+    }
+    // Position the label relative to the first rect
+    const [left, top, width, height] = rects[0];
+    let labelTop = top + 2;
+    let labelLeft = left + width - HIGHLIGHT_LABEL_WIDTH - 2;
+
+    // Adjust label position if first rect is too small
+    if (width < HIGHLIGHT_LABEL_WIDTH + 4 || height < HIGHLIGHT_LABEL_HEIGHT + 4) {
+      labelTop = top - HIGHLIGHT_LABEL_HEIGHT - 2;
+      labelLeft = left + width - HIGHLIGHT_LABEL_WIDTH; // Align with right edge
+      if (labelLeft < (rects.offsetX || 0)) labelLeft = left; // Prevent going off-left
+    }
 
-          if (firstNewRect.width < labelWidth + 4 || firstNewRect.height < labelHeight + 4) {
-            newLabelTop = firstNewRectTop - labelHeight - 2;
-            newLabelLeft = firstNewRectLeft + firstNewRect.width - labelWidth;
-            if (newLabelLeft < newIframeOffset.x) newLabelLeft = firstNewRectLeft;
-          }
+    // Ensure label stays within viewport bounds
+    labelTop = Math.max(0, Math.min(labelTop, window.innerHeight - HIGHLIGHT_LABEL_HEIGHT));
+    labelLeft = Math.max(0, Math.min(labelLeft, window.innerWidth - HIGHLIGHT_LABEL_WIDTH));
 
-          // Ensure label stays within viewport bounds
-          newLabelTop = Math.max(0, Math.min(newLabelTop, window.innerHeight - labelHeight));
-          newLabelLeft = Math.max(0, Math.min(newLabelLeft, window.innerWidth - labelWidth));
+    label.style.top = `${labelTop}px`;
+    label.style.left = `${labelLeft}px`;
+    label.style.display = 'block';
+  }
 
-          label.style.top = `${newLabelTop}px`;
-          label.style.left = `${newLabelLeft}px`;
-          label.style.display = 'block';
-        } else if (label) {
-          // Hide label if element has no rects anymore
-          label.style.display = 'none';
-        }
-      };
+  /**
+   * Highlights an element in the DOM and returns the index of the next element.
+   */
+  function highlightElement(element, index, parentIframe = null) {
+    if (!element) return index;
 
-      const throttleFunction = (func, delay) => {
-        let lastCall = 0;
-        return (...args) => {
-          const now = performance.now();
-          if (now - lastCall < delay) return;
-          lastCall = now;
-          return func(...args);
-        };
-      };
+    pushTiming('highlighting');
+    try {
+      const highlight = { element, parentIframe };
+      const rects = readHighlightRects(highlight);
+      if (rects.length === 0) return index; // Exit if no rects
 
-      const throttledUpdatePositions = throttleFunction(updatePositions, 16); // ~60fps
-      window.addEventListener('scroll', throttledUpdatePositions, true);
-      window.addEventListener('resize', throttledUpdatePositions);
-      
-      // Add cleanup function
-      cleanupFn = () => {
-        window.removeEventListener('scroll', throttledUpdatePositions, true);
-        window.removeEventListener('resize', throttledUpdatePositions);
-        // Remove overlay elements if needed
-        overlays.forEach(overlay => overlay.element.remove());
-        if (label) label.remove();
-      };
-      
-      // Then add fragment to container in one operation
-      container.appendChild(fragment);
-      
+      if (measureHighlights) measureHighlight(index, rects);
+      else addHighlight(index, rects, element, parentIframe);
       return index + 1;
     } finally {
       popTiming('highlighting');
-      // Store cleanup function for later use
-      if (cleanupFn) {
-        // Keep a reference to cleanup functions in a global array
-        (window._highlightCleanupFunctions = window._highlightCleanupFunctions || []).push(cleanupFn);
-      }
     }
   }
 
-  // Add this function to perform cleanup when needed
+  /**
+   * Draws a static highlight for a rect that was measured outside of this script (DOMSnapshot
+   * extraction). Nothing to keep in sync, the highlights are replaced on the next step anyway.
+   */
+  function highlightRect(index, rect) {
+    if (rect[2] === 0 || rect[3] === 0) return;
+    if (measureHighlights) measureHighlight(index, [rect]);
+    else addHighlight(index, [rect]);
+  }
+
+  function measureHighlight(index, rects) {
+    (window[MEASURED_HIGHLIGHTS_KEY] = window[MEASURED_HIGHLIGHTS_KEY] || []).push([index, rects.map((rect) => [...rect])]);
+  }
+
   function cleanupHighlights() {
-    if (window._highlightCleanupFunctions && window._highlightCleanupFunctions.length) {
-      window._highlightCleanupFunctions.forEach(fn => fn());
-      window._highlightCleanupFunctions = [];
-    }
-    
-    // Also remove the container
+    const layer = window[HIGHLIGHT_LAYER_KEY];
+    if (layer) layer.destroy();
+
+    // Also remove a container the layer does not know about
     const container = document.getElementById(HIGHLIGHT_CONTAINER_ID);
     if (container) container.remove();
   }
@@ -518,6 +771,40 @@
     return result;
   }
 
+  /**
+   * Fills the xpath cache for all element children of `parent` (an element, shadow root or document)
+   * in one pass over them, so the walk extends the path of the parent instead of climbing the
+   * ancestors and counting the siblings of every element. Same paths as getXPathTree.
+   */
+  function cacheChildXPaths(parent) {
+    const children = parent.children;
+    if (!children || children.length === 0) return;
+
+    if (parent instanceof ShadowRoot) {
+      // The path restarts below a shadow root, its direct children have an empty one
+      for (const child of children) xpathCache.set(child, "");
+      return;
+    }
+    const prefix = parent.nodeType === Node.ELEMENT_NODE ? getXPathTree(parent, true) : "";
+
+    const counts = new Map();
+    const tagNames = new Array(children.length);
+    for (let i = 0; i < children.length; i++) {
+      const tagName = children[i].nodeName.toLowerCase();
+      tagNames[i] = tagName;
+      counts.set(tagName, (counts.get(tagName) || 0) + 1);
+    }
+    const positions = new Map();
+    for (let i = 0; i < children.length; i++) {
+      const tagName = tagNames[i];
+      const position = (positions.get(tagName) || 0) + 1;
+      positions.set(tagName, position);
+      // Only elements of a parent element are numbered, see getElementPosition
+      const segment = parent.nodeType === Node.ELEMENT_NODE && counts.get(tagName) > 1 ? `${tagName}[${position}]` : tagName;
+      xpathCache.set(children[i], prefix ? `${prefix}/${segment}` : segment);
+    }
+  }
+
   /**
    * Checks if a text node is visible.
    */
@@ -921,7 +1208,10 @@
     const centerY = rects[Math.floor(rects.length / 2)].top + rects[Math.floor(rects.length / 2)].height / 2;
 
     try {
-      const topEl = document.elementFromPoint(centerX, centerY);
+      const topEl = measureDomOperation(
+        () => document.elementFromPoint(centerX, centerY),
+        'elementFromPoint'
+      );
       if (!topEl) return false;
 
       let current = topEl;
@@ -1128,9 +1418,19 @@
       // regardless of viewport status
       if (nodeData.isInViewport || viewportExpansion === -1) {
         nodeData.highlightIndex = highlightIndex++;
+        nodeData.ref = registerElementRef(node);
+        // Box in viewport coordinates, for clicks at the element's centre (see DomService.click_point).
+        // Boxes of elements in iframes would be relative to their frame, actions locate those instead
+        if (!parentIframe) {
+          const rect = getCachedBoundingRect(node);
+          if (rect) nodeData.rect = [rect.left, rect.top, rect.width, rect.height].map(Math.round);
+        }
 
         if (doHighlightElements) {
-          if (focusHighlightIndex >= 0) {
+          if (!drawHighlights) {
+            // Overlay is drawn later, but nested elements must behave as if it was
+            if (DEFERRED_HIGHLIGHTS) DEFERRED_HIGHLIGHTS.push([nodeData.highlightIndex, node, parentIframe]);
+          } else if (focusHighlightIndex >= 0) {
             if (focusHighlightIndex === nodeData.highlightIndex) {
               highlightElement(node, nodeData.highlightIndex, parentIframe);
             }
@@ -1150,6 +1450,244 @@
   /**
    * Creates a node data object for a given node and its descendants.
    */
+  const mutationTracker = trackMutations ? getMutationTracker() : null;
+
+  // How a child inherits isParentHighlighted, mirrors the arguments buildDomTree passes to its children
+  const CHILD_INHERITS_NOTHING = 0; // iframe content and children of body
+  const CHILD_INHERITS_OWN = 1; // shadow DOM and rich text editor content: only the parent's own highlight
+  const CHILD_INHERITS_ALL = 2; // regular children: parent's highlight or any highlighted ancestor
+
+  // With spatialHitTesting, nodeData -> { node, parentIframe, childInheritance } of every walked element
+  const DEFERRED_ELEMENTS = spatialHitTesting ? new Map() : null;
+  // With spatialHitTesting, rendered elements the walk skips (svg) that can still cover walked ones
+  const SKIPPED_OCCLUDERS = spatialHitTesting ? [] : null;
+
+  function addChild(nodeData, childId, inheritance) {
+    nodeData.children.push(childId);
+    if (DEFERRED_ELEMENTS) DEFERRED_ELEMENTS.get(nodeData).childInheritance.push(inheritance);
+  }
+
+  function walkChild(nodeData, child, parentIframe, isParentHighlighted, inheritance) {
+    if (STREAM && (STREAM.deferring || isStreamSliceOver(STREAM))) {
+      // Out of time for this slice: the child becomes a unit of its own, walked in a later slice
+      STREAM.deferring = true;
+      STREAM.deferred.push({ parentData: nodeData, node: child, parentIframe, isParentHighlighted });
+      STREAM.deferredParents.add(nodeData);
+      return;
+    }
+    const childId = buildDomTree(child, parentIframe, isParentHighlighted);
+    if (childId) addChild(nodeData, childId, inheritance);
+  }
+
+  /**
+   * Batched replacement for calling isTopElement during the walk.
+   *
+   * The rects of all walked elements are bucketed into a grid over the viewport. An element whose
+   * center point is not covered by any other element (ancestors and descendants aside) is on top
+   * without asking the browser. Only the ambiguous ones (overlapping siblings, overlays, clipped or
+   * pointer-events: none elements, shadow DOM) fall back to the elementFromPoint hit-test of
+   * isTopElement. Returns the set of nodeData objects that are top elements.
+   *
+   * The grid only knows the walked elements. When only some subtrees were walked (incremental
+   * extraction), anything outside of them may cover their elements, so all of them are hit-tested.
+   */
+  function resolveTopElements(roots, partial) {
+    const metrics = debugMode ? PERF_METRICS.spatialHitTesting : null;
+    let start = debugMode ? performance.now() : 0;
+    const topElements = new Set();
+    const viewportWidth = window.innerWidth;
+    const viewportHeight = window.innerHeight;
+
+    const hitTest = (nodeData, node) => {
+      if (metrics) metrics.hitTests++;
+      if (isTopElement(node)) topElements.add(nodeData);
+    };
+
+    // Collect the center points to check, with the clip rect of overflow containers on the way down
+    const pending = [];
+    const stack = roots.map(([id]) => [id, null]);
+    while (stack.length) {
+      const [id, parentClip] = stack.pop();
+      const nodeData = DOM_HASH_MAP[id];
+      const deferred = DEFERRED_ELEMENTS.get(nodeData);
+      if (!deferred) continue; // text node
+
+      const node = deferred.node;
+      const inMainDocument = node.ownerDocument === document;
+      let clip = parentClip;
+      if (inMainDocument && node !== document.body) {
+        const style = getCachedComputedStyle(node);
+        if (style && style.position === 'fixed') {
+          clip = null;
+        }
+        if (style && (style.overflowX !== 'visible' || style.overflowY !== 'visible')) {
+          const rect = getCachedBoundingRect(node);
+          if (rect) {
+            clip = clip ? {
+              left: Math.max(clip.left, rect.left),
+              top: Math.max(clip.top, rect.top),
+              right: Math.min(clip.right, rect.right),
+              bottom: Math.min(clip.bottom, rect.bottom),
+            } : { left: rect.left, top: rect.top, right: rect.right, bottom: rect.bottom };
+          }
+        }
+      }
+      for (const childId of nodeData.children) stack.push([childId, inMainDocument ? clip : null]);
+
+      if (!nodeData.isVisible) continue;
+      if (metrics) metrics.candidates++;
+
+      // Same early outs as isTopElement
+      if (viewportExpansion === -1) {
+        topElements.add(nodeData);
+        continue;
+      }
+      const rects = getCachedClientRects(node);
+      if (!rects || rects.length === 0) continue;
+      let isAnyRectInViewport = false;
+      for (const rect of rects) {
+        if (rect.width > 0 && rect.height > 0 && !(
+          rect.bottom < -viewportExpansion ||
+          rect.top > viewportHeight + viewportExpansion ||
+          rect.right < -viewportExpansion ||
+          rect.left > viewportWidth + viewportExpansion
+        )) {
+          isAnyRectInViewport = true;
+          break;
+        }
+      }
+      if (!isAnyRectInViewport) continue;
+      if (!inMainDocument) {
+        topElements.add(nodeData);
+        continue;
+      }
+
+      const middle = rects[Math.floor(rects.length / 2)];
+      const x = middle.left + middle.width / 2;
+      const y = middle.top + middle.height / 2;
+      const style = getCachedComputedStyle(node);
+      if (
+        partial ||
+        node.getRootNode() instanceof ShadowRoot ||
+        (style && style.pointerEvents === 'none') ||
+        x < 0 || y < 0 || x >= viewportWidth || y >= viewportHeight ||
+        (clip && (x < clip.left || x >= clip.right || y < clip.top || y >= clip.bottom))
+      ) {
+        hitTest(nodeData, node);
+        continue;
+      }
+      pending.push([nodeData, node, x, y]);
+    }
+
+    if (metrics) {
+      metrics.collectTime += performance.now() - start;
+      start = performance.now();
+    }
+
+    // Grid of everything that can receive a hit-test, in viewport coordinates
+    const CELL_SIZE = 128;
+    const columns = Math.max(1, Math.ceil(viewportWidth / CELL_SIZE));
+    const rows = Math.max(1, Math.ceil(viewportHeight / CELL_SIZE));
+    const grid = new Array(columns * rows);
+    const occluderNodes = [];
+    for (const [nodeData, deferred] of DEFERRED_ELEMENTS) {
+      if (nodeData.isVisible && deferred.node.ownerDocument === document) occluderNodes.push(deferred.node);
+    }
+    for (const node of SKIPPED_OCCLUDERS) {
+      // No offsetWidth on svg elements, the rect is checked below
+      const style = node.ownerDocument === document ? getCachedComputedStyle(node) : null;
+      if (style && style.visibility !== 'hidden' && style.display !== 'none') occluderNodes.push(node);
+    }
+    for (const node of occluderNodes) {
+      const style = getCachedComputedStyle(node);
+      if (style && style.pointerEvents === 'none') continue;
+      const rect = getCachedBoundingRect(node);
+      if (!rect || rect.width <= 0 || rect.height <= 0) continue;
+      if (rect.right <= 0 || rect.bottom <= 0 || rect.left >= viewportWidth || rect.top >= viewportHeight) continue;
+
+      const occluder = { node, rect };
+      const firstColumn = Math.max(0, Math.floor(rect.left / CELL_SIZE));
+      const lastColumn = Math.min(columns - 1, Math.floor(rect.right / CELL_SIZE));
+      const firstRow = Math.max(0, Math.floor(rect.top / CELL_SIZE));
+      const lastRow = Math.min(rows - 1, Math.floor(rect.bottom / CELL_SIZE));
+      for (let row = firstRow; row <= lastRow; row++) {
+        for (let column = firstColumn; column <= lastColumn; column++) {
+          const cell = row * columns + column;
+          (grid[cell] || (grid[cell] = [])).push(occluder);
+        }
+      }
+      if (metrics) metrics.occluders++;
+    }
+
+    if (metrics) {
+      metrics.gridCells = grid.filter(Boolean).length;
+      metrics.gridTime += performance.now() - start;
+      start = performance.now();
+    }
+
+    for (const [nodeData, node, x, y] of pending) {
+      const cell = grid[Math.floor(y / CELL_SIZE) * columns + Math.floor(x / CELL_SIZE)] || [];
+      let covered = false;
+      for (const occluder of cell) {
+        const rect = occluder.rect;
+        if (occluder.node === node || x < rect.left || x >= rect.right || y < rect.top || y >= rect.bottom) continue;
+        if (occluder.node.contains(node) || node.contains(occluder.node)) continue;
+        covered = true;
+        break;
+      }
+      if (covered) {
+        hitTest(nodeData, node);
+      } else {
+        topElements.add(nodeData);
+        if (metrics) metrics.resolvedFromGrid++;
+      }
+    }
+
+    if (metrics) metrics.resolveTime += performance.now() - start;
+    return topElements;
+  }
+
+  /**
+   * Second half of the walk in spatialHitTesting mode: occlusion for all elements at once, then
+   * interactivity and highlighting in document order, exactly like buildDomTree would have done.
+   * roots: [[nodeId, isParentHighlighted]] of the walked (sub)trees, partial if not the whole document.
+   */
+  function resolveDeferredElements(roots, partial = false) {
+    const topElements = resolveTopElements(roots, partial);
+
+    const stack = roots.slice().reverse();
+    while (stack.length) {
+      const [id, isParentHighlighted] = stack.pop();
+      const nodeData = DOM_HASH_MAP[id];
+      const deferred = DEFERRED_ELEMENTS.get(nodeData);
+      if (!deferred) continue; // text node
+
+      const node = deferred.node;
+      if (mutationTracker) {
+        const context = mutationTracker.contexts.get(node);
+        if (context) context.isParentHighlighted = isParentHighlighted;
+      }
+
+      let nodeWasHighlighted = false;
+      if (nodeData.isVisible) {
+        nodeData.isTopElement = topElements.has(nodeData);
+        if (nodeData.isTopElement) {
+          nodeData.isInteractive = isInteractiveElement(node);
+          nodeWasHighlighted = handleHighlighting(nodeData, node, deferred.parentIframe, isParentHighlighted);
+        }
+      }
+
+      for (let i = nodeData.children.length - 1; i >= 0; i--) {
+        const inheritance = deferred.childInheritance[i];
+        const childIsParentHighlighted =
+          inheritance === CHILD_INHERITS_NOTHING ? false :
+          inheritance === CHILD_INHERITS_OWN ? nodeWasHighlighted :
+          nodeWasHighlighted || isParentHighlighted;
+        stack.push([nodeData.children[i], childIsParentHighlighted]);
+      }
+    }
+  }
+
   function buildDomTree(node, parentIframe = null, isParentHighlighted = false) {
     // Fast rejection checks first
     if (!node || node.id === HIGHLIGHT_CONTAINER_ID || 
@@ -1173,15 +1711,22 @@
         xpath: '/body',
         children: [],
       };
+      if (mutationTracker) {
+        nodeData.registryId = registerElement(mutationTracker, node, parentIframe, isParentHighlighted);
+      }
+      if (DEFERRED_ELEMENTS) {
+        DEFERRED_ELEMENTS.set(nodeData, { node, parentIframe, childInheritance: [] });
+      }
 
       // Process children of body
+      cacheChildXPaths(node);
       for (const child of node.childNodes) {
-        const domElement = buildDomTree(child, parentIframe, false); // Body's children have no highlighted parent initially
-        if (domElement) nodeData.children.push(domElement);
+        walkChild(nodeData, child, parentIframe, false, CHILD_INHERITS_NOTHING); // Body's children have no highlighted parent initially
       }
 
       const id = `${ID.current++}`;
       DOM_HASH_MAP[id] = nodeData;
+      if (STREAM) STREAM.ids.set(nodeData, id);
       if (debugMode) PERF_METRICS.nodeMetrics.processedNodes++;
       return id;
     }
@@ -1219,6 +1764,7 @@
 
     // Quick checks for element nodes
     if (node.nodeType === Node.ELEMENT_NODE && !isElementAccepted(node)) {
+      if (SKIPPED_OCCLUDERS && node.tagName.toLowerCase() === 'svg') SKIPPED_OCCLUDERS.push(node);
       if (debugMode) PERF_METRICS.nodeMetrics.skippedNodes++;
       return null;
     }
@@ -1255,6 +1801,9 @@
       xpath: getXPathTree(node, true),
       children: [],
     };
+    if (mutationTracker) {
+      nodeData.registryId = registerElement(mutationTracker, node, parentIframe, isParentHighlighted);
+    }
 
     // Get attributes for interactive elements or potential text containers
     if (isInteractiveCandidate(node) || node.tagName.toLowerCase() === 'iframe' || node.tagName.toLowerCase() === 'body') {
@@ -1268,7 +1817,10 @@
     // Perform visibility, interactivity, and highlighting checks
     if (node.nodeType === Node.ELEMENT_NODE) {
       nodeData.isVisible = isElementVisible(node); // isElementVisible uses offsetWidth/Height, which is fine
-      if (nodeData.isVisible) {
+      if (DEFERRED_ELEMENTS) {
+        // Occlusion, interactivity and highlighting are resolved after the walk, see resolveDeferredElements
+        DEFERRED_ELEMENTS.set(nodeData, { node, parentIframe, childInheritance: [] });
+      } else if (nodeData.isVisible) {
         nodeData.isTopElement = isTopElement(node);
         if (nodeData.isTopElement) {
           nodeData.isInteractive = isInteractiveElement(node);
@@ -1287,9 +1839,10 @@
         try {
           const iframeDoc = node.contentDocument || node.contentWindow?.document;
           if (iframeDoc) {
+            observeMutationRoot(mutationTracker, iframeDoc);
+            cacheChildXPaths(iframeDoc);
             for (const child of iframeDoc.childNodes) {
-              const domElement = buildDomTree(child, node, false);
-              if (domElement) nodeData.children.push(domElement);
+              walkChild(nodeData, child, node, false, CHILD_INHERITS_NOTHING);
             }
           }
         } catch (e) {
@@ -1305,42 +1858,130 @@
         (tagName === "body" && node.getAttribute("data-id")?.startsWith("mce_"))
       ) {
         // Process all child nodes to capture formatted text
+        cacheChildXPaths(node);
         for (const child of node.childNodes) {
-          const domElement = buildDomTree(child, parentIframe, nodeWasHighlighted);
-          if (domElement) nodeData.children.push(domElement);
+          walkChild(nodeData, child, parentIframe, nodeWasHighlighted, CHILD_INHERITS_OWN);
         }
       }
       else {
         // Handle shadow DOM
         if (node.shadowRoot) {
           nodeData.shadowRoot = true;
+          observeMutationRoot(mutationTracker, node.shadowRoot);
+          cacheChildXPaths(node.shadowRoot);
           for (const child of node.shadowRoot.childNodes) {
-            const domElement = buildDomTree(child, parentIframe, nodeWasHighlighted);
-            if (domElement) nodeData.children.push(domElement);
+            walkChild(nodeData, child, parentIframe, nodeWasHighlighted, CHILD_INHERITS_OWN);
           }
         }
         // Handle regular elements
+        cacheChildXPaths(node);
         for (const child of node.childNodes) {
           // Pass the highlighted status of the *current* node to its children
           const passHighlightStatusToChild = nodeWasHighlighted || isParentHighlighted;
-          const domElement = buildDomTree(child, parentIframe, passHighlightStatusToChild);
-          if (domElement) nodeData.children.push(domElement);
+          walkChild(nodeData, child, parentIframe, passHighlightStatusToChild, CHILD_INHERITS_ALL);
         }
       }
     }
 
-    // Skip empty anchor tags
-    if (nodeData.tagName === 'a' && nodeData.children.length === 0 && !nodeData.attributes.href) {
+    // Skip empty anchor tags (children deferred to a later slice of a streamed walk do not count as empty)
+    if (
+      nodeData.tagName === 'a' && nodeData.children.length === 0 && !nodeData.attributes.href &&
+      !(STREAM && STREAM.deferredParents.has(nodeData))
+    ) {
       if (debugMode) PERF_METRICS.nodeMetrics.skippedNodes++;
       return null;
     }
 
     const id = `${ID.current++}`;
     DOM_HASH_MAP[id] = nodeData;
+    if (STREAM) STREAM.ids.set(nodeData, id);
     if (debugMode) PERF_METRICS.nodeMetrics.processedNodes++;
     return id;
   }
 
+  // Bit flags of the `flags` column of the columnar payload
+  const NODE_FLAGS = {
+    text: 1,
+    visible: 2,
+    interactive: 4,
+    topElement: 8,
+    inViewport: 16,
+    shadowRoot: 32,
+  };
+
+  /**
+   * Encodes the node map as parallel arrays (one entry per node id) with a single
+   * interned string table for tag names, attribute names/values, xpaths and texts.
+   * Attributes are stored CSR-style: the attributes of node i are the pairs
+   * attrOffsets[i] .. attrOffsets[i + 1] of attrNames/attrValues.
+   */
+  function encodeColumnar(hashMap, nodeCount) {
+    const strings = [];
+    const stringIds = new Map();
+    const intern = (value) => {
+      let index = stringIds.get(value);
+      if (index === undefined) {
+        index = strings.length;
+        strings.push(value);
+        stringIds.set(value, index);
+      }
+      return index;
+    };
+
+    const parent = new Array(nodeCount).fill(-1);
+    const flags = new Array(nodeCount);
+    const tag = new Array(nodeCount);
+    const value = new Array(nodeCount); // xpath for elements, text for text nodes
+    const highlight = new Array(nodeCount);
+    const registry = new Array(nodeCount);
+    const ref = new Array(nodeCount);
+    const rect = new Array(nodeCount); // offset of the box in `rects` (left, top, width, height)
+    const rects = [];
+    const attrOffsets = new Array(nodeCount + 1);
+    const attrNames = [];
+    const attrValues = [];
+
+    for (let i = 0; i < nodeCount; i++) {
+      const node = hashMap[i];
+      attrOffsets[i] = attrNames.length;
+
+      if (node.type === "TEXT_NODE") {
+        flags[i] = NODE_FLAGS.text | (node.isVisible ? NODE_FLAGS.visible : 0);
+        tag[i] = -1;
+        value[i] = intern(node.text);
+        highlight[i] = -1;
+        registry[i] = -1;
+        ref[i] = -1;
+        rect[i] = -1;
+        continue;
+      }
+
+      flags[i] =
+        (node.isVisible ? NODE_FLAGS.visible : 0) |
+        (node.isInteractive ? NODE_FLAGS.interactive : 0) |
+        (node.isTopElement ? NODE_FLAGS.topElement : 0) |
+        (node.isInViewport ? NODE_FLAGS.inViewport : 0) |
+        (node.shadowRoot ? NODE_FLAGS.shadowRoot : 0);
+      tag[i] = intern(node.tagName);
+      value[i] = intern(node.xpath);
+      highlight[i] = node.highlightIndex ?? -1;
+      registry[i] = node.registryId ?? -1;
+      ref[i] = node.ref ?? -1;
+      rect[i] = node.rect ? rects.push(...node.rect) - 4 : -1;
+
+      for (const name in node.attributes) {
+        attrNames.push(intern(name));
+        attrValues.push(intern(node.attributes[name]));
+      }
+      for (const childId of node.children) {
+        parent[Number(childId)] = i;
+      }
+    }
+    attrOffsets[nodeCount] = attrNames.length;
+
+    return { strings, parent, flags, tag, value, highlight, registry, ref, rect, rects, attrOffsets, attrNames, attrValues };
+  }
+
   // After all functions are defined, wrap them with performance measurement
   // Remove buildDomTree from here as we measure it separately
   highlightElement = measureTime(highlightElement);
@@ -1351,7 +1992,236 @@
   isTextNodeVisible = measureTime(isTextNodeVisible);
   getEffectiveScroll = measureTime(getEffectiveScroll);
 
-  const rootId = buildDomTree(document.body);
+  // Everything else the agent state needs from the page, so it does not cost extra round-trips
+  function getPageInfo() {
+    return {
+      url: window.location.href,
+      title: document.title,
+      scrollY: window.scrollY,
+      viewportWidth: window.innerWidth,
+      viewportHeight: window.innerHeight,
+      scrollHeight: document.documentElement.scrollHeight,
+    };
+  }
+
+  /**
+   * Streamed extraction.
+   *
+   * The walk runs in time slices of sliceMs. When a slice is over, buildDomTree stops descending
+   * and the remaining children become units of their own (walkChild), which later slices walk in
+   * document order, so highlight indices stay pre-order. Between slices the page gets its main
+   * thread back.
+   *
+   * Every slice produces a chunk { map, links }: the nodes walked in that slice, and
+   * [parentId, childId] pairs that attach the roots of deferred units to their parents in earlier
+   * chunks. Python pulls the chunks with { streamNext: true } calls, which resolve as soon as a
+   * chunk is ready, and builds its tree while the walk goes on. Once maxNodes nodes or maxTime ms
+   * are spent the walk stops and the remaining units are dropped (truncated: true).
+   */
+  const STREAM_KEY = "__browserUseDomStream";
+  let STREAM = null;
+
+  function isStreamSliceOver(state) {
+    return performance.now() >= state.sliceDeadline || ID.current >= state.maxNodes;
+  }
+
+  // Unlike setTimeout, a message is not clamped or throttled in background tabs
+  function yieldToPage() {
+    return new Promise((resolve) => {
+      const channel = new MessageChannel();
+      channel.port1.onmessage = () => resolve();
+      channel.port2.postMessage(null);
+    });
+  }
+
+  function takeStreamChunks(state) {
+    const chunks = state.chunks;
+    state.chunks = [];
+    const response = { chunks, done: state.done, truncated: state.truncated, rootId: state.rootId };
+    if (state.done && state.pageInfo) response.pageInfo = state.pageInfo;
+    if (state.error) response.error = state.error;
+    return response;
+  }
+
+  function nextStreamChunks() {
+    const state = window[STREAM_KEY];
+    if (!state) return { chunks: [], done: true, truncated: false, rootId: null, error: "No extraction is running" };
+    if (state.chunks.length || state.done) return takeStreamChunks(state);
+    return new Promise((resolve) => {
+      state.wake = () => {
+        state.wake = null;
+        resolve(takeStreamChunks(state));
+      };
+    });
+  }
+
+  function emitStreamChunk(state) {
+    const map = {};
+    for (let id = state.emitted; id < ID.current; id++) {
+      map[id] = DOM_HASH_MAP[id];
+      // Python owns the nodes from here on, parents of deferred units are kept alive by the units
+      delete DOM_HASH_MAP[id];
+    }
+    state.emitted = ID.current;
+    state.chunks.push({ map, links: state.links });
+    state.links = [];
+    if (state.wake) state.wake();
+  }
+
+  async function runStream(state) {
+    const pending = [null]; // stack of units, null is the root unit (body)
+    try {
+      while (pending.length && !state.cancelled) {
+        DOM_CACHE.clearCache(); // the page may have changed since the last slice
+        state.sliceDeadline = Math.min(performance.now() + state.sliceMs, state.startTime + state.maxTime);
+        state.deferring = false;
+
+        while (pending.length && !state.deferring) {
+          const unit = pending.pop();
+          state.deferred = [];
+          if (unit === null) {
+            state.rootId = buildDomTree(document.body);
+          } else if (unit.node.isConnected) {
+            const childId = buildDomTree(unit.node, unit.parentIframe, unit.isParentHighlighted);
+            const parentId = state.ids.get(unit.parentData);
+            if (childId !== null && parentId !== undefined) state.links.push([parentId, childId]);
+          }
+          for (let i = state.deferred.length - 1; i >= 0; i--) pending.push(state.deferred[i]);
+        }
+
+        if (pending.length && (ID.current >= state.maxNodes || performance.now() >= state.startTime + state.maxTime)) {
+          state.truncated = true;
+          pending.length = 0;
+        }
+        if (!pending.length) break;
+        emitStreamChunk(state);
+        await yieldToPage();
+      }
+    } catch (e) {
+      state.error = String(e && e.stack || e);
+    }
+
+    DOM_CACHE.clearCache();
+    if (state.includePageInfo) state.pageInfo = getPageInfo();
+    state.done = true;
+    emitStreamChunk(state);
+  }
+
+  function startStream(options) {
+    const previous = window[STREAM_KEY];
+    if (previous) previous.cancelled = true;
+
+    STREAM = {
+      sliceMs: options.sliceMs || 50,
+      maxNodes: options.maxNodes || Infinity,
+      maxTime: options.maxTime || Infinity,
+      startTime: performance.now(),
+      sliceDeadline: 0,
+      deferring: false,
+      deferred: [],
+      deferredParents: new WeakSet(),
+      ids: new WeakMap(), // nodeData -> node id
+      emitted: 0,
+      links: [],
+      chunks: [],
+      wake: null,
+      rootId: null,
+      done: false,
+      cancelled: false,
+      truncated: false,
+      error: null,
+      includePageInfo,
+      pageInfo: null,
+    };
+    Object.defineProperty(window, STREAM_KEY, { value: STREAM, configurable: true, enumerable: false });
+    runStream(STREAM);
+    return nextStreamChunks();
+  }
+
+  if (streamNext) {
+    return nextStreamChunks();
+  }
+
+  // Same cleanup as BrowserContext.remove_highlights(), done here to save a round-trip
+  if (removeHighlights) {
+    cleanupHighlights();
+    document.querySelectorAll('[browser-user-highlight-id^="playwright-highlight-"]').forEach((el) => {
+      el.removeAttribute('browser-user-highlight-id');
+    });
+  }
+
+  if (highlightRects) {
+    for (const [index, rect] of highlightRects) highlightRect(index, rect);
+    return { highlighted: highlightRects.length };
+  }
+
+  // Draw the overlays of the previous deferHighlights walk, shifted into the global index range
+  if (drawDeferredHighlights) {
+    const { offset, focus } = drawDeferredHighlights;
+    let highlighted = 0;
+    for (const [index, element, parentIframe] of window[DEFERRED_HIGHLIGHTS_KEY] || []) {
+      if (!element.isConnected || (focus >= 0 && focus !== index + offset)) continue;
+      highlightElement(element, index + offset, parentIframe);
+      highlighted++;
+    }
+    return { highlighted };
+  }
+
+  // Draw overlays for a tree that was patched incrementally on the Python side
+  if (highlightOnly) {
+    const tracker = getMutationTracker();
+    let highlighted = 0;
+    for (const [index, registryId] of highlightOnly) {
+      const element = lookupRegisteredElement(tracker, registryId);
+      if (!element) continue;
+      const context = tracker.contexts.get(element);
+      highlightElement(element, index, context ? context.parentIframe : null);
+      highlighted++;
+    }
+    return { highlighted };
+  }
+
+  let subtreeRoots = null;
+  if (mutationTracker) {
+    // Flush records the observer has not delivered yet
+    mutationTracker.recordMutations(mutationTracker.observer.takeRecords());
+    if (incremental) subtreeRoots = collectDirtySubtreeRoots(mutationTracker);
+    if (!subtreeRoots) {
+      // Full walk: start a fresh registry so ids of removed elements do not pile up
+      mutationTracker.ids = new WeakMap();
+      mutationTracker.elements = new Map();
+      mutationTracker.contexts = new WeakMap();
+    }
+    mutationTracker.dirtyAll = false;
+    mutationTracker.dirtyNodes.clear();
+    mutationTracker.addedElements.clear();
+    mutationTracker.scrollPosition = currentScrollPosition();
+    observeMutationRoot(mutationTracker, document);
+  }
+
+  if (!subtreeRoots) pruneElementRefs();
+
+  if (streamOptions && !subtreeRoots) {
+    return startStream(streamOptions);
+  }
+
+  let rootId = null;
+  let subtrees = null;
+  if (subtreeRoots) {
+    drawHighlights = false;
+    const deferredRoots = [];
+    subtrees = subtreeRoots.map((element) => {
+      const registryId = mutationTracker.ids.get(element);
+      const context = mutationTracker.contexts.get(element);
+      const nodeId = buildDomTree(element, context.parentIframe, context.isParentHighlighted);
+      if (nodeId !== null) deferredRoots.push([nodeId, context.isParentHighlighted]);
+      return [registryId, nodeId];
+    });
+    if (DEFERRED_ELEMENTS) resolveDeferredElements(deferredRoots, true);
+  } else {
+    rootId = buildDomTree(document.body);
+    if (DEFERRED_ELEMENTS && rootId !== null) resolveDeferredElements([[rootId, false]]);
+  }
 
   // Clear the cache before starting
   DOM_CACHE.clearCache();
@@ -1375,6 +2245,12 @@
         PERF_METRICS.buildDomTreeBreakdown.totalTime / PERF_METRICS.buildDomTreeBreakdown.buildDomTreeCalls;
     }
 
+    if (PERF_METRICS.spatialHitTesting) {
+      for (const key of ['collectTime', 'gridTime', 'resolveTime']) {
+        PERF_METRICS.spatialHitTesting[key] = PERF_METRICS.spatialHitTesting[key] / 1000;
+      }
+    }
+
     PERF_METRICS.buildDomTreeBreakdown.timeInChildCalls =
       PERF_METRICS.buildDomTreeBreakdown.totalTime - PERF_METRICS.buildDomTreeBreakdown.totalSelfTime;
 
@@ -1406,7 +2282,21 @@
     }
   }
 
-  return debugMode ?
+  const pageInfo = includePageInfo ? getPageInfo() : null;
+
+  if (compactPayload) {
+    // One string crosses the protocol instead of thousands of small nested objects
+    const result = { rootId, columns: encodeColumnar(DOM_HASH_MAP, ID.current) };
+    if (subtrees) result.subtrees = subtrees;
+    if (pageInfo) result.pageInfo = pageInfo;
+    if (debugMode) result.perfMetrics = PERF_METRICS;
+    return JSON.stringify(result);
+  }
+
+  const result = debugMode ?
     { rootId, map: DOM_HASH_MAP, perfMetrics: PERF_METRICS } :
     { rootId, map: DOM_HASH_MAP };
+  if (subtrees) result.subtrees = subtrees;
+  if (pageInfo) result.pageInfo = pageInfo;
+  return result;
 };
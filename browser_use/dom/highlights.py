@@ -0,0 +1,129 @@
+"""
+Draws the highlight overlays of buildDomTree.js onto a screenshot instead of into the page.
+
+Used with draw_highlights=False: the page only reports the client rects of the highlighted elements
+(DomService.highlight_rects) and the boxes and index labels are composited here, with the colors and
+label placement of the overlays in the page. Needs Pillow.
+"""
+
+import base64
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Same colors, in the same order, as HIGHLIGHT_COLORS in buildDomTree.js
+HIGHLIGHT_COLORS = [
+	'#FF0000',
+	'#00FF00',
+	'#0000FF',
+	'#FFA500',
+	'#800080',
+	'#008080',
+	'#FF69B4',
+	'#4B0082',
+	'#FF4500',
+	'#2E8B57',
+	'#DC143C',
+	'#4682B4',
+]
+LABEL_WIDTH = 20
+LABEL_HEIGHT = 16
+# Alpha of the overlay background, 1A in the page
+FILL_ALPHA = 0x1A
+
+
+def draw_highlights(
+	screenshot_b64: str,
+	highlight_rects: dict[int, list[list[float]]],
+	viewport_width: int | None = None,
+) -> str:
+	"""
+	Returns the base64 screenshot with the highlights drawn onto it, in the format of the input.
+
+	The rects are [left, top, width, height] in CSS pixels of the viewport. viewport_width (CSS pixels) gives
+	the scale for screenshots taken at a device scale factor other than 1.
+	"""
+	from PIL import Image, ImageDraw
+
+	screenshot = Image.open(io.BytesIO(base64.b64decode(screenshot_b64)))
+	image_format = screenshot.format or 'PNG'
+	image = screenshot.convert('RGBA')
+	scale = image.width / viewport_width if viewport_width else 1.0
+	viewport_width_css = image.width / scale
+	viewport_height_css = image.height / scale
+
+	layer = Image.new('RGBA', image.size, (0, 0, 0, 0))
+	draw = ImageDraw.Draw(layer)
+	border = max(1, round(2 * scale))
+	fonts = {}
+
+	# Later indices on top, like the overlays that are appended to the page in index order
+	for index in sorted(highlight_rects):
+		rects = highlight_rects[index]
+		if not rects:
+			continue
+		color = _rgb(HIGHLIGHT_COLORS[index % len(HIGHLIGHT_COLORS)])
+
+		for left, top, width, height in rects:
+			if width <= 0 or height <= 0:
+				continue
+			box = (left * scale, top * scale, (left + width) * scale - 1, (top + height) * scale - 1)
+			draw.rectangle(box, fill=(*color, FILL_ALPHA), outline=(*color, 255), width=border)
+
+		# Label at the top right corner of the first rect, above it if the rect is too small (see positionHighlight)
+		left, top, width, height = rects[0]
+		label_top = top + 2
+		label_left = left + width - LABEL_WIDTH - 2
+		if width < LABEL_WIDTH + 4 or height < LABEL_HEIGHT + 4:
+			label_top = top - LABEL_HEIGHT - 2
+			label_left = left + width - LABEL_WIDTH
+		label_top = max(0, min(label_top, viewport_height_css - LABEL_HEIGHT))
+		label_left = max(0, min(label_left, viewport_width_css - LABEL_WIDTH))
+
+		font_size = round(min(12, max(8, height / 2)) * scale)
+		if font_size not in fonts:
+			fonts[font_size] = _load_font(font_size)
+		font = fonts[font_size]
+		text = str(index)
+		text_left, text_top, text_right, text_bottom = draw.textbbox((0, 0), text, font=font)
+		# padding: 1px 4px, border-radius: 4px
+		label_box = (
+			label_left * scale,
+			label_top * scale,
+			label_left * scale + (text_right - text_left) + 8 * scale,
+			label_top * scale + (text_bottom - text_top) + 2 * scale + font_size * 0.3,
+		)
+		draw.rounded_rectangle(label_box, radius=4 * scale, fill=(*color, 255))
+		draw.text(
+			(label_box[0] + 4 * scale - text_left, label_box[1] + scale - text_top + font_size * 0.15),
+			text,
+			fill=(255, 255, 255, 255),
+			font=font,
+		)
+
+	composited = Image.alpha_composite(image, layer)
+	if image_format.upper() in ('JPEG', 'JPG'):
+		composited = composited.convert('RGB')
+	buffer = io.BytesIO()
+	composited.save(buffer, format=image_format)
+	return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def _rgb(color: str) -> tuple[int, int, int]:
+	return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+
+def _load_font(size: int):
+	from PIL import ImageFont
+
+	for name in ('DejaVuSans.ttf', 'Arial.ttf', 'Helvetica.ttf'):
+		try:
+			return ImageFont.truetype(name, size)
+		except OSError:
+			continue
+	try:
+		return ImageFont.load_default(size=size)
+	except TypeError:  # Pillow < 10.1
+		logger.debug('No scalable font found, the highlight labels use the bitmap font')
+		return ImageFont.load_default()
@@ -29,6 +29,19 @@ class CoordinateSet(BaseModel):
 	width: int
 	height: int
 
+	@classmethod
+	def from_rect(cls, left: float, top: float, width: float, height: float) -> 'CoordinateSet':
+		left, top, width, height = round(left), round(top), round(width), round(height)
+		return cls(
+			top_left=Coordinates(x=left, y=top),
+			top_right=Coordinates(x=left + width, y=top),
+			bottom_left=Coordinates(x=left, y=top + height),
+			bottom_right=Coordinates(x=left + width, y=top + height),
+			center=Coordinates(x=left + width // 2, y=top + height // 2),
+			width=width,
+			height=height,
+		)
+
 
 class ViewportInfo(BaseModel):
 	scroll_x: int
@@ -1,24 +1,163 @@
+import asyncio
+import copy
 import json
 import logging
 from dataclasses import dataclass
 from importlib import resources
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal
 from urllib.parse import urlparse
 
 if TYPE_CHECKING:
-	from patchright.async_api import Page
+	from patchright.async_api import CDPSession, ElementHandle, Frame, JSHandle, Page
 
+from browser_use.dom.accessibility_processor.service import AccessibilityProcessor
+from browser_use.dom.history_tree_processor.view import CoordinateSet
+from browser_use.dom.snapshot_processor.service import SNAPSHOT_COMPUTED_STYLES, SnapshotProcessor
 from browser_use.dom.views import (
+	FLAG_IN_VIEWPORT,
+	FLAG_INTERACTIVE,
+	FLAG_SHADOW_ROOT,
+	FLAG_TEXT,
+	FLAG_TOP_ELEMENT,
+	FLAG_VISIBLE,
 	DOMBaseNode,
 	DOMElementNode,
 	DOMState,
 	DOMTextNode,
+	DOMTree,
+	PageInfo,
 	SelectorMap,
 )
-from browser_use.utils import time_execution_async
+from browser_use.utils import time_execution_async, time_execution_sync
 
 logger = logging.getLogger(__name__)
 
+# Read once per process, every DomService shares the same script text
+BUILD_DOM_TREE_JS = resources.files('browser_use.dom').joinpath('buildDomTree.js').read_text()
+
+# Calls the extractor installed in the document by name, only the args cross the protocol.
+# `check` replaces the former separate `1+1` round-trip that made sure the page evaluates javascript properly.
+# `highlights` are the rects recorded instead of overlays with measureHighlights, whatever the payload format.
+CALL_BUILD_DOM_TREE_JS = """async (args) => {
+	const buildDomTree = window.__browserUseBuildDomTree;
+	const result = buildDomTree ? await buildDomTree(args) : null;
+	const highlights = window.__browserUseMeasuredHighlights || null;
+	delete window.__browserUseMeasuredHighlights;
+	return { check: 1 + 1, installed: !!buildDomTree, result, highlights };
+}"""
+
+# Sent only when the document does not have the extractor yet (first call after a navigation)
+INSTALL_BUILD_DOM_TREE_JS = (
+	"""async (args) => {
+	Object.defineProperty(window, '__browserUseBuildDomTree', { value: """
+	+ BUILD_DOM_TREE_JS.strip().rstrip(';')
+	+ """, configurable: true });
+	const result = await window.__browserUseBuildDomTree(args);
+	const highlights = window.__browserUseMeasuredHighlights || null;
+	delete window.__browserUseMeasuredHighlights;
+	return { check: 1 + 1, installed: true, result, highlights };
+}"""
+)
+
+# Full path of an <iframe> element, innermost first: its xpath in its document or shadow root, the same path
+# getXPathTree() in buildDomTree.js gives it, then the xpaths of the shadow hosts and same-origin <iframe>s around it
+# up to the document that was extracted (the top document or a cross-origin one). See DomService._frame_element_path
+FRAME_ELEMENT_PATH_JS = """(element) => {
+	const path = [];
+	let current = element;
+	while (current) {
+		const segments = [];
+		let node = current;
+		for (; node && node.nodeType === Node.ELEMENT_NODE; node = node.parentNode) {
+			if (node.parentNode instanceof ShadowRoot) break;
+			const siblings = node.parentElement
+				? Array.from(node.parentElement.children).filter((sibling) => sibling.nodeName === node.nodeName)
+				: [];
+			segments.unshift(node.nodeName.toLowerCase() + (siblings.length > 1 ? `[${siblings.indexOf(node) + 1}]` : ''));
+		}
+		path.push(segments.join('/'));
+		if (node && node.parentNode instanceof ShadowRoot) {
+			current = node.parentNode.host;
+		} else {
+			// null at the top and for cross-origin parents
+			const view = current.ownerDocument.defaultView;
+			current = view ? view.frameElement : null;
+		}
+	}
+	return path;
+}"""
+
+# Scrolls a resolved element into view if it is visible, one call instead of is_hidden() and scroll_into_view_if_needed()
+REVEAL_ELEMENT_JS = """(element) => {
+	if (!element || !element.isConnected) return null;
+	const visible = element.getClientRects().length > 0 && element.checkVisibility({ visibilityProperty: true });
+	if (visible) element.scrollIntoViewIfNeeded ? element.scrollIntoViewIfNeeded() : element.scrollIntoView({ block: 'center' });
+	return element;
+}"""
+
+# The element of a reference recorded by buildDomTree.js (see registerElementRef), null if it is gone
+RESOLVE_ELEMENT_REF_JS = f"""(ref) => {{
+	const weakRef = window.__browserUseElementRefs ? window.__browserUseElementRefs.elements.get(ref) : null;
+	return ({REVEAL_ELEMENT_JS})(weakRef ? weakRef.deref() : null);
+}}"""
+
+# Whether a click at (x, y) lands on the element of a reference or on one of its descendants, with one elementFromPoint
+HIT_TEST_ELEMENT_REF_JS = """({ ref, x, y }) => {
+	const weakRef = window.__browserUseElementRefs ? window.__browserUseElementRefs.elements.get(ref) : null;
+	const element = weakRef ? weakRef.deref() : null;
+	if (!element || !element.isConnected || x < 0 || y < 0 || x >= window.innerWidth || y >= window.innerHeight) return false;
+	let hit = document.elementFromPoint(x, y);
+	// elementFromPoint stops at the host of a shadow root
+	while (hit && hit.shadowRoot) {
+		const inner = hit.shadowRoot.elementFromPoint(x, y);
+		if (!inner || inner === hit) break;
+		hit = inner;
+	}
+	for (let node = hit; node; node = node.parentNode || node.host) {
+		if (node === element) return true;
+	}
+	return false;
+}"""
+
+# Hands a node resolved with CDP over to Playwright without a global: DOM.resolveNode gives the node in the main world,
+# this returns its path from the document (child indices, 'shadow' steps into the shadow root of the host), which
+# FOLLOW_NODE_PATH_JS walks down in Playwright's own world. null if the node is not in the document.
+NODE_PATH_JS = """function () {
+	const path = [];
+	let node = this;
+	while (node !== document) {
+		const parent = node.parentNode;
+		if (!parent) return null;
+		path.push(Array.prototype.indexOf.call(parent.childNodes, node));
+		if (parent.nodeType === Node.DOCUMENT_FRAGMENT_NODE && parent.host) {
+			path.push('shadow');
+			node = parent.host;
+		} else {
+			node = parent;
+		}
+	}
+	return path.reverse();
+}"""
+FOLLOW_NODE_PATH_JS = f"""(path) => {{
+	if (!path) return null;
+	let node = document;
+	for (const step of path) {{
+		// Closed shadow roots cannot be entered, the caller falls back to selectors
+		node = step === 'shadow' ? node.shadowRoot : node.childNodes[step];
+		if (!node) return null;
+	}}
+	return ({REVEAL_ELEMENT_JS})(node);
+}}"""
+
+# What new_cdp_session raises in browsers without CDP (Firefox, WebKit), they are not asked for a session again
+NO_CDP_ERROR = 'CDP session is only available in Chromium'
+
+# Length of one time slice of a streamed extraction, the page gets its main thread back in between
+STREAM_SLICE_MS = 50
+
+# Force a full walk every N incremental patches, to pick up changes that do not show up as DOM mutations (e.g. CSS animations)
+INCREMENTAL_FULL_REBUILD_INTERVAL = 20
+
 
 @dataclass
 class ViewportInfo:
@@ -31,7 +170,22 @@ class DomService:
 		self.page = page
 		self.xpath_cache = {}
 
-		self.js_code = resources.files('browser_use.dom').joinpath('buildDomTree.js').read_text()
+		self.js_code = BUILD_DOM_TREE_JS
+
+		# State kept between calls for incremental extraction
+		self._incremental_tree: DOMElementNode | None = None
+		self._incremental_args: tuple | None = None
+		self._incremental_patches = 0
+		self._registry: dict[int, DOMElementNode] = {}  # in-page registry id -> node
+		self._registry_ids: dict[int, int] = {}  # id(node) -> in-page registry id
+
+		# Highlight index -> client rects [left, top, width, height] (CSS pixels of the viewport) of the overlays
+		# the last extraction with draw_highlights=False did not draw, None if it drew them
+		self.highlight_rects: dict[int, list[list[float]]] | None = None
+		self._measured_highlights: dict[int, list[list[float]]] | None = None
+
+		# CDP session of the snapshot and accessibility engines, None until first used; False if the browser has no CDP (Firefox, WebKit)
+		self._cdp_session: 'CDPSession | None | Literal[False]' = None
 
 	# region - Clickable elements
 	@time_execution_async('--get_clickable_elements')
@@ -40,12 +194,116 @@ class DomService:
 		highlight_elements: bool = True,
 		focus_element: int = -1,
 		viewport_expansion: int = 0,
+		incremental: bool = False,
+		compact_payload: bool = False,
+		spatial_hit_testing: bool = False,
+		stream: bool = False,
+		max_nodes: int | None = None,
+		max_time: float | None = None,
+		cross_origin_frames: bool = False,
+		engine: Literal['js', 'snapshot', 'accessibility'] = 'js',
+		draw_highlights: bool = True,
 	) -> DOMState:
-		element_tree, selector_map = await self._build_dom_tree(highlight_elements, focus_element, viewport_expansion)
+		"""
+		Extract the clickable elements of the page.
+
+		With incremental=True an in-page MutationObserver tracks changes between calls, only the mutated
+		subtrees are walked again and spliced into a new version of the previously returned tree, which is left as it was
+		and shares its unchanged subtrees with the new one.
+
+		With compact_payload=True the page returns a single JSON string with parallel arrays and an
+		interned string table instead of one object per node, which is much cheaper to transfer and decode.
+		Unless the tree is patched incrementally, the arrays are kept as a DOMTree and nodes are only created as
+		lightweight views on access, which keeps the per-step memory low on large pages.
+
+		With spatial_hit_testing=True occlusion (isTopElement) is resolved for all elements at once from a grid of
+		their rects, only overlapping elements are hit-tested with elementFromPoint.
+
+		With stream=True the walk runs in time slices so the page stays responsive, and the tree is built from
+		chunks while the walk goes on. max_nodes / max_time (seconds) stop the walk early, the returned tree is
+		then truncated but consistent. Incremental extraction does not stream.
+
+		With cross_origin_frames=True the extractor also runs in the cross-origin iframes it cannot descend into,
+		concurrently with the page, and their trees are spliced under the <iframe> elements. Only for full walks
+		with the default payload format, streamed extraction (stream=True) skips the frames.
+
+		engine='snapshot' builds the tree from one CDP DOMSnapshot.captureSnapshot instead of running buildDomTree.js
+		(see SnapshotProcessor), only overlays are still drawn by the script. Chromium only, falls back to the
+		script otherwise. The options above that tune the script walk do not apply to it.
+
+		engine='accessibility' builds the tree from Chrome's accessibility tree (Accessibility.getFullAXTree) for
+		agents that only read the text representation: roles, names, values and states of the whole document, without
+		layout, viewport filtering or overlays (see AccessibilityProcessor). Chromium only, falls back to the script.
+
+		With draw_highlights=False the page is not modified: instead of drawing overlays, the client rects of the
+		highlighted elements are kept in self.highlight_rects, to be drawn onto a screenshot
+		(see draw_highlights in browser_use.dom.highlights). Overlays of cross-origin frames are still drawn in the frames.
+		"""
+		self._measured_highlights = None if draw_highlights else {}
+		try:
+			element_tree, selector_map, _ = await self._build_dom_tree(
+				highlight_elements,
+				focus_element,
+				viewport_expansion,
+				incremental,
+				compact_payload,
+				spatial_hit_testing=spatial_hit_testing,
+				stream=stream,
+				max_nodes=max_nodes,
+				max_time=max_time,
+				cross_origin_frames=cross_origin_frames,
+				engine=engine,
+			)
+		finally:
+			self.highlight_rects, self._measured_highlights = self._measured_highlights, None
 		return DOMState(element_tree=element_tree, selector_map=selector_map)
 
+	@time_execution_async('--get_page_state')
+	async def get_page_state(
+		self,
+		highlight_elements: bool = True,
+		focus_element: int = -1,
+		viewport_expansion: int = 0,
+		incremental: bool = False,
+		compact_payload: bool = False,
+		spatial_hit_testing: bool = False,
+		stream: bool = False,
+		max_nodes: int | None = None,
+		max_time: float | None = None,
+		cross_origin_frames: bool = False,
+		engine: Literal['js', 'snapshot', 'accessibility'] = 'js',
+		draw_highlights: bool = True,
+	) -> tuple[DOMState, PageInfo | None]:
+		"""
+		Same as get_clickable_elements(), but the previous highlights are removed and the url, title, scroll position
+		and viewport of the page are read in the same evaluation. PageInfo is None for about:blank.
+		"""
+		self._measured_highlights = None if draw_highlights else {}
+		try:
+			element_tree, selector_map, page_info = await self._build_dom_tree(
+				highlight_elements,
+				focus_element,
+				viewport_expansion,
+				incremental,
+				compact_payload,
+				page_state=True,
+				spatial_hit_testing=spatial_hit_testing,
+				stream=stream,
+				max_nodes=max_nodes,
+				max_time=max_time,
+				cross_origin_frames=cross_origin_frames,
+				engine=engine,
+			)
+		finally:
+			self.highlight_rects, self._measured_highlights = self._measured_highlights, None
+		return DOMState(element_tree=element_tree, selector_map=selector_map), page_info
+
 	@time_execution_async('--get_cross_origin_iframes')
 	async def get_cross_origin_iframes(self) -> list[str]:
+		return [frame.url for frame in await self._get_cross_origin_frames()]
+
+	async def _get_cross_origin_frames(self) -> list['Frame']:
+		"""Frames buildDomTree.js cannot descend into from their parent document, without ads and hidden frames"""
 		# invisible cross-origin iframes are used for ads and tracking, dont open those
 		hidden_frame_urls = await self.page.locator('iframe').filter(visible=False).evaluate_all('e => e.map(e => e.src)')
 
@@ -54,25 +312,39 @@ class DomService:
 		)
 
 		return [
-			frame.url
+			frame
 			for frame in self.page.frames
-			if urlparse(frame.url).netloc  # exclude data:urls and about:blank
-			and urlparse(frame.url).netloc != urlparse(self.page.url).netloc  # exclude same-origin iframes
+			if self._is_cross_origin_frame(frame)
 			and frame.url not in hidden_frame_urls  # exclude hidden frames
 			and not is_ad_url(frame.url)  # exclude most common ad network tracker frame URLs
 		]
 
+	@staticmethod
+	def _is_cross_origin_frame(frame: 'Frame') -> bool:
+		return (
+			frame.parent_frame is not None
+			and bool(urlparse(frame.url).netloc)  # exclude data:urls and about:blank
+			and urlparse(frame.url).netloc != urlparse(frame.parent_frame.url).netloc  # exclude same-origin iframes
+		)
+
 	@time_execution_async('--build_dom_tree')
 	async def _build_dom_tree(
 		self,
 		highlight_elements: bool,
 		focus_element: int,
 		viewport_expansion: int,
-	) -> tuple[DOMElementNode, SelectorMap]:
-		if await self.page.evaluate('1+1') != 2:
-			raise ValueError('The page cannot evaluate javascript code properly')
-
+		incremental: bool = False,
+		compact_payload: bool = False,
+		page_state: bool = False,
+		spatial_hit_testing: bool = False,
+		stream: bool = False,
+		max_nodes: int | None = None,
+		max_time: float | None = None,
+		cross_origin_frames: bool = False,
+		engine: Literal['js', 'snapshot', 'accessibility'] = 'js',
+	) -> tuple[DOMElementNode, SelectorMap, PageInfo | None]:
 		if self.page.url == 'about:blank':
+			self._reset_incremental_state()
 			# short-circuit if the page is a new empty tab for speed, no need to inject buildDomTree.js
 			return (
 				DOMElementNode(
@@ -84,8 +356,20 @@ class DomService:
 					parent=None,
 				),
 				{},
+				None,
 			)
 
+		if engine == 'snapshot' and self._cdp_session is not False:
+			try:
+				return await self._build_dom_tree_from_snapshot(highlight_elements, focus_element, viewport_expansion, page_state)
+			except Exception as e:
+				logger.debug('DOMSnapshot extraction failed, falling back to buildDomTree.js: %s', e)
+		elif engine == 'accessibility' and self._cdp_session is not False:
+			try:
+				return await self._build_dom_tree_from_accessibility_tree(page_state)
+			except Exception as e:
+				logger.debug('Accessibility tree extraction failed, falling back to buildDomTree.js: %s', e)
+
 		# NOTE: We execute JS code in the browser to extract important DOM information.
 		#       The returned hash map contains information about the DOM tree and the
 		#       relationship between the DOM elements.
@@ -95,14 +379,61 @@ class DomService:
 			'focusHighlightIndex': focus_element,
 			'viewportExpansion': viewport_expansion,
 			'debugMode': debug_mode,
+			'compactPayload': compact_payload,
+			'spatialHitTesting': spatial_hit_testing,
 		}
+		if page_state:
+			args['removeHighlights'] = True
+			args['includePageInfo'] = True
+
+		if incremental:
+			incremental_args = (highlight_elements, focus_element, viewport_expansion, spatial_hit_testing)
+			args['trackMutations'] = True
+			args['incremental'] = (
+				self._incremental_tree is not None
+				and self._incremental_args == incremental_args
+				and self._incremental_patches < INCREMENTAL_FULL_REBUILD_INTERVAL
+			)
+		elif self._incremental_tree is not None:
+			self._reset_incremental_state()
+
+		if stream and not incremental:
+			args['stream'] = {
+				'sliceMs': STREAM_SLICE_MS,
+				'maxNodes': max_nodes,
+				'maxTime': max_time * 1000 if max_time is not None else None,
+			}
+			try:
+				element_tree, selector_map, page_info = await self._stream_dom_tree(args)
+			except Exception as e:
+				logger.error('Error evaluating JavaScript: %s', e)
+				raise
+			return element_tree, selector_map, page_info
+
+		frame_args = None
+		if cross_origin_frames and not incremental and not compact_payload:
+			frame_args = {
+				**args,
+				'focusHighlightIndex': -1,
+				'removeHighlights': True,
+				'includePageInfo': False,
+				'deferHighlights': highlight_elements,
+			}
 
 		try:
-			eval_page: dict = await self.page.evaluate(self.js_code, args)
+			if frame_args is not None:
+				eval_page, frame_trees = await asyncio.gather(
+					self._evaluate_build_dom_tree(args), self._extract_cross_origin_frames(frame_args)
+				)
+			else:
+				eval_page: dict | str = await self._evaluate_build_dom_tree(args)
 		except Exception as e:
 			logger.error('Error evaluating JavaScript: %s', e)
 			raise
 
+		if isinstance(eval_page, str):
+			eval_page = json.loads(eval_page)
+
 		# Only log performance metrics in debug mode
 		if debug_mode and 'perfMetrics' in eval_page:
 			logger.debug(
@@ -111,18 +442,432 @@ class DomService:
 				json.dumps(eval_page['perfMetrics'], indent=2),
 			)
 
-		return await self._construct_dom_tree(eval_page)
+		page_info = self._parse_page_info(eval_page['pageInfo']) if 'pageInfo' in eval_page else None
+
+		if not incremental:
+			element_tree, selector_map = await self._construct_dom_tree(eval_page)
+			if frame_args is not None and frame_trees:
+				selector_map = await self._splice_frame_trees(
+					element_tree, selector_map, frame_trees, highlight_elements, focus_element
+				)
+			return element_tree, selector_map, page_info
+
+		if 'subtrees' in eval_page:
+			patched = await self._patch_dom_tree(eval_page, highlight_elements, focus_element)
+			if patched is not None:
+				return *patched, page_info
+
+			# Python and in-page registries disagree, start over with a full walk
+			self._reset_incremental_state()
+			return await self._build_dom_tree(
+				highlight_elements,
+				focus_element,
+				viewport_expansion,
+				incremental,
+				compact_payload,
+				page_state,
+				spatial_hit_testing=spatial_hit_testing,
+				stream=stream,
+				max_nodes=max_nodes,
+				max_time=max_time,
+				cross_origin_frames=cross_origin_frames,
+				engine=engine,
+			)
+
+		node_map, selector_map, registry = self._construct_nodes(eval_page)
+		element_tree = node_map.get(str(eval_page['rootId']))
+		if element_tree is None or not isinstance(element_tree, DOMElementNode):
+			raise ValueError('Failed to parse HTML to dictionary')
+
+		self._incremental_tree = element_tree
+		self._incremental_args = incremental_args
+		self._incremental_patches = 0
+		self._registry = registry
+		self._registry_ids = {id(node): registry_id for registry_id, node in registry.items()}
+		return element_tree, selector_map, page_info
+
+	@time_execution_async('--stream_dom_tree')
+	async def _stream_dom_tree(self, args: dict) -> tuple[DOMElementNode, SelectorMap, PageInfo | None]:
+		"""Build the tree from the chunks of a streamed walk (see startStream in buildDomTree.js) as they arrive."""
+		node_map: dict[str, DOMBaseNode] = {}
+		selector_map: SelectorMap = {}
+
+		response = await self._evaluate_build_dom_tree(args)
+		while True:
+			if response.get('error'):
+				raise ValueError(f'Streamed DOM extraction failed: {response["error"]}')
+
+			for chunk in response['chunks']:
+				chunk_nodes, chunk_selector_map, _ = self._construct_nodes(chunk)
+				node_map.update(chunk_nodes)
+				selector_map.update(chunk_selector_map)
+
+				# Roots of units walked in a later slice than their parent
+				for parent_id, child_id in chunk['links']:
+					parent = node_map.get(str(parent_id))
+					child = node_map.get(str(child_id))
+					if isinstance(parent, DOMElementNode) and child is not None:
+						child.parent = parent
+						parent.children.append(child)
+
+			if response['done']:
+				break
+			response = await self._evaluate_build_dom_tree({'streamNext': True})
+
+		if response['truncated']:
+			logger.warning('DOM extraction of %s stopped early, the tree is truncated at %d nodes', self.page.url, len(node_map))
+
+		element_tree = node_map.get(str(response['rootId']))
+		if element_tree is None or not isinstance(element_tree, DOMElementNode):
+			raise ValueError('Failed to parse HTML to dictionary')
+
+		page_info = self._parse_page_info(response['pageInfo']) if 'pageInfo' in response else None
+		return element_tree, dict(sorted(selector_map.items())), page_info
+
+	async def _extract_cross_origin_frames(self, args: dict) -> list[tuple['Frame', list[str], DOMElementNode, SelectorMap]]:
+		"""Run the extractor in all cross-origin frames at once, returns (frame, iframe path, tree, selector map)"""
+
+		async def extract(frame: 'Frame'):
+			try:
+				frame_element = await frame.frame_element()
+				path, eval_page = await asyncio.gather(
+					frame_element.evaluate(FRAME_ELEMENT_PATH_JS), self._evaluate_build_dom_tree(args, frame)
+				)
+				element_tree, selector_map = await self._construct_dom_tree(eval_page)
+				return frame, path, element_tree, selector_map
+			except Exception as e:
+				# Frames detach and navigate all the time, the rest of the page is still fine
+				logger.debug('Failed to extract the DOM of frame %s: %s', frame.url, e)
+				return None
+
+		frames = await self._get_cross_origin_frames()
+		results = await asyncio.gather(*(extract(frame) for frame in frames))
+		return [result for result in results if result is not None]
+
+	async def _splice_frame_trees(
+		self,
+		element_tree: DOMElementNode,
+		selector_map: SelectorMap,
+		frame_trees: list[tuple['Frame', list[str], DOMElementNode, SelectorMap]],
+		highlight_elements: bool,
+		focus_element: int,
+	) -> SelectorMap:
+		"""
+		Attach the frame trees under their <iframe> nodes and move their highlight indices behind the ones
+		of the page, in document order, then draw the frames' overlays with the final indices.
+		"""
+		trees = {id(frame): tree for frame, _, tree, _ in frame_trees}
+		spliced: dict[int, tuple['Frame', SelectorMap]] = {}
+		for frame, path, tree, frame_selector_map in frame_trees:
+			# The <iframe> lives in the tree of the closest cross-origin ancestor frame (or the page),
+			# same-origin frames are walked inline by their parent
+			parent_frame = frame.parent_frame
+			while parent_frame.parent_frame is not None and not self._is_cross_origin_frame(parent_frame):
+				parent_frame = parent_frame.parent_frame
+			parent_tree = trees.get(id(parent_frame)) if parent_frame.parent_frame is not None else element_tree
+			if parent_tree is None:
+				continue  # the parent frame was filtered out or failed
+
+			iframe = self._find_empty_iframe(parent_tree, path)
+			if iframe is None:
+				continue
+			tree.parent = iframe
+			iframe.children.append(tree)
+			spliced[id(tree)] = (frame, frame_selector_map)
+
+		# Frame roots in document order get consecutive ranges after the page's own indices
+		next_index = max(selector_map, default=-1) + 1
+		offsets: list[tuple['Frame', int]] = []
+		merged = dict(selector_map)
+		stack: list[DOMBaseNode] = [element_tree]
+		while stack:
+			node = stack.pop()
+			if not isinstance(node, DOMElementNode):
+				continue
+			if id(node) in spliced:
+				frame, frame_selector_map = spliced[id(node)]
+				offsets.append((frame, next_index))
+				for index, frame_node in frame_selector_map.items():
+					frame_node.highlight_index = index + next_index
+					merged[index + next_index] = frame_node
+				next_index += max(frame_selector_map, default=-1) + 1
+			stack.extend(reversed(node.children))
+
+		if highlight_elements:
+			await asyncio.gather(
+				*(
+					self._evaluate_build_dom_tree({'drawDeferredHighlights': {'offset': offset, 'focus': focus_element}}, frame)
+					for frame, offset in offsets
+				),
+				return_exceptions=True,
+			)
+		return merged
+
+	@classmethod
+	def _find_empty_iframe(cls, root: DOMElementNode, path: list[str]) -> DOMElementNode | None:
+		"""
+		The <iframe> node with this full path (see FRAME_ELEMENT_PATH_JS) that has no content yet, i.e. one
+		buildDomTree.js could not descend into. Xpaths alone repeat in shadow roots and same-origin frames.
+		"""
+		stack: list[DOMBaseNode] = [root]
+		while stack:
+			node = stack.pop()
+			if not isinstance(node, DOMElementNode):
+				continue
+			if (
+				node.tag_name == 'iframe'
+				and node.xpath == path[0]
+				and not node.children
+				and cls._frame_element_path(node, root) == path
+			):
+				return node
+			stack.extend(reversed(node.children))
+		return None
+
+	@staticmethod
+	def _frame_element_path(node: DOMElementNode, root: DOMElementNode) -> list[str]:
+		"""
+		The xpath of the node, then the xpaths of the shadow hosts and <iframe>s around it up to root, innermost first.
+		Xpaths start over below an <iframe> and below a shadow root, whose direct children have the xpath ''.
+		"""
+		path = [node.xpath]
+		child, current = node, node.parent
+		while current is not None and child is not root:
+			if child.xpath == '' or current.tag_name == 'iframe':
+				path.append(current.xpath)
+			child, current = current, current.parent
+		return path
+
+	@time_execution_async('--build_dom_tree_from_snapshot')
+	async def _build_dom_tree_from_snapshot(
+		self,
+		highlight_elements: bool,
+		focus_element: int,
+		viewport_expansion: int,
+		page_state: bool,
+	) -> tuple[DOMElementNode, SelectorMap, PageInfo | None]:
+		session = await self.get_cdp_session()
+		try:
+			snapshot, layout_metrics = await asyncio.gather(
+				session.send(
+					'DOMSnapshot.captureSnapshot',
+					{'computedStyles': SNAPSHOT_COMPUTED_STYLES, 'includePaintOrder': True, 'includeDOMRects': False},
+				),
+				session.send('Page.getLayoutMetrics'),
+			)
+		except Exception:
+			self._cdp_session = None  # e.g. detached by a navigation, open a new session next time
+			raise
+		processor = SnapshotProcessor(snapshot, layout_metrics, viewport_expansion)
+		element_tree, selector_map = processor.build(highlight_elements)
+
+		if highlight_elements or page_state:
+			highlight_rects = []
+			if highlight_elements:
+				for index, node in selector_map.items():
+					coordinates = node.viewport_coordinates
+					if coordinates is not None and (focus_element < 0 or focus_element == index):
+						highlight_rects.append(
+							[index, [coordinates.top_left.x, coordinates.top_left.y, coordinates.width, coordinates.height]]
+						)
+			if self._measured_highlights is not None:
+				# The rects are known already, the page is only needed to remove the overlays of an earlier step
+				self._measured_highlights.update((index, [rect]) for index, rect in highlight_rects if rect[2] and rect[3])
+				highlight_rects = []
+			if highlight_rects or page_state:
+				await self._evaluate_build_dom_tree({'removeHighlights': page_state, 'highlightRects': highlight_rects})
+
+		return element_tree, selector_map, processor.page_info() if page_state else None
+
+	@time_execution_async('--build_dom_tree_from_accessibility_tree')
+	async def _build_dom_tree_from_accessibility_tree(
+		self, page_state: bool
+	) -> tuple[DOMElementNode, SelectorMap, PageInfo | None]:
+		session = await self.get_cdp_session()
+		try:
+			document, ax_tree, frame_tree, layout_metrics = await asyncio.gather(
+				session.send('DOM.getDocument', {'depth': -1, 'pierce': True}),
+				session.send('Accessibility.getFullAXTree'),
+				session.send('Page.getFrameTree'),
+				session.send('Page.getLayoutMetrics') if page_state else asyncio.sleep(0),
+			)
+		except Exception:
+			self._cdp_session = None  # e.g. detached by a navigation, open a new session next time
+			raise
+
+		# Same-process child frames have trees of their own, out-of-process ones fail and are left out
+		frame_ids = []
+		frames = list(frame_tree['frameTree'].get('childFrames', []))
+		while frames:
+			frame = frames.pop()
+			frame_ids.append(frame['frame']['id'])
+			frames.extend(frame.get('childFrames', []))
+		frame_results = await asyncio.gather(
+			*(session.send('Accessibility.getFullAXTree', {'frameId': frame_id}) for frame_id in frame_ids),
+			return_exceptions=True,
+		)
+		ax_trees = [ax_tree['nodes']] + [result['nodes'] for result in frame_results if isinstance(result, dict)]
+
+		processor = AccessibilityProcessor(ax_trees, document['root'])
+		element_tree, selector_map = processor.build()
+
+		if page_state:
+			await self._evaluate_build_dom_tree({'removeHighlights': True, 'highlightRects': []})
+			return element_tree, selector_map, processor.page_info(layout_metrics)
+		return element_tree, selector_map, None
+
+	async def get_cdp_session(self) -> 'CDPSession':
+		"""
+		The CDP session of the page, opened on first use. Raises if it cannot be opened: every time if the browser has
+		no CDP, other failures (e.g. a page in the middle of a navigation) are tried again next time.
+		"""
+		if self._cdp_session is False:
+			raise RuntimeError(NO_CDP_ERROR)
+		if self._cdp_session is None:
+			try:
+				self._cdp_session = await self.page.context.new_cdp_session(self.page)
+			except Exception as e:
+				if NO_CDP_ERROR in str(e):
+					self._cdp_session = False
+				raise
+		return self._cdp_session
+
+	async def resolve_element(self, element: DOMElementNode) -> 'ElementHandle | None':
+		"""
+		The element of a node of the last tree, by the reference recorded for it during the extraction, scrolled into
+		view if it is visible. None if the node has no reference, is inside an iframe or its element is gone: the caller
+		falls back to selectors then.
+		"""
+		if self._is_in_iframe(element):
+			return None  # handles of the page's own document would not act on the document of the frame
+
+		try:
+			if element.element_ref is not None:
+				handle = await self.page.evaluate_handle(RESOLVE_ELEMENT_REF_JS, element.element_ref)
+			elif element.backend_node_id is not None:
+				handle = await self._resolve_backend_node(element.backend_node_id)
+			else:
+				return None
+		except Exception as e:
+			logger.debug(f'Failed to resolve <{element.tag_name}> by reference, falling back to selectors: {e}')
+			return None
+
+		element_handle = handle.as_element()
+		if element_handle is None:
+			await handle.dispose()
+		return element_handle
+
+	async def click_point(self, element: DOMElementNode) -> tuple[int, int] | None:
+		"""
+		The centre of the element's box from the extraction, if a click there still lands on the element. One
+		elementFromPoint in the page checks it, instead of locating the element and Playwright's actionability checks.
+		None if the element was not top-most and in the viewport when it was extracted, or is no longer at that point.
+		"""
+		coordinates = element.viewport_coordinates
+		if (
+			coordinates is None
+			or element.element_ref is None
+			or not (element.is_top_element and element.is_in_viewport)
+			or self._is_in_iframe(element)
+		):
+			return None
+
+		x, y = coordinates.center.x, coordinates.center.y
+		try:
+			hit = await self.page.evaluate(HIT_TEST_ELEMENT_REF_JS, {'ref': element.element_ref, 'x': x, 'y': y})
+		except Exception as e:
+			logger.debug(f'Failed to hit-test <{element.tag_name}> at ({x}, {y}): {e}')
+			return None
+		return (x, y) if hit else None
+
+	@staticmethod
+	def _is_in_iframe(element: DOMElementNode) -> bool:
+		current = element.parent
+		while current is not None:
+			if current.tag_name == 'iframe':
+				return True
+			current = current.parent
+		return False
+
+	async def _resolve_backend_node(self, backend_node_id: int) -> 'JSHandle':
+		"""Handle of a node of a tree built from CDP (snapshot and accessibility engines), by its backend node id"""
+		session = await self.get_cdp_session()
+		node = await session.send('DOM.resolveNode', {'backendNodeId': backend_node_id})
+		object_id = node['object']['objectId']
+		try:
+			result = await session.send(
+				'Runtime.callFunctionOn', {'objectId': object_id, 'functionDeclaration': NODE_PATH_JS, 'returnByValue': True}
+			)
+		finally:
+			await session.send('Runtime.releaseObject', {'objectId': object_id})
+		return await self.page.evaluate_handle(FOLLOW_NODE_PATH_JS, result['result'].get('value'))
+
+	@staticmethod
+	def _parse_page_info(page_info: dict) -> PageInfo:
+		return PageInfo(
+			url=page_info['url'],
+			title=page_info['title'],
+			scroll_y=page_info['scrollY'],
+			viewport_width=page_info['viewportWidth'],
+			viewport_height=page_info['viewportHeight'],
+			scroll_height=page_info['scrollHeight'],
+		)
+
+	async def _evaluate_build_dom_tree(self, args: dict, frame: 'Frame | None' = None):
+		"""Run buildDomTree.js in the page (or one of its frames), the script itself is only sent once per document."""
+		target = frame or self.page
+		measure = frame is None and self._measured_highlights is not None
+		if measure:
+			args = {**args, 'measureHighlights': True}
+		response = await target.evaluate(CALL_BUILD_DOM_TREE_JS, args)
+		if isinstance(response, dict) and not response.get('installed'):
+			response = await target.evaluate(INSTALL_BUILD_DOM_TREE_JS, args)
+
+		if not isinstance(response, dict) or response.get('check') != 2:
+			raise ValueError('The page cannot evaluate javascript code properly')
+		if measure:
+			for index, rects in response.get('highlights') or []:
+				self._measured_highlights[index] = rects
+		return response['result']
 
 	@time_execution_async('--construct_dom_tree')
 	async def _construct_dom_tree(
 		self,
 		eval_page: dict,
 	) -> tuple[DOMElementNode, SelectorMap]:
-		js_node_map = eval_page['map']
 		js_root_id = eval_page['rootId']
 
+		if 'columns' in eval_page:
+			# Keep the columns as they are, nodes are only materialized as lightweight views when accessed
+			tree = DOMTree(eval_page['columns'])
+			root = tree.node(int(js_root_id))
+			if not isinstance(root, DOMElementNode):
+				raise ValueError('Failed to parse HTML to dictionary')
+			return root, tree.selector_map()
+
+		node_map, selector_map, _ = self._construct_nodes(eval_page)
+
+		html_to_dict = node_map[str(js_root_id)]
+
+		del node_map
+		del js_root_id
+
+		if html_to_dict is None or not isinstance(html_to_dict, DOMElementNode):
+			raise ValueError('Failed to parse HTML to dictionary')
+
+		return html_to_dict, selector_map
+
+	def _construct_nodes(
+		self,
+		eval_page: dict,
+	) -> tuple[dict[str, DOMBaseNode], SelectorMap, dict[int, DOMElementNode]]:
+		if 'columns' in eval_page:
+			return self._decode_columns(eval_page['columns'])
+
+		js_node_map = eval_page['map']
 		selector_map = {}
 		node_map = {}
+		registry = {}
 
 		for id, node_data in js_node_map.items():
 			node, children_ids = self._parse_node(node_data)
@@ -137,6 +882,9 @@ class DomService:
 			# NOTE: We know that we are building the tree bottom up
 			#       and all children are already processed.
 			if isinstance(node, DOMElementNode):
+				if 'registryId' in node_data:
+					registry[node_data['registryId']] = node
+
 				for child_id in children_ids:
 					if child_id not in node_map:
 						continue
@@ -146,16 +894,229 @@ class DomService:
 					child_node.parent = node
 					node.children.append(child_node)
 
-		html_to_dict = node_map[str(js_root_id)]
+		return node_map, selector_map, registry
 
-		del node_map
-		del js_node_map
-		del js_root_id
+	@staticmethod
+	@time_execution_sync('--decode_columns')
+	def _decode_columns(
+		columns: dict,
+	) -> tuple[dict[str, DOMBaseNode], SelectorMap, dict[int, DOMElementNode]]:
+		"""Decode the columnar payload of buildDomTree.js (see encodeColumnar) into mutable nodes, used when the tree is patched later."""
+		strings = columns['strings']
+		attr_offsets = columns['attrOffsets']
+		attr_names = columns['attrNames']
+		attr_values = columns['attrValues']
+		rects = columns['rects']
 
-		if html_to_dict is None or not isinstance(html_to_dict, DOMElementNode):
-			raise ValueError('Failed to parse HTML to dictionary')
+		nodes: list[DOMBaseNode] = []
+		selector_map = {}
+		registry = {}
 
-		return html_to_dict, selector_map
+		rows = zip(
+			columns['flags'],
+			columns['tag'],
+			columns['value'],
+			columns['highlight'],
+			columns['registry'],
+			columns['ref'],
+			columns['rect'],
+		)
+		for index, (flags, tag, value, highlight_index, registry_id, ref, rect) in enumerate(rows):
+			if flags & FLAG_TEXT:
+				nodes.append(DOMTextNode(text=strings[value], is_visible=bool(flags & FLAG_VISIBLE), parent=None))
+				continue
+
+			start, end = attr_offsets[index], attr_offsets[index + 1]
+			attributes = {strings[name]: strings[attr] for name, attr in zip(attr_names[start:end], attr_values[start:end])}
+
+			element_node = DOMElementNode(
+				tag_name=strings[tag],
+				xpath=strings[value],
+				attributes=attributes,
+				children=[],
+				is_visible=bool(flags & FLAG_VISIBLE),
+				is_interactive=bool(flags & FLAG_INTERACTIVE),
+				is_top_element=bool(flags & FLAG_TOP_ELEMENT),
+				is_in_viewport=bool(flags & FLAG_IN_VIEWPORT),
+				highlight_index=highlight_index if highlight_index >= 0 else None,
+				shadow_root=bool(flags & FLAG_SHADOW_ROOT),
+				parent=None,
+				element_ref=ref if ref >= 0 else None,
+				viewport_coordinates=CoordinateSet.from_rect(*rects[rect : rect + 4]) if rect >= 0 else None,
+			)
+			nodes.append(element_node)
+
+			if highlight_index >= 0:
+				selector_map[highlight_index] = element_node
+			if registry_id >= 0:
+				registry[registry_id] = element_node
+
+		# Nodes are in creation order, so siblings are appended in document order
+		for node, parent_index in zip(nodes, columns['parent']):
+			if parent_index >= 0:
+				parent = nodes[parent_index]
+				node.parent = parent
+				parent.children.append(node)
+
+		return {str(index): node for index, node in enumerate(nodes)}, selector_map, registry
+
+	@time_execution_async('--patch_dom_tree')
+	async def _patch_dom_tree(
+		self,
+		eval_page: dict,
+		highlight_elements: bool,
+		focus_element: int,
+	) -> tuple[DOMElementNode, SelectorMap] | None:
+		"""
+		Splice the re-walked subtrees into a new version of the previous tree. Returns None if the tree cannot be patched.
+
+		The previous tree and its nodes are not modified, states handed out before keep their indices. Only the
+		ancestors of the re-walked subtrees and the nodes whose highlight index changes are copied, the rest of the
+		tree is shared with the previous version (see _copy_path).
+		"""
+		assert self._incremental_tree is not None
+
+		subtrees: list[tuple[int, str | None]] = eval_page['subtrees']
+		old_nodes = [self._registry.get(registry_id) for registry_id, _ in subtrees]
+		if any(node is None or node.parent is None for node in old_nodes):
+			return None
+
+		node_map, _, registry = self._construct_nodes(eval_page)
+
+		# None drops the subtree, its root does not qualify for the tree anymore
+		replacements = {
+			id(old_node): node_map.get(str(js_node_id)) if js_node_id is not None else None
+			for old_node, (_, js_node_id) in zip(old_nodes, subtrees)
+		}
+		for old_node in old_nodes:
+			self._unregister_subtree(old_node)  # type: ignore[arg-type]
+		# Nodes that are new in this version of the tree, the others are shared with the previous version
+		owned = {id(node) for node in node_map.values()}
+		element_tree = self._copy_path(self._incremental_tree, old_nodes, replacements, owned)  # type: ignore[arg-type]
+		self._registry.update(registry)
+		self._registry_ids.update((id(node), registry_id) for registry_id, node in registry.items())
+		self._incremental_tree = element_tree
+
+		self._incremental_patches += 1
+		selector_map = self._reindex_highlights(element_tree, owned)
+
+		if highlight_elements and selector_map:
+			highlights = [
+				[index, self._registry_ids[id(node)]]
+				for index, node in selector_map.items()
+				if (focus_element < 0 or index == focus_element) and id(node) in self._registry_ids
+			]
+			await self._evaluate_build_dom_tree({'highlightOnly': highlights})
+
+		logger.debug('Patched %d subtree(s) of the DOM tree incrementally', len(subtrees))
+		return element_tree, selector_map
+
+	def _unregister_subtree(self, root: DOMBaseNode) -> None:
+		"""Forget the in-page registry ids of a subtree that is replaced or dropped"""
+		stack = [root]
+		while stack:
+			node = stack.pop()
+			registry_id = self._registry_ids.pop(id(node), None)
+			if registry_id is not None and self._registry.get(registry_id) is node:
+				del self._registry[registry_id]
+			if isinstance(node, DOMElementNode):
+				stack.extend(node.children)
+
+	def _copy_node(self, node: DOMElementNode, parent: DOMElementNode | None, owned: set[int]) -> DOMElementNode:
+		"""Shallow copy of a node with a children list of its own, registered in place of the node and added to owned"""
+		node_copy = copy.copy(node)
+		node_copy.children = list(node.children)
+		node_copy.parent = parent
+		registry_id = self._registry_ids.pop(id(node), None)
+		if registry_id is not None:
+			self._registry[registry_id] = node_copy
+			self._registry_ids[id(node_copy)] = registry_id
+		owned.add(id(node_copy))
+		return node_copy
+
+	def _copy_path(
+		self,
+		root: DOMElementNode,
+		old_nodes: list[DOMElementNode],
+		replacements: dict[int, DOMElementNode | None],
+		owned: set[int],
+	) -> DOMElementNode:
+		"""
+		The tree with the nodes in replacements (id(node) -> new node or None) swapped, copying only their ancestors.
+
+		Subtrees off those paths are shared with the previous tree. Their nodes still point to the parent they have in
+		the previous tree, which has the same tag, xpath and attributes as its copy: walking up from them is the same,
+		only the siblings seen through `parent.children` may be the previous ones.
+		"""
+		on_path: set[int] = set()
+		for old_node in old_nodes:
+			node = old_node.parent
+			while node is not None and id(node) not in on_path:
+				on_path.add(id(node))
+				node = node.parent
+
+		element_tree = self._copy_node(root, None, owned)
+		stack = [element_tree]
+		while stack:
+			node_copy = stack.pop()
+			children = []
+			for child in node_copy.children:
+				if id(child) in replacements:
+					child = replacements[id(child)]
+					if child is None:
+						continue
+					child.parent = node_copy
+				elif id(child) in on_path:
+					child = self._copy_node(child, node_copy, owned)  # type: ignore[arg-type]
+					stack.append(child)
+				children.append(child)
+			node_copy.children = children
+		return element_tree
+
+	def _reindex_highlights(self, root: DOMElementNode, owned: set[int]) -> SelectorMap:
+		"""
+		Assign highlight indices in document order, the same order buildDomTree.js uses on a full walk.
+
+		Nodes that are not in owned are shared with the previous tree, they are copied with their ancestors before their
+		index changes.
+		"""
+		selector_map = {}
+		# The node being visited and its ancestors, the ones copied are replaced as they are copied
+		path: list[DOMElementNode] = []
+
+		def own(depth: int) -> DOMElementNode:
+			node = path[depth]
+			if id(node) not in owned:
+				parent = own(depth - 1)
+				node_copy = self._copy_node(node, parent, owned)
+				parent.children[next(i for i, child in enumerate(parent.children) if child is node)] = node_copy
+				path[depth] = node_copy
+			return path[depth]
+
+		stack: list[tuple[DOMBaseNode, int]] = [(root, 0)]
+		while stack:
+			node, depth = stack.pop()
+			if not isinstance(node, DOMElementNode):
+				continue
+			del path[depth:]
+			path.append(node)
+			if node.highlight_index is not None:
+				if node.highlight_index != len(selector_map):
+					node = own(depth)
+					node.highlight_index = len(selector_map)
+				if id(node) in owned:
+					# The browser context sets is_new again on the elements of the new state
+					node.is_new = None
+				selector_map[node.highlight_index] = node
+			stack.extend((child, depth + 1) for child in reversed(node.children))
+		return selector_map
+
+	def _reset_incremental_state(self) -> None:
+		self._incremental_tree = None
+		self._incremental_args = None
+		self._incremental_patches = 0
+		self._registry = {}
+		self._registry_ids = {}
 
 	def _parse_node(
 		self,
@@ -196,6 +1157,8 @@ class DomService:
 			shadow_root=node_data.get('shadowRoot', False),
 			parent=None,
 			viewport_info=viewport_info,
+			element_ref=node_data.get('ref'),
+			viewport_coordinates=CoordinateSet.from_rect(*node_data['rect']) if 'rect' in node_data else None,
 		)
 
 		children_ids = node_data.get('children', [])
@@ -0,0 +1,597 @@
+"""
+Builds the DOM tree from a CDP DOMSnapshot.captureSnapshot instead of walking the page with buildDomTree.js.
+
+The snapshot comes as flat per-document arrays (nodes, layout boxes, computed styles, paint order), the rules of
+buildDomTree.js (accepted elements, visibility, top element, interactivity, highlighting, xpaths) are re-implemented
+over them. Per-box checks are vectorized with NumPy, only the tree walk itself runs per node.
+"""
+
+import numpy as np
+
+from browser_use.dom.history_tree_processor.view import CoordinateSet
+from browser_use.dom.views import DOMElementNode, DOMTextNode, PageInfo, SelectorMap
+
+# Computed styles requested from captureSnapshot, in this order
+SNAPSHOT_COMPUTED_STYLES = [
+	'display',
+	'visibility',
+	'opacity',
+	'cursor',
+	'position',
+	'pointer-events',
+	'overflow-x',
+	'overflow-y',
+]
+STYLE_DISPLAY = 0
+STYLE_VISIBILITY = 1
+STYLE_OPACITY = 2
+STYLE_CURSOR = 3
+STYLE_POSITION = 4
+STYLE_POINTER_EVENTS = 5
+STYLE_OVERFLOW_X = 6
+STYLE_OVERFLOW_Y = 7
+
+ELEMENT_NODE = 1
+TEXT_NODE = 3
+DOCUMENT_FRAGMENT_NODE = 11
+
+HIGHLIGHT_CONTAINER_ID = 'playwright-highlight-container'
+
+# Same sets as in buildDomTree.js
+LEAF_ELEMENT_DENY_LIST = {'svg', 'script', 'style', 'link', 'meta', 'noscript', 'template'}
+INTERACTIVE_CURSORS = {
+	'pointer',
+	'move',
+	'text',
+	'grab',
+	'grabbing',
+	'cell',
+	'copy',
+	'alias',
+	'all-scroll',
+	'col-resize',
+	'context-menu',
+	'crosshair',
+	'e-resize',
+	'ew-resize',
+	'help',
+	'n-resize',
+	'ne-resize',
+	'nesw-resize',
+	'ns-resize',
+	'nw-resize',
+	'nwse-resize',
+	'row-resize',
+	's-resize',
+	'se-resize',
+	'sw-resize',
+	'vertical-text',
+	'w-resize',
+	'zoom-in',
+	'zoom-out',
+}
+NON_INTERACTIVE_CURSORS = {'not-allowed', 'no-drop', 'wait', 'progress', 'initial', 'inherit'}
+INTERACTIVE_ELEMENTS = {
+	'a',
+	'button',
+	'input',
+	'select',
+	'textarea',
+	'details',
+	'summary',
+	'label',
+	'option',
+	'optgroup',
+	'fieldset',
+	'legend',
+}
+INTERACTIVE_ROLES = {
+	'button',
+	'menuitemradio',
+	'menuitemcheckbox',
+	'radio',
+	'checkbox',
+	'tab',
+	'switch',
+	'slider',
+	'spinbutton',
+	'combobox',
+	'searchbox',
+	'textbox',
+	'option',
+	'scrollbar',
+}
+INTERACTIVE_CANDIDATE_TAGS = {'a', 'button', 'input', 'select', 'textarea', 'details', 'summary'}
+DISTINCT_INTERACTIVE_TAGS = {'a', 'button', 'input', 'select', 'textarea', 'summary', 'details', 'label', 'option'}
+DISTINCT_INTERACTIVE_ROLES = INTERACTIVE_ROLES | {'link', 'menuitem', 'listbox'}
+MOUSE_EVENT_ATTRIBUTES = ('onclick', 'onmousedown', 'onmouseup', 'ondblclick')
+INTERACTION_EVENT_ATTRIBUTES = (
+	'onmousedown',
+	'onmouseup',
+	'onkeydown',
+	'onkeyup',
+	'onsubmit',
+	'onchange',
+	'oninput',
+	'onfocus',
+	'onblur',
+)
+
+# Candidates are hit-tested against all boxes in blocks of this many, to bound the size of the boolean matrix
+HIT_TEST_BLOCK = 256
+
+
+class _SnapshotDocument:
+	"""
+	Arrays of one DocumentSnapshot. Per-box checks are done for all boxes at once and handed to the
+	tree walk as per-node lists, once the document is placed in the viewport of the top document.
+	"""
+
+	def __init__(self, data: dict, string_ids: dict[str, int], device_pixel_ratio: float):
+		nodes = data['nodes']
+		self.parent: list[int] = nodes['parentIndex']
+		self.node_type: list[int] = nodes['nodeType']
+		self.node_name: list[int] = nodes['nodeName']
+		self.backend_node_id: list[int] = nodes.get('backendNodeId', [])
+		self.node_value: list[int] = nodes.get('nodeValue', [-1] * len(self.parent))
+		self.attributes: list[list[int]] = nodes.get('attributes', [[] for _ in self.parent])
+		self.pseudo = set(nodes.get('pseudoType', {}).get('index', []))
+		content_document = nodes.get('contentDocumentIndex', {})
+		self.content_document = dict(zip(content_document.get('index', []), content_document.get('value', [])))
+		self.scroll = (data.get('scrollOffsetX', 0) / device_pixel_ratio, data.get('scrollOffsetY', 0) / device_pixel_ratio)
+		self.origin = (0.0, 0.0)
+
+		count = len(self.parent)
+		parent = np.asarray(self.parent, dtype=np.int64)
+		node_type = np.asarray(self.node_type, dtype=np.int64)
+		# Children in CSR layout, a stable sort keeps them in document order
+		has_parent = parent >= 0
+		self.child_ids = np.flatnonzero(has_parent)[np.argsort(parent[has_parent], kind='stable')].tolist()
+		self.child_offsets = np.concatenate(([0], np.cumsum(np.bincount(parent[has_parent], minlength=count)))).tolist()
+
+		# XPath position among the element siblings with the same name (0 if it is the only one), see getElementPosition
+		is_element = node_type == ELEMENT_NODE
+		if self.pseudo:
+			is_element[list(self.pseudo)] = False
+		parent_is_element = np.zeros(count, dtype=bool)
+		parent_is_element[has_parent] = is_element[parent[has_parent]]
+		positioned = np.flatnonzero(is_element & parent_is_element)
+		key = parent[positioned] * (len(string_ids) + 1) + np.asarray(self.node_name, dtype=np.int64)[positioned]
+		order = np.argsort(key, kind='stable')
+		sorted_key = key[order]
+		group_start = np.flatnonzero(np.concatenate(([True], sorted_key[1:] != sorted_key[:-1])))
+		group_size = np.diff(np.concatenate((group_start, [len(sorted_key)])))
+		rank = np.arange(len(sorted_key)) - np.repeat(group_start, group_size) + 1
+		position = np.zeros(count, dtype=np.int64)
+		position[positioned[order]] = np.where(np.repeat(group_size, group_size) > 1, rank, 0)
+		self.position = position.tolist()
+
+		layout = data['layout']
+		node_index = np.asarray(layout['nodeIndex'], dtype=np.int64)
+		layout_count = len(node_index)
+		# A node can own several boxes (continuations), the first one stands for the node
+		layout_of = np.full(count, -1, dtype=np.int64)
+		layout_of[node_index[::-1]] = np.arange(layout_count)[::-1]
+		self.layout_of = layout_of.tolist()
+		self.layout_node = node_index
+		self.bounds = np.asarray(layout['bounds'], dtype=np.float64).reshape(layout_count, 4) / device_pixel_ratio
+
+		self.box_of = layout_of
+		styles = np.full((layout_count, len(SNAPSHOT_COMPUTED_STYLES)), -1, dtype=np.int64)
+		for row, values in enumerate(layout['styles']):
+			styles[row, : len(values)] = values
+		self.paint_order = np.asarray(layout.get('paintOrders', np.arange(layout_count)), dtype=np.int64)
+
+		def style_is(style: int, *values: str):
+			return np.isin(styles[:, style], [string_ids.get(value, -2) for value in values])
+
+		self.display_none = style_is(STYLE_DISPLAY, 'none')
+		self.visibility_hidden = style_is(STYLE_VISIBILITY, 'hidden')
+		self.opacity_zero = style_is(STYLE_OPACITY, '0')
+		self.pointer_events_none = style_is(STYLE_POINTER_EVENTS, 'none')
+		self.fixed_or_sticky = style_is(STYLE_POSITION, 'fixed', 'sticky')
+		self.fixed = style_is(STYLE_POSITION, 'fixed')
+		self.clips = ~(style_is(STYLE_OVERFLOW_X, 'visible') & style_is(STYLE_OVERFLOW_Y, 'visible'))
+		self.cursor = styles[:, STYLE_CURSOR]
+
+	def place(self, origin: tuple[float, float], viewport_width: float, viewport_height: float, viewport_expansion: int) -> None:
+		"""Move the boxes into the viewport of the top document, `origin` is where this document starts in it"""
+		self.origin = origin
+		self.rects = self.bounds.copy()
+		self.rects[:, 0] += origin[0] - self.scroll[0]
+		self.rects[:, 1] += origin[1] - self.scroll[1]
+		left, top, width, height = self.rects.T
+		self.has_area = (width > 0) & (height > 0)
+		intersects = ~(
+			(top + height < -viewport_expansion)
+			| (top > viewport_height + viewport_expansion)
+			| (left + width < -viewport_expansion)
+			| (left > viewport_width + viewport_expansion)
+		)
+
+		# Per node, nodes without a box get the values of an empty box at the viewport origin
+		has_box = self.box_of >= 0
+		box = np.where(has_box, self.box_of, 0)
+
+		def per_node(values: np.ndarray, default: bool) -> list[bool]:
+			if not len(values):
+				return [default] * len(has_box)
+			return np.where(has_box, values[box], default).tolist()
+
+		# isElementVisible
+		self.visible = per_node(self.has_area & ~self.visibility_hidden & ~self.display_none, False)
+		# isInExpandedViewport
+		self.in_viewport = per_node(self.has_area & intersects, False)
+		# The quick check of buildDomTree.js only drops elements without size clearly outside the expanded viewport
+		self.quick_pass = per_node(self.fixed_or_sticky | (width > 0) | (height > 0) | intersects, True)
+		# checkVisibility({ checkOpacity, checkVisibilityCSS }) of the parent of a text node
+		self.style_visible = per_node(~self.display_none & ~self.visibility_hidden & ~self.opacity_zero, False)
+
+	def children(self, index: int) -> list[int]:
+		return self.child_ids[self.child_offsets[index] : self.child_offsets[index + 1]]
+
+
+class SnapshotProcessor:
+	"""
+	Turns the result of DOMSnapshot.captureSnapshot (with SNAPSHOT_COMPUTED_STYLES and paint order)
+	and Page.getLayoutMetrics into the same tree buildDomTree.js would return for the page.
+	"""
+
+	def __init__(self, snapshot: dict, layout_metrics: dict, viewport_expansion: int = 0):
+		self.strings: list[str] = snapshot['strings']
+		self.string_ids = {value: index for index, value in enumerate(self.strings)}
+		self.viewport_expansion = viewport_expansion
+
+		viewport = layout_metrics.get('cssLayoutViewport') or layout_metrics['layoutViewport']
+		self.viewport_width = viewport['clientWidth']
+		self.viewport_height = viewport['clientHeight']
+		self.layout_metrics = layout_metrics
+		content_size = layout_metrics.get('contentSize')
+		css_content_size = layout_metrics.get('cssContentSize')
+		device_pixel_ratio = content_size['width'] / css_content_size['width'] if content_size and css_content_size else 1.0
+		if not device_pixel_ratio or device_pixel_ratio <= 0:
+			device_pixel_ratio = 1.0
+
+		self.documents = [_SnapshotDocument(data, self.string_ids, device_pixel_ratio) for data in snapshot['documents']]
+		self._place(self.documents[0], (0.0, 0.0))
+		self._main_document_data = snapshot['documents'][0]
+
+	def _place(self, document: _SnapshotDocument, origin: tuple[float, float]) -> None:
+		document.place(origin, self.viewport_width, self.viewport_height, self.viewport_expansion)
+
+	def page_info(self) -> PageInfo:
+		main = self.documents[0]
+		visual_viewport = self.layout_metrics.get('cssVisualViewport') or self.layout_metrics.get('visualViewport', {})
+		content_size = self.layout_metrics.get('cssContentSize') or self.layout_metrics.get('contentSize', {})
+		data = self._main_document_data
+		return PageInfo(
+			url=self._string(data.get('documentURL', -1)),
+			title=self._string(data.get('title', -1)),
+			scroll_y=int(visual_viewport.get('pageY', main.scroll[1])),
+			viewport_width=int(self.viewport_width),
+			viewport_height=int(self.viewport_height),
+			scroll_height=int(content_size.get('height', 0)),
+		)
+
+	def build(self, highlight_elements: bool = True) -> tuple[DOMElementNode, SelectorMap]:
+		"""
+		Like buildDomTree.js, the children of a highlighted element are only highlighted when they are a distinct
+		interaction, and only if highlight_elements is set.
+		"""
+		main = self.documents[0]
+		body = self._find_body(main)
+		root = DOMElementNode(tag_name='body', xpath='/body', attributes={}, children=[], is_visible=False, parent=None)
+		if body is None:
+			return root, {}
+
+		self._top_elements = self._resolve_top_elements(main) if self.viewport_expansion != -1 else None
+		selector_map: SelectorMap = {}
+		highlight_index = 0
+
+		# (document, node index, parent node, isParentHighlighted, parent xpath, xpath position, inside contenteditable)
+		# or (None, node) to finish a node once its children are done
+		stack: list[tuple] = []
+		self._push_children(stack, main, body, root, False, 'html/body', False)
+		while stack:
+			entry = stack.pop()
+			if entry[0] is None:
+				node = entry[1]
+				# Skip empty anchor tags
+				if node.tag_name == 'a' and not node.children and 'href' not in node.attributes:
+					node.parent.children.pop()
+					if node.highlight_index is not None:
+						del selector_map[node.highlight_index]
+				continue
+
+			document, index, parent, is_parent_highlighted, parent_xpath, position, in_editable = entry
+			node_type = document.node_type[index]
+
+			if node_type == TEXT_NODE:
+				text_node = self._text_node(document, index, parent)
+				if text_node is not None:
+					parent.children.append(text_node)
+				continue
+			if node_type != ELEMENT_NODE or index in document.pseudo:
+				continue
+
+			tag_name = self._string(document.node_name[index]).lower()
+			attributes = self._attributes(document, index)
+			if tag_name in LEAF_ELEMENT_DENY_LIST or attributes.get('id') == HIGHLIGHT_CONTAINER_ID:
+				continue
+
+			if self.viewport_expansion != -1 and not document.quick_pass[index]:
+				continue
+
+			if parent_xpath is None:
+				xpath = ''  # direct child of a shadow root, getXPathTree stops before it
+			else:
+				segment = f'{tag_name}[{position}]' if position else tag_name
+				xpath = f'{parent_xpath}/{segment}' if parent_xpath else segment
+
+			is_candidate = tag_name in INTERACTIVE_CANDIDATE_TAGS or self._has_candidate_attribute(attributes)
+			node = DOMElementNode(
+				tag_name=tag_name,
+				xpath=xpath,
+				attributes=attributes if is_candidate or tag_name in ('iframe', 'body') else {},
+				children=[],
+				is_visible=document.visible[index],
+				parent=parent,
+			)
+
+			contenteditable = attributes.get('contenteditable')
+			is_editable = contenteditable in ('', 'true', 'plaintext-only') or (in_editable and contenteditable != 'false')
+
+			was_highlighted = False
+			if node.is_visible:
+				box = document.layout_of[index]
+				node.is_top_element = self._is_top_element(document, index)
+				if node.is_top_element:
+					node.is_interactive = self._is_interactive(document, box, tag_name, attributes, is_editable)
+					if node.is_interactive and (
+						not is_parent_highlighted or self._is_distinct_interaction(tag_name, attributes, is_editable)
+					):
+						node.is_in_viewport = self.viewport_expansion == -1 or document.in_viewport[index]
+						if node.is_in_viewport:
+							node.highlight_index = highlight_index
+							node.backend_node_id = document.backend_node_id[index] if document.backend_node_id else None
+							node.viewport_coordinates = self._coordinates(document, box)
+							selector_map[highlight_index] = node
+							highlight_index += 1
+							was_highlighted = highlight_elements
+
+			parent.children.append(node)
+			stack.append((None, node))
+
+			if tag_name == 'iframe':
+				content_document = document.content_document.get(index)
+				if content_document is not None:
+					frame_document = self.documents[content_document]
+					box = document.layout_of[index]
+					frame_rect = document.rects[box].tolist() if box >= 0 else (0.0, 0.0)
+					self._place(frame_document, (frame_rect[0], frame_rect[1]))
+					for child in reversed(frame_document.children(0)):
+						stack.append((frame_document, child, node, False, '', 0, False))
+			elif is_editable or attributes.get('id') == 'tinymce' or 'mce-content-body' in attributes.get('class', '').split():
+				self._push_children(stack, document, index, node, was_highlighted, xpath, True)
+			else:
+				self._push_children(
+					stack, document, index, node, was_highlighted or is_parent_highlighted, xpath, in_editable, was_highlighted
+				)
+
+		return root, selector_map
+
+	def _push_children(
+		self,
+		stack: list[tuple],
+		document: _SnapshotDocument,
+		index: int,
+		node: DOMElementNode,
+		is_highlighted: bool,
+		xpath: str,
+		in_editable: bool,
+		shadow_highlighted: bool | None = None,
+	) -> None:
+		"""Push the children of an element, shadow root content first"""
+		node_type = document.node_type
+		position = document.position
+		shadow_entries = []
+		light_entries = []
+		shadow_highlighted = is_highlighted if shadow_highlighted is None else shadow_highlighted
+		for child in document.children(index):
+			if node_type[child] == DOCUMENT_FRAGMENT_NODE:
+				node.shadow_root = True
+				for shadow_child in document.children(child):
+					shadow_entries.append((document, shadow_child, node, shadow_highlighted, None, 0, in_editable))
+			else:
+				light_entries.append((document, child, node, is_highlighted, xpath, position[child], in_editable))
+		stack.extend(reversed(light_entries))
+		stack.extend(reversed(shadow_entries))
+
+	def _text_node(self, document: _SnapshotDocument, index: int, parent: DOMElementNode) -> DOMTextNode | None:
+		text = self._string(document.node_value[index]).strip()
+		parent_index = document.parent[index]
+		if not text or parent_index < 0 or document.node_type[parent_index] != ELEMENT_NODE:
+			return None
+		if self._string(document.node_name[parent_index]).lower() == 'script':
+			return None
+
+		is_visible = document.style_visible[parent_index]
+		if self.viewport_expansion != -1:
+			is_visible = is_visible and document.in_viewport[index]
+		return DOMTextNode(text=text, is_visible=is_visible, parent=parent)
+
+	def _is_top_element(self, document: _SnapshotDocument, index: int) -> bool:
+		if self.viewport_expansion == -1:
+			return True
+		if not document.in_viewport[index]:
+			return False
+		# Elements of iframe documents are considered top by default, like in buildDomTree.js
+		if document is not self.documents[0]:
+			return True
+		return index in self._top_elements
+
+	def _resolve_top_elements(self, document: _SnapshotDocument) -> set[int]:
+		"""
+		The elementFromPoint check of buildDomTree.js for all elements at once: the box with the highest
+		paint order under the center of an element must be the element itself or one of its descendants.
+		"""
+		rects = self._clipped_rects(document)
+		left = rects[:, 0]
+		top = rects[:, 1]
+		right = left + rects[:, 2]
+		bottom = top + rects[:, 3]
+
+		on_screen = (right > 0) & (bottom > 0) & (left < self.viewport_width) & (top < self.viewport_height)
+		hittable = (
+			on_screen
+			& (rects[:, 2] > 0)
+			& (rects[:, 3] > 0)
+			& ~document.pointer_events_none
+			& ~document.visibility_hidden
+			& ~document.display_none
+		)
+		targets = np.flatnonzero(hittable)
+
+		# Candidates: element boxes with their center point inside the viewport
+		boxes = np.asarray(document.layout_of, dtype=np.int64)
+		node_type = np.asarray(document.node_type, dtype=np.int64)
+		candidates = np.flatnonzero((node_type == ELEMENT_NODE) & (boxes >= 0))
+		candidate_boxes = boxes[candidates]
+		center_x = document.rects[candidate_boxes, 0] + document.rects[candidate_boxes, 2] / 2
+		center_y = document.rects[candidate_boxes, 1] + document.rects[candidate_boxes, 3] / 2
+		inside = (
+			document.has_area[candidate_boxes]
+			& (center_x >= 0)
+			& (center_y >= 0)
+			& (center_x < self.viewport_width)
+			& (center_y < self.viewport_height)
+		)
+		candidates, center_x, center_y = candidates[inside], center_x[inside], center_y[inside]
+
+		top_elements: set[int] = set()
+		if not len(targets):
+			return top_elements
+		target_paint_order = document.paint_order[targets]
+		target_nodes = document.layout_node[targets]
+		for start in range(0, len(candidates), HIT_TEST_BLOCK):
+			x = center_x[start : start + HIT_TEST_BLOCK, None]
+			y = center_y[start : start + HIT_TEST_BLOCK, None]
+			contains = (x >= left[targets]) & (x < right[targets]) & (y >= top[targets]) & (y < bottom[targets])
+			scores = np.where(contains, target_paint_order, -1)
+			hits = scores.argmax(axis=1)
+			has_hit = scores[np.arange(len(hits)), hits] >= 0
+			for candidate, hit, found in zip(
+				candidates[start : start + HIT_TEST_BLOCK].tolist(), hits.tolist(), has_hit.tolist()
+			):
+				if found and self._is_ancestor_or_self(document, candidate, int(target_nodes[hit])):
+					top_elements.add(candidate)
+		return top_elements
+
+	@staticmethod
+	def _clipped_rects(document: _SnapshotDocument) -> np.ndarray:
+		"""Boxes cut to the overflow clip of their ancestors, the parts scrolled out of a container cannot be hit"""
+		rects = document.rects.copy()
+		clip_boxes = set(np.flatnonzero(document.clips).tolist())
+		if not clip_boxes:
+			return rects
+
+		fixed = document.fixed.tolist()
+		all_rects = document.rects.tolist()
+		layout_of = document.layout_of
+		clip: list[tuple | None] = [None] * len(document.parent)
+		for index, parent in enumerate(document.parent):
+			# Nodes come in document order, the parent's clip is already known
+			own_clip = clip[parent] if parent >= 0 else None
+			box = layout_of[index]
+			if box >= 0:
+				if fixed[box]:
+					own_clip = None
+				if own_clip is not None:
+					left, top, width, height = all_rects[box]
+					clip_left, clip_top, clip_right, clip_bottom = own_clip
+					new_left, new_top = max(left, clip_left), max(top, clip_top)
+					new_right, new_bottom = min(left + width, clip_right), min(top + height, clip_bottom)
+					rects[box] = (new_left, new_top, max(0.0, new_right - new_left), max(0.0, new_bottom - new_top))
+				if box in clip_boxes:
+					left, top, width, height = rects[box].tolist()
+					own_clip = (left, top, left + width, top + height)
+			clip[index] = own_clip
+		return rects
+
+	@staticmethod
+	def _is_ancestor_or_self(document: _SnapshotDocument, ancestor: int, index: int) -> bool:
+		while index >= 0:
+			if index == ancestor:
+				return True
+			index = document.parent[index]
+		return False
+
+	def _is_interactive(
+		self, document: _SnapshotDocument, box: int, tag_name: str, attributes: dict[str, str], is_editable: bool
+	) -> bool:
+		cursor = self._string(int(document.cursor[box])) if box >= 0 else ''
+		if tag_name != 'html' and cursor in INTERACTIVE_CURSORS:
+			return True
+
+		if tag_name in INTERACTIVE_ELEMENTS:
+			if cursor in NON_INTERACTIVE_CURSORS:
+				return False
+			return not any(name in attributes for name in ('disabled', 'readonly', 'inert'))
+
+		if attributes.get('contenteditable') == 'true' or is_editable:
+			return True
+
+		classes = attributes.get('class', '').split()
+		if (
+			'button' in classes
+			or 'dropdown-toggle' in classes
+			or attributes.get('data-index')
+			or attributes.get('data-toggle') == 'dropdown'
+			or attributes.get('aria-haspopup') == 'true'
+		):
+			return True
+
+		if attributes.get('role') in INTERACTIVE_ROLES or attributes.get('aria-role') in INTERACTIVE_ROLES:
+			return True
+
+		# getEventListeners is not available to page scripts, buildDomTree.js falls back to the attributes as well
+		return any(name in attributes for name in MOUSE_EVENT_ATTRIBUTES)
+
+	@staticmethod
+	def _is_distinct_interaction(tag_name: str, attributes: dict[str, str], is_editable: bool) -> bool:
+		return (
+			tag_name == 'iframe'
+			or tag_name in DISTINCT_INTERACTIVE_TAGS
+			or attributes.get('role') in DISTINCT_INTERACTIVE_ROLES
+			or is_editable
+			or any(name in attributes for name in ('data-testid', 'data-cy', 'data-test', 'onclick'))
+			or any(name in attributes for name in INTERACTION_EVENT_ATTRIBUTES)
+		)
+
+	@staticmethod
+	def _has_candidate_attribute(attributes: dict[str, str]) -> bool:
+		return (
+			'onclick' in attributes
+			or 'role' in attributes
+			or 'tabindex' in attributes
+			or 'aria-' in attributes
+			or 'data-action' in attributes
+			or attributes.get('contenteditable') == 'true'
+		)
+
+	@staticmethod
+	def _coordinates(document: _SnapshotDocument, box: int) -> CoordinateSet:
+		return CoordinateSet.from_rect(*document.rects[box].tolist())
+
+	def _attributes(self, document: _SnapshotDocument, index: int) -> dict[str, str]:
+		values = document.attributes[index]
+		return {self.strings[values[i]]: self.strings[values[i + 1]] for i in range(0, len(values) - 1, 2)}
+
+	def _find_body(self, document: _SnapshotDocument) -> int | None:
+		for index, name in enumerate(document.node_name):
+			if document.node_type[index] == ELEMENT_NODE and self._string(name).upper() == 'BODY':
+				return index
+		return None
+
+	def _string(self, index: int) -> str:
+		return self.strings[index] if index >= 0 else ''
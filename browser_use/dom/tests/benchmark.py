@@ -0,0 +1,313 @@
+"""
+Benchmark the DOM extraction on large generated fixture pages.
+
+Run with: python browser_use/dom/tests/benchmark.py [payload|serializer|hit-testing|streaming|engines|accessibility]
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.dom.service import DomService
+from browser_use.dom.views import DOMElementNode, DOMTextNode
+
+RUNS = 5
+
+
+def table_page(rows: int = 3000) -> str:
+	"""A wide data table, lots of siblings and one button per row"""
+	body = ''.join(
+		f'<tr><td>{i}</td><td>Customer {i}</td><td><span class="badge">active</span></td>'
+		f'<td><button class="btn btn-sm" data-row="{i}">Edit</button></td></tr>'
+		for i in range(rows)
+	)
+	return f'<html><body><table><thead><tr><th>#</th><th>Name</th><th>Status</th><th></th></tr></thead><tbody>{body}</tbody></table></body></html>'
+
+
+def feed_page(cards: int = 1500) -> str:
+	"""An infinite-feed style page with deeply nested cards"""
+	card = (
+		'<article class="card"><header><a href="/u/{i}">user {i}</a></header>'
+		'<div class="content"><div><div><p>Post number {i} with some <b>formatted</b> text</p></div></div></div>'
+		'<footer><button aria-label="like">Like</button><button aria-label="share">Share</button></footer></article>'
+	)
+	return '<html><body><main>' + ''.join(card.format(i=i) for i in range(cards)) + '</main></body></html>'
+
+
+def dashboard_page(widgets: int = 400) -> str:
+	"""A dashboard with overlapping positioned widgets and a sticky header"""
+	widget = (
+		'<div class="widget" style="position:relative;display:inline-block;width:220px;margin:4px">'
+		'<h3>Widget {i}</h3><select name="range-{i}"><option>7d</option><option>30d</option></select>'
+		'<input type="text" placeholder="filter {i}"><div style="position:absolute;top:0;right:0">'
+		'<button>⋮</button></div></div>'
+	)
+	header = '<header style="position:sticky;top:0;z-index:10;background:#fff"><nav><a href="/">Home</a><a href="/reports">Reports</a></nav></header>'
+	return '<html><body>' + header + ''.join(widget.format(i=i) for i in range(widgets)) + '</body></html>'
+
+
+def form_page(sections: int = 60) -> str:
+	"""A back-office form with labelled inputs, selects, checkboxes and radio groups"""
+	section = (
+		'<fieldset><legend>Line {i}</legend><label>SKU <input name="sku-{i}" value="SKU-{i}"></label>'
+		'<label>Quantity <input type="number" name="qty-{i}" value="1"></label>'
+		'<label>Warehouse <select name="wh-{i}"><option>Berlin</option><option>Lyon</option><option>Porto</option></select></label>'
+		'<label><input type="checkbox" name="gift-{i}"> Gift wrap</label>'
+		'<label><input type="radio" name="ship-{i}" checked> Standard</label><label><input type="radio" name="ship-{i}"> Express</label>'
+		'<textarea name="note-{i}" placeholder="Note"></textarea></fieldset>'
+	)
+	return (
+		'<html><body><form>'
+		+ ''.join(section.format(i=i) for i in range(sections))
+		+ '<button>Submit</button></form></body></html>'
+	)
+
+
+FIXTURES = {
+	'table': table_page,
+	'feed': feed_page,
+	'dashboard': dashboard_page,
+	'form': form_page,
+}
+
+
+async def measure_payload(page, service: DomService, compact_payload: bool) -> int:
+	"""Size of the serialized result as it crosses the protocol"""
+	args = {
+		'doHighlightElements': False,
+		'focusHighlightIndex': -1,
+		'viewportExpansion': -1,
+		'debugMode': False,
+		'compactPayload': compact_payload,
+	}
+	result = await page.evaluate(service.js_code, args)
+	return len(result) if isinstance(result, str) else len(json.dumps(result))
+
+
+async def benchmark_payload_formats():
+	browser = Browser(config=BrowserConfig(headless=True))
+	try:
+		async with await browser.new_context() as context:
+			page = await context.get_current_page()
+			for name, fixture in FIXTURES.items():
+				await page.set_content(fixture())
+				service = DomService(page)
+
+				for compact_payload in (False, True):
+					timings = []
+					for _ in range(RUNS):
+						start = time.perf_counter()
+						state = await service.get_clickable_elements(
+							highlight_elements=False, viewport_expansion=-1, compact_payload=compact_payload
+						)
+						timings.append(time.perf_counter() - start)
+
+					payload_size = await measure_payload(page, service, compact_payload)
+					label = 'columnar' if compact_payload else 'map'
+					print(
+						f'{name:>10} {label:>9}: {statistics.median(timings) * 1000:8.1f} ms median, '
+						f'{payload_size / 1024:8.1f} KiB payload, {len(state.selector_map)} elements'
+					)
+	finally:
+		await browser.close()
+
+
+async def benchmark_hit_testing():
+	"""elementFromPoint per element vs the spatial grid, on the rendered viewport (viewportExpansion=0)"""
+	browser = Browser(config=BrowserConfig(headless=True))
+	try:
+		async with await browser.new_context() as context:
+			page = await context.get_current_page()
+			for name, fixture in FIXTURES.items():
+				await page.set_content(fixture())
+				service = DomService(page)
+
+				highlighted = {}
+				for spatial_hit_testing in (False, True):
+					args = {
+						'doHighlightElements': False,
+						'focusHighlightIndex': -1,
+						'viewportExpansion': 0,
+						'debugMode': True,
+						'spatialHitTesting': spatial_hit_testing,
+					}
+					timings = []
+					for _ in range(RUNS):
+						start = time.perf_counter()
+						result = await page.evaluate(service.js_code, args)
+						timings.append(time.perf_counter() - start)
+
+					metrics = result['perfMetrics']
+					breakdown = metrics['buildDomTreeBreakdown']
+					highlighted[spatial_hit_testing] = {
+						node['xpath'] for node in result['map'].values() if node.get('highlightIndex') is not None
+					}
+					label = 'spatial' if spatial_hit_testing else 'per-element'
+					print(
+						f'{name:>10} {label:>11}: {statistics.median(timings) * 1000:8.1f} ms median, '
+						f'{breakdown["domOperationCounts"]["elementFromPoint"]:6d} elementFromPoint calls, '
+						f'{len(highlighted[spatial_hit_testing])} highlighted'
+					)
+					if spatial_hit_testing:
+						print(f'{"":>24}{json.dumps(metrics["spatialHitTesting"])}')
+
+				if highlighted[False] != highlighted[True]:
+					print(f'{"":>24}differs on {len(highlighted[False] ^ highlighted[True])} highlighted elements')
+	finally:
+		await browser.close()
+
+
+async def benchmark_streaming():
+	"""One blocking walk vs the streamed walk, the longest main-thread task is measured in the page"""
+	observe_long_tasks = """() => {
+		window.__longestTask = 0;
+		new PerformanceObserver((list) => {
+			for (const entry of list.getEntries()) window.__longestTask = Math.max(window.__longestTask, entry.duration);
+		}).observe({ type: 'longtask' });
+	}"""
+	browser = Browser(config=BrowserConfig(headless=True))
+	try:
+		async with await browser.new_context() as context:
+			page = await context.get_current_page()
+			for name, fixture in FIXTURES.items():
+				for stream in (False, True):
+					await page.set_content(fixture())
+					await page.evaluate(observe_long_tasks)
+					service = DomService(page)
+
+					start = time.perf_counter()
+					state = await service.get_clickable_elements(highlight_elements=False, viewport_expansion=-1, stream=stream)
+					elapsed = time.perf_counter() - start
+					longest_task = await page.evaluate('() => window.__longestTask')
+
+					label = 'streamed' if stream else 'blocking'
+					print(
+						f'{name:>10} {label:>8}: {elapsed * 1000:8.1f} ms total, {longest_task:6.0f} ms longest task, '
+						f'{len(state.selector_map)} elements'
+					)
+	finally:
+		await browser.close()
+
+
+async def benchmark_engines():
+	"""buildDomTree.js vs the DOMSnapshot engine, and how far their highlighted elements agree"""
+	browser = Browser(config=BrowserConfig(headless=True))
+	try:
+		async with await browser.new_context() as context:
+			page = await context.get_current_page()
+			for name, fixture in FIXTURES.items():
+				await page.set_content(fixture())
+				service = DomService(page)
+
+				highlighted = {}
+				for engine in ('js', 'snapshot'):
+					for viewport_expansion in (0, -1):
+						timings = []
+						for _ in range(RUNS):
+							start = time.perf_counter()
+							state = await service.get_clickable_elements(
+								highlight_elements=False, viewport_expansion=viewport_expansion, engine=engine
+							)
+							timings.append(time.perf_counter() - start)
+						highlighted[engine, viewport_expansion] = {node.xpath for node in state.selector_map.values()}
+						print(
+							f'{name:>10} {engine:>8} expansion {viewport_expansion:>2}: '
+							f'{statistics.median(timings) * 1000:8.1f} ms median, {len(state.selector_map)} elements'
+						)
+
+				for viewport_expansion in (0, -1):
+					difference = highlighted['js', viewport_expansion] ^ highlighted['snapshot', viewport_expansion]
+					if difference:
+						print(f'{"":>10} expansion {viewport_expansion:>2}: engines differ on {len(difference)} elements')
+	finally:
+		await browser.close()
+
+
+async def benchmark_accessibility():
+	"""buildDomTree.js vs the accessibility tree, on the whole page, and the size of the state text the LLM gets"""
+	include_attributes = ['title', 'type', 'name', 'role', 'aria-label', 'placeholder', 'value', 'alt', 'aria-expanded']
+	browser = Browser(config=BrowserConfig(headless=True))
+	try:
+		async with await browser.new_context() as context:
+			page = await context.get_current_page()
+			for name, fixture in FIXTURES.items():
+				await page.set_content(fixture())
+				service = DomService(page)
+
+				for engine in ('js', 'accessibility'):
+					timings = []
+					for _ in range(RUNS):
+						start = time.perf_counter()
+						state = await service.get_clickable_elements(
+							highlight_elements=False, viewport_expansion=-1, engine=engine
+						)
+						timings.append(time.perf_counter() - start)
+					state_text = state.element_tree.clickable_elements_to_string(include_attributes=include_attributes)
+					print(
+						f'{name:>10} {engine:>13}: {statistics.median(timings) * 1000:8.1f} ms median, '
+						f'{len(state.selector_map)} elements, {len(state_text) / 1024:7.1f} KiB state text'
+					)
+	finally:
+		await browser.close()
+
+
+def synthetic_tree(size: int, depth: int) -> DOMElementNode:
+	"""Nested sections of `depth` levels, every fifth element highlighted, until `size` nodes exist"""
+	root = DOMElementNode(tag_name='body', xpath='body', attributes={}, children=[], is_visible=True, parent=None)
+	count = 0
+	highlight_index = 0
+	while count < size:
+		parent = root
+		for level in range(depth):
+			highlighted = count % 5 == 0
+			node = DOMElementNode(
+				tag_name='button' if highlighted else 'div',
+				xpath=f'div[{count}]',
+				attributes={'class': 'item', 'aria-label': f'item {count}'},
+				children=[],
+				is_visible=True,
+				is_top_element=True,
+				highlight_index=highlight_index if highlighted else None,
+				parent=parent,
+			)
+			highlight_index += highlighted
+			parent.children.append(node)
+			parent.children.append(DOMTextNode(text=f'label {count}', is_visible=True, parent=parent))
+			parent = node
+			count += 2
+	return root
+
+
+def benchmark_serializer():
+	"""clickable_elements_to_string should scale linearly with the number of nodes, independent of the depth"""
+	for depth in (10, 100, 5000):
+		for size in (10_000, 40_000, 160_000):
+			tree = synthetic_tree(size, depth)
+			timings = []
+			for _ in range(RUNS):
+				start = time.perf_counter()
+				tree.clickable_elements_to_string(include_attributes=['aria-label'])
+				timings.append(time.perf_counter() - start)
+			median = statistics.median(timings)
+			print(f'depth {depth:>5} {size:>8} nodes: {median * 1000:8.1f} ms median, {median / size * 1e6:6.2f} µs/node')
+
+
+if __name__ == '__main__':
+	if sys.argv[1:] == ['serializer']:
+		benchmark_serializer()
+	elif sys.argv[1:] == ['hit-testing']:
+		asyncio.run(benchmark_hit_testing())
+	elif sys.argv[1:] == ['streaming']:
+		asyncio.run(benchmark_streaming())
+	elif sys.argv[1:] == ['engines']:
+		asyncio.run(benchmark_engines())
+	elif sys.argv[1:] == ['accessibility']:
+		asyncio.run(benchmark_accessibility())
+	else:
+		asyncio.run(benchmark_payload_formats())
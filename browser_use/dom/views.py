@@ -1,3 +1,5 @@
+import weakref
+from array import array
 from dataclasses import dataclass
 from functools import cached_property
 from typing import TYPE_CHECKING, Optional
@@ -9,6 +11,14 @@ from browser_use.utils import time_execution_sync
 if TYPE_CHECKING:
 	from .views import DOMElementNode
 
+# Bits of the `flags` column of the columnar payload, keep in sync with NODE_FLAGS in buildDomTree.js
+FLAG_TEXT = 1
+FLAG_VISIBLE = 2
+FLAG_INTERACTIVE = 4
+FLAG_TOP_ELEMENT = 8
+FLAG_IN_VIEWPORT = 16
+FLAG_SHADOW_ROOT = 32
+
 
 @dataclass(frozen=False)
 class DOMBaseNode:
@@ -71,6 +81,10 @@ class DOMElementNode(DOMBaseNode):
 	viewport_coordinates: CoordinateSet | None = None
 	page_coordinates: CoordinateSet | None = None
 	viewport_info: ViewportInfo | None = None
+	# How actions find the element in the page again without a selector, see DomService.resolve_element:
+	# its id in the element registry of buildDomTree.js, or its CDP backend node id for trees built from CDP
+	element_ref: int | None = None
+	backend_node_id: int | None = None
 
 	"""
 	### State injected by the browser context.
@@ -132,107 +146,116 @@ class DOMElementNode(DOMBaseNode):
 	def get_all_text_till_next_clickable_element(self, max_depth: int = -1) -> str:
 		text_parts = []
 
-		def collect_text(node: DOMBaseNode, current_depth: int) -> None:
+		stack: list[tuple[DOMBaseNode, int]] = [(self, 0)]
+		while stack:
+			node, current_depth = stack.pop()
 			if max_depth != -1 and current_depth > max_depth:
-				return
+				continue
 
 			# Skip this branch if we hit a highlighted element (except for the current node)
-			if isinstance(node, DOMElementNode) and node != self and node.highlight_index is not None:
-				return
+			if isinstance(node, DOMElementNode) and node is not self and node.highlight_index is not None:
+				continue
 
 			if isinstance(node, DOMTextNode):
 				text_parts.append(node.text)
 			elif isinstance(node, DOMElementNode):
-				for child in node.children:
-					collect_text(child, current_depth + 1)
+				stack.extend((child, current_depth + 1) for child in reversed(node.children))
 
-		collect_text(self, 0)
 		return '\n'.join(text_parts).strip()
 
 	@time_execution_sync('--clickable_elements_to_string')
 	def clickable_elements_to_string(self, include_attributes: list[str] | None = None) -> str:
 		"""Convert the processed DOM content to HTML."""
-		formatted_text = []
-
-		def process_node(node: DOMBaseNode, depth: int) -> None:
-			next_depth = int(depth)
-			depth_str = depth * '\t'
+		formatted_text: list[str] = []
+		# Text of every highlighted element, filled in while its subtree is visited: (line number, node, depth, text parts)
+		highlighted: list[tuple[int, DOMElementNode, int, list[str]]] = []
+
+		# Single iterative pre-order pass. Every text node is appended to its nearest highlighted ancestor, which is
+		# exactly what get_all_text_till_next_clickable_element() would collect for that ancestor.
+		# Text below an already highlighted ancestor of self is never printed on its own
+		outer_text: list[str] | None = None
+		ancestor = self.parent
+		while ancestor is not None and outer_text is None:
+			outer_text = [] if ancestor.highlight_index is not None else None
+			ancestor = ancestor.parent
+
+		stack: list[tuple[DOMBaseNode, int, list[str] | None]] = [(self, 0, outer_text)]
+		while stack:
+			node, depth, owner_text = stack.pop()
 
 			if isinstance(node, DOMElementNode):
-				# Add element with highlight_index
+				next_depth = depth
 				if node.highlight_index is not None:
 					next_depth += 1
-
-					text = node.get_all_text_till_next_clickable_element()
-					attributes_html_str = ''
-					if include_attributes:
-						attributes_to_include = {
-							key: str(value) for key, value in node.attributes.items() if key in include_attributes
-						}
-
-						# Easy LLM optimizations
-						# if tag == role attribute, don't include it
-						if node.tag_name == attributes_to_include.get('role'):
-							del attributes_to_include['role']
-
-						# if aria-label == text of the node, don't include it
-						if (
-							attributes_to_include.get('aria-label')
-							and attributes_to_include.get('aria-label', '').strip() == text.strip()
-						):
-							del attributes_to_include['aria-label']
-
-						# if placeholder == text of the node, don't include it
-						if (
-							attributes_to_include.get('placeholder')
-							and attributes_to_include.get('placeholder', '').strip() == text.strip()
-						):
-							del attributes_to_include['placeholder']
-
-						if attributes_to_include:
-							# Format as key1='value1' key2='value2'
-							attributes_html_str = ' '.join(f"{key}='{value}'" for key, value in attributes_to_include.items())
-
-					# Build the line
-					if node.is_new:
-						highlight_indicator = f'*[{node.highlight_index}]*'
-					else:
-						highlight_indicator = f'[{node.highlight_index}]'
-
-					line = f'{depth_str}{highlight_indicator}<{node.tag_name}'
-
-					if attributes_html_str:
-						line += f' {attributes_html_str}'
-
-					if text:
-						# Add space before >text only if there were NO attributes added before
-						if not attributes_html_str:
-							line += ' '
-						line += f'>{text}'
-					# Add space before /> only if neither attributes NOR text were added
-					elif not attributes_html_str:
-						line += ' '
-
-					line += ' />'  # 1 token
-					formatted_text.append(line)
+					owner_text = []
+					highlighted.append((len(formatted_text), node, depth, owner_text))
+					formatted_text.append('')  # filled in once all text of the subtree is known
 
 				# Process children regardless
-				for child in node.children:
-					process_node(child, next_depth)
+				stack.extend((child, next_depth, owner_text) for child in reversed(node.children))
 
 			elif isinstance(node, DOMTextNode):
+				if owner_text is not None:
+					owner_text.append(node.text)
 				# Add text only if it doesn't have a highlighted parent
-				if (
-					not node.has_parent_with_highlight_index()
-					and node.parent
-					and node.parent.is_visible
-					and node.parent.is_top_element
-				):  # and node.is_parent_top_element()
+				elif node.parent and node.parent.is_visible and node.parent.is_top_element:
+					depth_str = depth * '\t'
 					formatted_text.append(f'{depth_str}{node.text}')
 
-		process_node(self, 0)
+		for line_number, node, depth, text_parts in highlighted:
+			formatted_text[line_number] = self._format_highlighted_element(
+				node, depth, '\n'.join(text_parts).strip(), include_attributes
+			)
+
 		return '\n'.join(formatted_text)
 
+	@staticmethod
+	def _format_highlighted_element(node: 'DOMElementNode', depth: int, text: str, include_attributes: list[str] | None) -> str:
+		attributes_html_str = ''
+		if include_attributes:
+			attributes_to_include = {key: str(value) for key, value in node.attributes.items() if key in include_attributes}
+
+			# Easy LLM optimizations
+			# if tag == role attribute, don't include it
+			if node.tag_name == attributes_to_include.get('role'):
+				del attributes_to_include['role']
+
+			# if aria-label == text of the node, don't include it
+			if attributes_to_include.get('aria-label') and attributes_to_include.get('aria-label', '').strip() == text.strip():
+				del attributes_to_include['aria-label']
+
+			# if placeholder == text of the node, don't include it
+			if attributes_to_include.get('placeholder') and attributes_to_include.get('placeholder', '').strip() == text.strip():
+				del attributes_to_include['placeholder']
+
+			if attributes_to_include:
+				# Format as key1='value1' key2='value2'
+				attributes_html_str = ' '.join(f"{key}='{value}'" for key, value in attributes_to_include.items())
+
+		# Build the line
+		if node.is_new:
+			highlight_indicator = f'*[{node.highlight_index}]*'
+		else:
+			highlight_indicator = f'[{node.highlight_index}]'
+
+		depth_str = depth * '\t'
+		line = f'{depth_str}{highlight_indicator}<{node.tag_name}'
+
+		if attributes_html_str:
+			line += f' {attributes_html_str}'
+
+		if text:
+			# Add space before >text only if there were NO attributes added before
+			if not attributes_html_str:
+				line += ' '
+			line += f'>{text}'
+		# Add space before /> only if neither attributes NOR text were added
+		elif not attributes_html_str:
+			line += ' '
+
+		line += ' />'  # 1 token
+		return line
+
 	def get_file_upload_element(self, check_siblings: bool = True) -> Optional['DOMElementNode']:
 		# Check if current element is a file input
 		if self.tag_name == 'input' and self.attributes.get('type') == 'file':
@@ -256,9 +279,210 @@ class DOMElementNode(DOMBaseNode):
 		return None
 
 
+class DOMTree:
+	"""
+	Struct-of-arrays storage of a DOM tree, one row per node, as sent by buildDomTree.js in the columnar payload.
+
+	Nodes are not stored as objects. `node(index)` creates a view (DOMElementView / DOMTextView) on demand, views are
+	cached weakly so the same node keeps its identity while someone holds on to it. A view has a __dict__ like any node,
+	the saving is that only the nodes in use get an object at all.
+	"""
+
+	def __init__(self, columns: dict):
+		self.strings: list[str] = columns['strings']
+		self.parent = array('i', columns['parent'])
+		self.flags = array('B', columns['flags'])
+		self.tag = array('i', columns['tag'])
+		self.value = array('i', columns['value'])  # xpath for elements, text for text nodes
+		self.highlight = array('i', columns['highlight'])
+		self.ref = array('q', columns['ref'])
+		self.rect = array('i', columns['rect'])
+		self.rects = array('i', columns['rects'])  # left, top, width, height of the boxes of highlighted elements
+		self.is_new = array('b', [-1]) * len(self.flags)  # -1 = None, 0 = False, 1 = True
+		self.attr_offsets = array('i', columns['attrOffsets'])
+		self.attr_names = array('i', columns['attrNames'])
+		self.attr_values = array('i', columns['attrValues'])
+
+		# Children in CSR layout, ids are post-order so ascending ids are siblings in document order
+		counts = array('i', [0]) * (len(self.parent) + 1)
+		for parent_index in self.parent:
+			if parent_index >= 0:
+				counts[parent_index + 1] += 1
+		for index in range(1, len(counts)):
+			counts[index] += counts[index - 1]
+		self.child_offsets = counts
+		self.child_ids = array('i', [0]) * counts[-1]
+		fill = array('i', counts[:-1])
+		for index, parent_index in enumerate(self.parent):
+			if parent_index >= 0:
+				self.child_ids[fill[parent_index]] = index
+				fill[parent_index] += 1
+
+		self._views: weakref.WeakValueDictionary[int, DOMBaseNode] = weakref.WeakValueDictionary()
+
+	def __len__(self) -> int:
+		return len(self.flags)
+
+	def node(self, index: int) -> 'DOMElementNode | DOMTextNode':
+		view = self._views.get(index)
+		if view is None:
+			view = DOMTextView(self, index) if self.flags[index] & FLAG_TEXT else DOMElementView(self, index)
+			self._views[index] = view
+		return view
+
+	def children_of(self, index: int) -> tuple[DOMBaseNode, ...]:
+		return tuple(self.node(child) for child in self.child_ids[self.child_offsets[index] : self.child_offsets[index + 1]])
+
+	def selector_map(self) -> 'SelectorMap':
+		selector_map = {}
+		for index, highlight_index in enumerate(self.highlight):
+			if highlight_index >= 0:
+				selector_map[highlight_index] = self.node(index)
+		return dict(sorted(selector_map.items()))
+
+
+class DOMTextView(DOMTextNode):
+	"""Read-only DOMTextNode backed by a row of a DOMTree"""
+
+	def __init__(self, tree: DOMTree, index: int):
+		self._tree = tree
+		self._index = index
+
+	@property
+	def text(self) -> str:
+		return self._tree.strings[self._tree.value[self._index]]
+
+	@property
+	def is_visible(self) -> bool:
+		return bool(self._tree.flags[self._index] & FLAG_VISIBLE)
+
+	@property
+	def parent(self) -> Optional['DOMElementNode']:
+		parent_index = self._tree.parent[self._index]
+		return self._tree.node(parent_index) if parent_index >= 0 else None  # type: ignore[return-value]
+
+	def __eq__(self, other: object) -> bool:
+		return isinstance(other, DOMTextView) and other._tree is self._tree and other._index == self._index
+
+	def __hash__(self) -> int:
+		return hash((id(self._tree), self._index))
+
+	def __repr__(self) -> str:
+		return f'DOMTextView(text={self.text!r})'
+
+
+class DOMElementView(DOMElementNode):
+	"""
+	DOMElementNode backed by a row of a DOMTree.
+
+	Only `highlight_index` and `is_new` can be changed, the structure of the tree is read-only: `children` is a tuple.
+	"""
+
+	def __init__(self, tree: DOMTree, index: int):
+		self._tree = tree
+		self._index = index
+
+	@property
+	def tag_name(self) -> str:
+		return self._tree.strings[self._tree.tag[self._index]]
+
+	@property
+	def xpath(self) -> str:
+		return self._tree.strings[self._tree.value[self._index]]
+
+	@property
+	def attributes(self) -> dict[str, str]:
+		tree = self._tree
+		start, end = tree.attr_offsets[self._index], tree.attr_offsets[self._index + 1]
+		return {tree.strings[tree.attr_names[i]]: tree.strings[tree.attr_values[i]] for i in range(start, end)}
+
+	@property
+	def children(self) -> tuple[DOMBaseNode, ...]:  # type: ignore[override]
+		return self._tree.children_of(self._index)
+
+	@property
+	def parent(self) -> Optional['DOMElementNode']:
+		parent_index = self._tree.parent[self._index]
+		return self._tree.node(parent_index) if parent_index >= 0 else None  # type: ignore[return-value]
+
+	@property
+	def is_visible(self) -> bool:
+		return bool(self._tree.flags[self._index] & FLAG_VISIBLE)
+
+	@property
+	def is_interactive(self) -> bool:
+		return bool(self._tree.flags[self._index] & FLAG_INTERACTIVE)
+
+	@property
+	def is_top_element(self) -> bool:
+		return bool(self._tree.flags[self._index] & FLAG_TOP_ELEMENT)
+
+	@property
+	def is_in_viewport(self) -> bool:
+		return bool(self._tree.flags[self._index] & FLAG_IN_VIEWPORT)
+
+	@property
+	def shadow_root(self) -> bool:
+		return bool(self._tree.flags[self._index] & FLAG_SHADOW_ROOT)
+
+	@property
+	def highlight_index(self) -> int | None:
+		highlight_index = self._tree.highlight[self._index]
+		return highlight_index if highlight_index >= 0 else None
+
+	@highlight_index.setter
+	def highlight_index(self, value: int | None) -> None:
+		self._tree.highlight[self._index] = -1 if value is None else value
+
+	@property
+	def viewport_coordinates(self) -> CoordinateSet | None:
+		offset = self._tree.rect[self._index]
+		return CoordinateSet.from_rect(*self._tree.rects[offset : offset + 4]) if offset >= 0 else None
+
+	@property
+	def element_ref(self) -> int | None:
+		ref = self._tree.ref[self._index]
+		return ref if ref >= 0 else None
+
+	@property
+	def is_new(self) -> bool | None:
+		is_new = self._tree.is_new[self._index]
+		return None if is_new < 0 else bool(is_new)
+
+	@is_new.setter
+	def is_new(self, value: bool | None) -> None:
+		self._tree.is_new[self._index] = -1 if value is None else int(value)
+
+	def __eq__(self, other: object) -> bool:
+		return isinstance(other, DOMElementView) and other._tree is self._tree and other._index == self._index
+
+	def __hash__(self) -> int:
+		return hash((id(self._tree), self._index))
+
+
 SelectorMap = dict[int, DOMElementNode]
 
 
+@dataclass
+class PageInfo:
+	"""Page level state read in the same evaluation as the DOM tree"""
+
+	url: str
+	title: str
+	scroll_y: float
+	viewport_width: int
+	viewport_height: int
+	scroll_height: int
+
+	@property
+	def pixels_above(self) -> int:
+		return int(self.scroll_y)
+
+	@property
+	def pixels_below(self) -> int:
+		return int(self.scroll_height - (self.scroll_y + self.viewport_height))
+
+
 @dataclass
 class DOMState:
 	element_tree: DOMElementNode
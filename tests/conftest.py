@@ -2,9 +2,12 @@
 Test configuration for browser-use.
 """
 
+import asyncio
 import logging
 import os
 import sys
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
 
 import pytest
 from langchain_openai import ChatOpenAI
@@ -57,3 +60,130 @@ async def browser_context(browser):
 	context = BrowserContext(browser=browser)
 	yield context
 	await context.close()
+
+
+class FakeCDPSession:
+	"""
+	CDP session that records what is sent to it. Responses are given by method, either as the result or as a function
+	of the params (which may raise). Events are fired with emit().
+	"""
+
+	def __init__(self, responses=None):
+		self.responses = responses or {}
+		self.handlers = {}
+		self.calls = []
+
+	def on(self, event, handler):
+		self.handlers[event] = handler
+
+	def emit(self, event, params):
+		self.handlers[event](params)
+
+	async def send(self, method, params=None):
+		self.calls.append((method, params))
+		response = self.responses.get(method, {})
+		return response(params) if callable(response) else response
+
+	async def detach(self):
+		self.calls.append(('detach', None))
+
+
+class FakePage:
+	"""
+	Page without a browser.
+
+	evaluate(script, args) and evaluate_handle(expression, arg) answer the calls of the same name, which are recorded
+	in evaluations and handle_evaluations. The CDP sessions opened on the page are kept in sessions, opening one raises
+	cdp_error if set. Page events are fired with emit().
+	"""
+
+	def __init__(
+		self,
+		url='https://example.com/',
+		title='',
+		evaluate=None,
+		evaluate_handle=None,
+		session_responses=None,
+		cdp_error=None,
+	):
+		self.url = url
+		self.title_text = title
+		self.title_calls = 0
+		self.hangs = False  # title() never returns, like crashed tabs
+		self.main_frame = SimpleNamespace(url=url)
+		self._evaluate = evaluate
+		self._evaluate_handle = evaluate_handle
+		self.evaluations = []
+		self.handle_evaluations = []
+		self.session_responses = session_responses
+		self.cdp_error = cdp_error
+		self.sessions = []
+		self.handlers = {}
+		self.closed = False
+		self.mouse = Mock(click=AsyncMock())
+		self.context = Mock(pages=[self], new_cdp_session=AsyncMock(side_effect=self._new_cdp_session))
+
+	async def _new_cdp_session(self, page):
+		if self.cdp_error is not None:
+			raise self.cdp_error
+		self.sessions.append(FakeCDPSession(self.session_responses))
+		return self.sessions[-1]
+
+	def on(self, event, handler):
+		self.handlers.setdefault(event, []).append(handler)
+
+	def remove_listener(self, event, handler):
+		self.handlers[event].remove(handler)
+
+	def emit(self, event, payload):
+		for handler in list(self.handlers.get(event, [])):
+			handler(payload)
+
+	async def evaluate(self, script, args=None):
+		self.evaluations.append((script, args))
+		return self._evaluate(script, args) if self._evaluate else None
+
+	async def evaluate_handle(self, expression, arg=None, isolated_context=True):
+		self.handle_evaluations.append((expression, arg, isolated_context))
+		return self._evaluate_handle(expression, arg) if self._evaluate_handle else None
+
+	async def title(self):
+		self.title_calls += 1
+		if self.hangs:
+			await asyncio.sleep(10)
+		return self.title_text
+
+	def navigate(self, url, title=''):
+		"""A navigation of the main frame, up to DOMContentLoaded"""
+		self.url = self.main_frame.url = url
+		self.title_text = title
+		self.emit('framenavigated', self.main_frame)
+		self.emit('domcontentloaded', self)
+
+	async def close(self):
+		self.closed = True
+		self.emit('close', self)
+
+	def is_closed(self):
+		return self.closed
+
+	async def wait_for_load_state(self, *args, **kwargs):
+		pass
+
+	async def bring_to_front(self):
+		pass
+
+	async def set_viewport_size(self, viewport_size):
+		pass
+
+
+@pytest.fixture
+def fake_cdp_session():
+	"""FakeCDPSession, for sessions opened on the browser instead of a page"""
+	return FakeCDPSession
+
+
+@pytest.fixture
+def fake_page():
+	"""FakePage, called with the url and the answers of the page"""
+	return FakePage
@@ -360,3 +360,45 @@ async def test_remove_highlights_failure():
 		await context.remove_highlights()
 	except Exception as e:
 		pytest.fail(f'remove_highlights raised an exception: {e}')
+
+
+@pytest.mark.asyncio
+async def test_wait_until_settled():
+	"""
+	Test that wait_until_settled runs the settle detector in the page with the quiet time and maximum wait
+	in milliseconds, does not touch the page without a wait, and reports a page it cannot check as not settled.
+	"""
+
+	class DummyPage:
+		def __init__(self, result):
+			self.result = result
+			self.calls = []
+
+		async def evaluate(self, script, args=None):
+			self.calls.append(args)
+			if isinstance(self.result, Exception):
+				raise self.result
+			return self.result
+
+		def is_closed(self):
+			return False
+
+	dummy_browser = Mock()
+	dummy_browser.config = Mock()
+	context = BrowserContext(browser=dummy_browser, config=BrowserContextConfig(wait_between_actions=0.5))
+	page = DummyPage(True)
+	context.session = Mock(context=Mock(pages=[page]))
+	context.agent_current_page = page
+
+	assert await context.wait_until_settled() is True
+	assert page.calls == [{'quietMs': 100, 'maxWait': 500, 'scroll': False}]
+	assert await context.wait_until_settled(0) is True
+	assert len(page.calls) == 1
+
+	page.result = Exception('Execution context was destroyed')
+	assert await context.wait_until_settled(0.2, quiet_time=0.05) is False
+	assert page.calls[-1] == {'quietMs': 50, 'maxWait': 200, 'scroll': False}
+
+	page.result = True
+	assert await context.wait_until_settled(0.5, scroll=True) is True
+	assert page.calls[-1] == {'quietMs': 100, 'maxWait': 500, 'scroll': True}
@@ -0,0 +1,78 @@
+"""
+Tests for clicks at the centre of the extracted element box, checked with one elementFromPoint.
+"""
+
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from browser_use.dom.history_tree_processor.view import CoordinateSet
+from browser_use.dom.service import HIT_TEST_ELEMENT_REF_JS, DomService
+from browser_use.dom.views import DOMElementNode
+
+
+def hit_page(fake_page, hit):
+	"""A page on which the hit test finds the element if page.hit"""
+	page = fake_page(evaluate=lambda script, args: page.hit)
+	page.hit = hit
+	return page
+
+
+def button(parent=None, **fields) -> DOMElementNode:
+	fields = {
+		'is_top_element': True,
+		'is_in_viewport': True,
+		'element_ref': 7,
+		'viewport_coordinates': CoordinateSet.from_rect(100, 200, 41, 20),
+		**fields,
+	}
+	return DOMElementNode(
+		tag_name='button', xpath='html/body/button', attributes={}, children=[], is_visible=True, parent=parent, **fields
+	)
+
+
+@pytest.mark.asyncio
+async def test_click_point_is_the_centre_of_the_box_if_the_element_is_hit(fake_page):
+	page = hit_page(fake_page, True)
+
+	assert await DomService(page).click_point(button()) == (120, 210)
+	assert page.evaluations == [(HIT_TEST_ELEMENT_REF_JS, {'ref': 7, 'x': 120, 'y': 210})]
+
+
+@pytest.mark.asyncio
+async def test_no_click_point_for_covered_moved_or_unmeasured_elements(fake_page):
+	page = hit_page(fake_page, False)
+	service = DomService(page)
+	iframe = DOMElementNode(tag_name='iframe', xpath='html/body/iframe', attributes={}, children=[], is_visible=True, parent=None)
+
+	assert await service.click_point(button()) is None
+	assert len(page.evaluations) == 1
+
+	page.hit = True
+	assert await service.click_point(button(is_top_element=False)) is None
+	assert await service.click_point(button(is_in_viewport=False)) is None
+	assert await service.click_point(button(viewport_coordinates=None)) is None
+	assert await service.click_point(button(element_ref=None)) is None
+	assert await service.click_point(button(parent=iframe)) is None
+	assert len(page.evaluations) == 1
+
+
+@pytest.mark.asyncio
+async def test_coordinate_clicks_skip_locating_the_element(fake_page):
+	context = BrowserContext(browser=Mock(config=Mock()), config=BrowserContextConfig(coordinate_clicks=True))
+	page = hit_page(fake_page, True)
+	context.get_agent_current_page = AsyncMock(return_value=page)
+	context.get_locate_element = AsyncMock(return_value=None)
+	context._check_and_handle_navigation = AsyncMock()
+
+	await context._click_element_node(button())
+	page.mouse.click.assert_awaited_once_with(120, 210)
+	context.get_locate_element.assert_not_called()
+
+	# Moved since the extraction: located and clicked the usual way
+	page.hit = False
+	with pytest.raises(Exception, match='not found'):
+		await context._click_element_node(button())
+	context.get_locate_element.assert_awaited_once()
+	page.mouse.click.assert_awaited_once()
@@ -0,0 +1,231 @@
+"""
+Tests for the accessibility tree extraction engine.
+
+page() builds the DOM.getDocument and Accessibility.getFullAXTree results for a small nested spec, where every
+element can carry the role, name, value and states Chrome would compute for it.
+"""
+
+import itertools
+
+import pytest
+
+from browser_use.dom.accessibility_processor.service import AccessibilityProcessor
+from browser_use.dom.service import DomService
+
+INCLUDE_ATTRIBUTES = ['type', 'value', 'aria-checked']
+
+
+def el(
+	tag, children=(), attributes=None, role='generic', name='', value=None, ignored=False, hidden=False, shadow=None, **properties
+):
+	"""
+	ignored leaves the children in the tree (like role="none"), hidden ignores the whole subtree (like display: none),
+	shadow are the children of an open shadow root of the element
+	"""
+	return {
+		'tag': tag,
+		'children': list(children),
+		'shadow': shadow,
+		'attributes': attributes or {},
+		'role': role,
+		'name': name,
+		'value': value,
+		'ignored': ignored or hidden,
+		'hidden': hidden,
+		'properties': properties,
+	}
+
+
+def text(value):
+	return {'text': value}
+
+
+def page(body_children, title='Back office', frames=None):
+	"""DOM document and AX trees (main frame first) for the body children, frames maps iframe names to their bodies"""
+	backend_ids = itertools.count(1)
+	ax_trees = []
+
+	def document(children, url):
+		ax_nodes: list[dict] = []
+		document_id = next(backend_ids)
+		root_ax = {
+			'nodeId': f'ax{document_id}',
+			'ignored': False,
+			'role': {'value': 'RootWebArea'},
+			'name': {'value': title},
+			'childIds': [],
+			'backendDOMNodeId': document_id,
+		}
+		ax_nodes.append(root_ax)
+
+		def add(spec, ax_parent, hidden=False):
+			backend_id = next(backend_ids)
+			if 'text' in spec:
+				ax = {
+					'nodeId': f'ax{backend_id}',
+					'ignored': hidden,
+					'role': {'value': 'StaticText'},
+					'name': {'value': spec['text']},
+				}
+				ax_nodes.append(ax)
+				ax_parent['childIds'].append(ax['nodeId'])
+				return {'nodeType': 3, 'nodeName': '#text', 'nodeValue': spec['text'], 'backendNodeId': backend_id}
+
+			ax = {
+				'nodeId': f'ax{backend_id}',
+				'ignored': hidden or spec['ignored'],
+				'role': {'value': spec['role']},
+				'name': {'value': spec['name']},
+				'properties': [{'name': key, 'value': {'value': value}} for key, value in spec['properties'].items()],
+				'childIds': [],
+				'backendDOMNodeId': backend_id,
+			}
+			if spec['value'] is not None:
+				ax['value'] = {'value': spec['value']}
+			ax_nodes.append(ax)
+			ax_parent['childIds'].append(ax['nodeId'])
+
+			node = {
+				'nodeType': 1,
+				'nodeName': spec['tag'].upper(),
+				'localName': spec['tag'],
+				'backendNodeId': backend_id,
+				'attributes': [part for pair in spec['attributes'].items() for part in pair],
+				'children': [add(child, ax, hidden or spec['hidden']) for child in spec['children']],
+			}
+			if spec['shadow'] is not None:
+				node['shadowRoots'] = [
+					{
+						'nodeType': 11,
+						'nodeName': '#document-fragment',
+						'backendNodeId': next(backend_ids),
+						'children': [add(child, ax, hidden or spec['hidden']) for child in spec['shadow']],
+					}
+				]
+			if spec['tag'] == 'iframe':
+				node['contentDocument'] = document(frames[spec['attributes']['name']], spec['attributes']['src'])
+			return node
+
+		html = el('html', [el('head', ignored=True), el('body', children)])
+		dom = {'nodeType': 9, 'nodeName': '#document', 'backendNodeId': document_id, 'documentURL': url, 'children': []}
+		ax_trees.append(ax_nodes)  # before the children, the trees of their frames come after it
+		dom['children'] = [add(html, root_ax)]
+		return dom
+
+	root = document(body_children, 'https://example.com/orders')
+	return ax_trees, root
+
+
+def build(body_children, **kwargs):
+	ax_trees, document = page(body_children, **kwargs)
+	return AccessibilityProcessor(ax_trees, document).build()
+
+
+def test_form_controls_are_listed_with_names_values_and_states():
+	root, selector_map = build(
+		[
+			el('h1', [text('Edit order')], role='heading'),
+			el('label', [text('Customer')], role='LabelText'),
+			el('input', attributes={'type': 'text'}, role='textbox', name='Customer', value='ACME', editable='plaintext'),
+			el('input', attributes={'type': 'checkbox'}, role='checkbox', name='Paid', checked='true'),
+			el('button', [el('span', [text('Save')])], role='button', name='Save'),
+			el('button', [text('Delete')], role='button', name='Delete', disabled=True),
+			el('div', [text('hidden')], hidden=True),
+			el('div', [el('span', [text('Total: 12 EUR')])], role='none', ignored=True),
+			el('img', attributes={'alt': 'logo'}, role='image', name='logo'),
+		]
+	)
+
+	assert [node.tag_name for node in selector_map.values()] == ['input', 'input', 'button']
+	assert root.clickable_elements_to_string(include_attributes=INCLUDE_ATTRIBUTES) == (
+		'Edit order\n'
+		'Customer\n'
+		"[0]<input type='text' value='ACME'>Customer />\n"
+		"[1]<input type='checkbox' aria-checked='true'>Paid />\n"
+		'[2]<button >Save />\n'
+		'Delete\n'
+		'Total: 12 EUR\n'
+		'logo'
+	)
+
+
+def test_xpaths_match_buildDomTree():
+	_, selector_map = build(
+		[
+			el('ul', [el('li', [el('a', role='link', name='One')]), el('li', [el('a', role='link', name='Two')])]),
+			el('div', [el('select', [el('option', role='option', name='A')], role='combobox', name='A')]),
+		]
+	)
+
+	assert [node.xpath for node in selector_map.values()] == [
+		'html/body/ul/li[1]/a',
+		'html/body/ul/li[2]/a',
+		'html/body/div/select',
+	]
+
+
+def test_xpaths_in_shadow_roots_start_below_the_shadow_root():
+	_, selector_map = build(
+		[
+			el(
+				'my-form',
+				shadow=[el('button', role='button', name='Send'), el('div', [el('button', role='button', name='Reset')])],
+			),
+		]
+	)
+
+	# getXPathTree stops at the shadow root, before its direct children
+	assert [(node.xpath, node.parent.tag_name) for node in selector_map.values()] == [('', 'my-form'), ('button', 'div')]
+	assert selector_map[0].parent.shadow_root
+
+
+def test_same_process_iframes_are_spliced_under_the_iframe():
+	frame = el('iframe', attributes={'name': 'editor', 'src': 'https://example.com/editor'}, role='Iframe')
+	root, selector_map = build(
+		[frame, el('button', role='button', name='Outside')],
+		frames={'editor': [el('div', [text('Body')], role='generic', editable='richtext')]},
+	)
+
+	iframe = root.children[0]
+	editor = selector_map[0]
+	assert editor.parent is iframe
+	assert editor.xpath == 'html/body/div'
+	assert selector_map[1].get_all_text_till_next_clickable_element() == 'Outside'
+
+
+def ax_page(fake_page, ax_trees, document):
+	"""A page whose CDP session answers with the accessibility trees and the document, the iframe is out-of-process"""
+
+	def full_ax_tree(params):
+		if params:
+			raise RuntimeError('Frame with the given id does not belong to the target')
+		return {'nodes': ax_trees[0]}
+
+	return fake_page(
+		'https://example.com/orders',
+		evaluate=lambda script, args: {'check': 2, 'installed': True, 'result': {'highlighted': 0}},
+		session_responses={
+			'DOM.getDocument': {'root': document},
+			'Accessibility.getFullAXTree': full_ax_tree,
+			'Page.getFrameTree': {'frameTree': {'frame': {'id': 'main'}, 'childFrames': [{'frame': {'id': 'oopif'}}]}},
+			'Page.getLayoutMetrics': {
+				'cssLayoutViewport': {'clientWidth': 800, 'clientHeight': 600},
+				'cssContentSize': {'height': 2400},
+			},
+		},
+	)
+
+
+@pytest.mark.asyncio
+async def test_accessibility_engine_in_dom_service(fake_page):
+	page_ = ax_page(fake_page, *page([el('button', role='button', name='Save')]))
+	service = DomService(page_)
+
+	state, page_info = await service.get_page_state(engine='accessibility')
+
+	assert state.selector_map[0].get_all_text_till_next_clickable_element() == 'Save'
+	assert ('Accessibility.getFullAXTree', {'frameId': 'oopif'}) in page_.sessions[0].calls
+	# Only the previous highlights are removed, nothing is drawn
+	assert [args for _, args in page_.evaluations] == [{'removeHighlights': True, 'highlightRects': []}]
+	assert page_info is not None
+	assert (page_info.title, page_info.url, page_info.scroll_height) == ('Back office', 'https://example.com/orders', 2400)
@@ -0,0 +1,156 @@
+"""
+Tests for the columnar payload of buildDomTree.js and the array-backed DOMTree built from it.
+
+encode_columnar runs encodeColumnar() of buildDomTree.js with node, so both decoding paths
+of DomService can be compared on the same node map.
+"""
+
+import json
+import shutil
+import subprocess
+import tracemalloc
+
+import pytest
+
+from browser_use.dom.history_tree_processor.service import HistoryTreeProcessor
+from browser_use.dom.service import BUILD_DOM_TREE_JS, DomService
+from browser_use.dom.views import DOMElementView, DOMTextView
+
+
+def encode_columnar(node_map: dict) -> dict:
+	"""Runs encodeColumnar() of buildDomTree.js with node on the node map"""
+	node = shutil.which('node')
+	if node is None:
+		pytest.skip('node is needed to run buildDomTree.js')
+	# The flags and the encoder, without the walk that needs a DOM
+	start = BUILD_DOM_TREE_JS.index('  // Bit flags of the `flags` column')
+	encoder = BUILD_DOM_TREE_JS[start : BUILD_DOM_TREE_JS.index('  // After all functions are defined', start)]
+	script = (
+		f'{encoder}\n'
+		"let input = '';\n"
+		"process.stdin.on('data', (chunk) => { input += chunk; });\n"
+		"process.stdin.on('end', () => {\n"
+		'  const nodeMap = JSON.parse(input);\n'
+		'  process.stdout.write(JSON.stringify(encodeColumnar(nodeMap, Object.keys(nodeMap).length)));\n'
+		'});\n'
+	)
+	result = subprocess.run([node, '-e', script], input=json.dumps(node_map), capture_output=True, text=True, check=True)
+	return json.loads(result.stdout)
+
+
+def make_node_map(rows: int) -> tuple[str, dict]:
+	"""body > table > rows x (tr > [td > text, td > button(text)])"""
+	node_map: dict[str, dict] = {}
+	next_id = 0
+	highlight_index = 0
+
+	def add(data: dict) -> str:
+		nonlocal next_id
+		node_id = str(next_id)
+		node_map[node_id] = data
+		next_id += 1
+		return node_id
+
+	def element(tag, xpath, children, **extra):
+		return {'tagName': tag, 'xpath': xpath, 'attributes': {}, 'children': children, **extra}
+
+	row_ids = []
+	for row in range(rows):
+		label = add({'type': 'TEXT_NODE', 'text': f'Row {row}', 'isVisible': True})
+		label_cell = add(element('td', f'html/body/table/tr[{row + 1}]/td[1]', [label], isVisible=True))
+		button_text = add({'type': 'TEXT_NODE', 'text': 'Edit', 'isVisible': row % 2 == 0})
+		button = add(
+			element(
+				'button',
+				f'html/body/table/tr[{row + 1}]/td[2]/button',
+				[button_text],
+				attributes={'class': 'btn btn-primary', 'data-row': str(row)},
+				isVisible=True,
+				isInteractive=True,
+				isTopElement=True,
+				isInViewport=True,
+				highlightIndex=highlight_index,
+				ref=1000 + highlight_index,
+				rect=[100, 20 * row, 40, 15],
+				shadowRoot=row == 0,
+			)
+		)
+		highlight_index += 1
+		button_cell = add(element('td', f'html/body/table/tr[{row + 1}]/td[2]', [button], isVisible=True))
+		row_ids.append(add(element('tr', f'html/body/table/tr[{row + 1}]', [label_cell, button_cell], isVisible=True)))
+	table = add(element('table', 'html/body/table', row_ids, isVisible=True))
+	root = add(element('body', '/body', [table]))
+	return root, node_map
+
+
+@pytest.mark.asyncio
+async def test_columnar_payload_decodes_to_the_same_tree():
+	root_id, node_map = make_node_map(rows=50)
+	service = DomService(page=None)
+
+	tree_from_map, selector_map_from_map = await service._construct_dom_tree({'rootId': root_id, 'map': node_map})
+	tree_from_columns, selector_map_from_columns = await service._construct_dom_tree(
+		{'rootId': root_id, 'columns': encode_columnar(node_map)}
+	)
+
+	assert isinstance(tree_from_columns, DOMElementView)
+	assert tree_from_columns.__json__() == tree_from_map.__json__()
+	assert list(selector_map_from_columns) == list(selector_map_from_map)
+	assert tree_from_columns.clickable_elements_to_string() == tree_from_map.clickable_elements_to_string()
+	assert selector_map_from_columns[3].parent.parent.parent is tree_from_columns.children[0]
+
+
+def test_columnar_payload_is_smaller():
+	root_id, node_map = make_node_map(rows=500)
+	map_payload = json.dumps({'rootId': root_id, 'map': node_map})
+	columnar_payload = json.dumps({'rootId': root_id, 'columns': encode_columnar(node_map)})
+
+	assert len(columnar_payload) < len(map_payload) / 2
+
+
+@pytest.mark.asyncio
+async def test_array_backed_tree_views():
+	root_id, node_map = make_node_map(rows=10)
+	service = DomService(page=None)
+	_, selector_map_from_map = await service._construct_dom_tree({'rootId': root_id, 'map': node_map})
+	tree, selector_map = await service._construct_dom_tree({'rootId': root_id, 'columns': encode_columnar(node_map)})
+
+	button = selector_map[2]
+	assert button.attributes == {'class': 'btn btn-primary', 'data-row': '2'}
+	assert button.get_all_text_till_next_clickable_element() == 'Edit'
+	assert button.element_ref == selector_map_from_map[2].element_ref == 1002
+	assert tree.element_ref is None
+	assert button.viewport_coordinates == selector_map_from_map[2].viewport_coordinates
+	assert (button.viewport_coordinates.center.x, button.viewport_coordinates.center.y) == (120, 47)
+	assert tree.viewport_coordinates is None
+	assert isinstance(button.children[0], DOMTextView)
+	assert button.children[0].parent is button
+	with pytest.raises(AttributeError):
+		button.children.append(button.children[0])  # the structure is read-only
+	assert HistoryTreeProcessor._hash_dom_element(button) == HistoryTreeProcessor._hash_dom_element(selector_map_from_map[2])
+
+	# Mutable state lives in the arrays, so it survives the views being recreated
+	button.is_new = True
+	del button
+	assert tree.children[0].children[2].children[1].children[0].is_new is True
+	assert '*[2]*<button' in tree.clickable_elements_to_string()
+
+
+@pytest.mark.asyncio
+async def test_array_backed_tree_uses_less_memory():
+	root_id, node_map = make_node_map(rows=2000)
+	columns = encode_columnar(node_map)
+	service = DomService(page=None)
+
+	tracemalloc.start()
+	tree_from_map = await service._construct_dom_tree({'rootId': root_id, 'map': node_map})
+	map_size = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+
+	tracemalloc.start()
+	tree_from_columns = await service._construct_dom_tree({'rootId': root_id, 'columns': columns})
+	columns_size = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+
+	assert tree_from_map and tree_from_columns
+	assert columns_size < map_size / 2
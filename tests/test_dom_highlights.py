@@ -0,0 +1,106 @@
+"""
+Tests for drawing the highlights onto the screenshot instead of into the page.
+"""
+
+import asyncio
+import base64
+import io
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from browser_use.dom.service import DomService
+
+PIL = pytest.importorskip('PIL')
+from PIL import Image  # noqa: E402
+
+from browser_use.dom.highlights import draw_highlights  # noqa: E402
+
+RESULT = {
+	'rootId': '1',
+	'map': {
+		'0': {'tagName': 'button', 'xpath': 'html/body/button', 'attributes': {}, 'children': [], 'isVisible': True},
+		'1': {'tagName': 'body', 'xpath': '', 'attributes': {}, 'children': ['0'], 'isVisible': True},
+	},
+}
+
+
+def screenshot(width, height, image_format='PNG') -> str:
+	buffer = io.BytesIO()
+	Image.new('RGB', (width, height), (255, 255, 255)).save(buffer, format=image_format)
+	return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def decode(screenshot_b64) -> Image.Image:
+	return Image.open(io.BytesIO(base64.b64decode(screenshot_b64)))
+
+
+def test_boxes_are_drawn_in_the_colors_of_the_page():
+	result = decode(draw_highlights(screenshot(400, 300), {0: [[10, 50, 200, 100]], 1: [[10, 200, 200, 40]]}))
+
+	assert result.format == 'PNG' and result.size == (400, 300)
+	assert result.getpixel((10, 100))[:3] == (255, 0, 0)  # left border of 0
+	assert result.getpixel((100, 201))[:3] == (0, 255, 0)  # top border of 1
+	inside = result.getpixel((100, 120))[:3]
+	assert inside != (255, 255, 255) and inside[0] == 255  # the translucent fill
+	assert result.getpixel((300, 20))[:3] == (255, 255, 255)
+
+
+def test_device_scale_factor_and_format_are_kept():
+	result = decode(draw_highlights(screenshot(800, 600, 'JPEG'), {3: [[100, 100, 50, 50]]}, viewport_width=400))
+
+	assert result.format == 'JPEG' and result.size == (800, 600)
+	# The rect is doubled: its border is at 200 instead of 100
+	assert result.getpixel((201, 250)) == pytest.approx((255, 165, 0), abs=30)  # orange, the color of index 3
+	assert result.getpixel((150, 250)) == pytest.approx((255, 255, 255), abs=8)
+
+
+def measured_page(fake_page):
+	"""A page whose walks come with the rects of highlight 0"""
+	return fake_page(
+		evaluate=lambda script, args: {'check': 2, 'installed': True, 'result': RESULT, 'highlights': [[0, [[5, 5, 80, 20]]]]}
+	)
+
+
+@pytest.mark.asyncio
+async def test_rects_are_measured_instead_of_drawn(fake_page):
+	page = measured_page(fake_page)
+	service = DomService(page)
+
+	state = await service.get_clickable_elements(draw_highlights=False)
+	assert state.element_tree.tag_name == 'body'
+	assert page.evaluations[-1][1]['measureHighlights'] is True
+	assert service.highlight_rects == {0: [[5, 5, 80, 20]]}
+
+	await service.get_clickable_elements()
+	assert 'measureHighlights' not in page.evaluations[-1][1]
+	assert service.highlight_rects is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('cross_origin_iframes', [False, True])
+async def test_screenshot_waits_for_the_overlays_of_cross_origin_frames(cross_origin_iframes, fake_page):
+	config = BrowserContextConfig(composite_highlights=True, cross_origin_iframes=cross_origin_iframes)
+	context = BrowserContext(browser=Mock(config=Mock()), config=config)
+	events = []
+
+	async def get_page_state(**kwargs):
+		await asyncio.sleep(0.01)
+		events.append('extracted')
+		page_info = Mock(title='Example', pixels_above=0, pixels_below=0, viewport_width=None)
+		return Mock(element_tree=None, selector_map={}), page_info
+
+	async def take_screenshot():
+		events.append('screenshot')
+		return screenshot(40, 30)
+
+	context.get_session = AsyncMock()
+	context.get_agent_current_page = AsyncMock(return_value=measured_page(fake_page))
+	context.get_tabs_info = AsyncMock(return_value=[])
+	context._get_dom_service = Mock(return_value=Mock(get_page_state=get_page_state, highlight_rects={}))
+	context.take_screenshot = take_screenshot
+
+	await context._get_updated_state()
+	# Taken concurrently, the screenshot is done first unless the frames get overlays
+	assert events == (['extracted', 'screenshot'] if cross_origin_iframes else ['screenshot', 'extracted'])
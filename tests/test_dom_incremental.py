@@ -0,0 +1,201 @@
+"""
+Tests for the incremental (MutationObserver driven) mode of DomService.
+
+The page is faked: evaluate() returns canned buildDomTree.js results, so only the
+Python side (splicing, re-indexing, registry bookkeeping) is exercised here.
+"""
+
+import pytest
+
+from browser_use.dom.service import DomService
+from browser_use.dom.views import DOMElementNode, DOMTextNode
+
+
+def results_page(fake_page, results: list[dict]):
+	"""A page that answers the walks with results, in order, and the highlight calls on its own"""
+	results = list(results)
+
+	def evaluate(script, args):
+		if 'highlightOnly' in args:
+			result = {'highlighted': len(args['highlightOnly'])}
+		else:
+			result = results.pop(0)
+		return {'check': 2, 'installed': True, 'result': result}
+
+	return fake_page(evaluate=evaluate)
+
+
+def element(tag, registry_id, children=(), highlight_index=None):
+	return {
+		'tagName': tag,
+		'xpath': tag,
+		'attributes': {},
+		'children': list(children),
+		'isVisible': True,
+		'isTopElement': True,
+		'isInteractive': highlight_index is not None,
+		'highlightIndex': highlight_index,
+		'registryId': registry_id,
+	}
+
+
+def text(value):
+	return {'type': 'TEXT_NODE', 'text': value, 'isVisible': True}
+
+
+def full_walk():
+	# body(1) > [div(2) > button(3) "A", div(4) > text "B"]
+	return {
+		'rootId': '5',
+		'map': {
+			'0': text('A'),
+			'1': element('button', 3, ['0'], highlight_index=0),
+			'2': element('div', 2, ['1']),
+			'3': text('B'),
+			'4': element('div', 4, ['3']),
+			'5': element('body', 1, ['2', '4']),
+		},
+	}
+
+
+@pytest.mark.asyncio
+async def test_first_incremental_call_is_a_full_walk(fake_page):
+	page = results_page(fake_page, [full_walk()])
+	service = DomService(page)
+
+	state = await service.get_clickable_elements(highlight_elements=False, incremental=True)
+
+	assert page.evaluations[0][1]['trackMutations'] is True
+	assert page.evaluations[0][1]['incremental'] is False
+	assert state.element_tree.tag_name == 'body'
+	assert list(state.selector_map) == [0]
+	assert state.selector_map[0].tag_name == 'button'
+
+
+@pytest.mark.asyncio
+async def test_mutated_subtree_is_patched_into_a_new_version(fake_page):
+	# The second div got a new link before its text, the link gets JS index 0 but comes after the button
+	patch = {
+		'rootId': None,
+		'map': {
+			'0': text('new link'),
+			'1': element('a', 5, ['0'], highlight_index=0),
+			'2': text('B'),
+			'3': element('div', 4, ['1', '2']),
+		},
+		'subtrees': [[4, '3']],
+	}
+	page = results_page(fake_page, [full_walk(), patch])
+	service = DomService(page)
+
+	first = await service.get_clickable_elements(highlight_elements=True, incremental=True)
+	untouched_div = first.element_tree.children[0]
+	untouched_button = first.selector_map[0]
+	second = await service.get_clickable_elements(highlight_elements=True, incremental=True)
+
+	assert page.evaluations[1][1]['incremental'] is True
+	assert second.element_tree is not first.element_tree
+	# Only the path to the patched subtree is copied, the untouched subtree is shared
+	assert second.element_tree.children[0] is untouched_div
+	assert second.selector_map[0] is untouched_button
+	# The new element is indexed in document order, after the button
+	assert second.selector_map[1].tag_name == 'a'
+	assert second.selector_map[1].highlight_index == 1
+	assert second.selector_map[1].parent.parent is second.element_tree
+
+	patched_div = second.element_tree.children[1]
+	assert isinstance(patched_div, DOMElementNode)
+	assert [type(child) for child in patched_div.children] == [DOMElementNode, DOMTextNode]
+
+	# Overlays are drawn with the final indices, referencing the in-page registry ids
+	assert page.evaluations[2][1] == {'highlightOnly': [[0, 3], [1, 5]]}
+
+	# The earlier state is left as it was
+	assert first.selector_map == {0: untouched_button}
+	assert [type(child) for child in first.element_tree.children[1].children] == [DOMTextNode]
+
+
+@pytest.mark.asyncio
+async def test_shared_elements_are_copied_before_their_index_changes(fake_page):
+	# body(1) > [div(2) > text "A", div(4) > button(3)], then div(2) gets a link before the button
+	walk = {
+		'rootId': '5',
+		'map': {
+			'0': text('A'),
+			'1': element('div', 2, ['0']),
+			'2': text('B'),
+			'3': element('button', 3, ['2'], highlight_index=0),
+			'4': element('div', 4, ['3']),
+			'5': element('body', 1, ['1', '4']),
+		},
+	}
+	patch = {
+		'rootId': None,
+		'map': {'0': text('new link'), '1': element('a', 5, ['0'], highlight_index=0), '2': element('div', 2, ['1'])},
+		'subtrees': [[2, '2']],
+	}
+	page = results_page(fake_page, [walk, patch])
+	service = DomService(page)
+
+	first = await service.get_clickable_elements(highlight_elements=True, incremental=True)
+	button = first.selector_map[0]
+	button.is_new = True  # set by the browser context
+	second = await service.get_clickable_elements(highlight_elements=True, incremental=True)
+
+	assert [node.tag_name for node in second.selector_map.values()] == ['a', 'button']
+	assert second.selector_map[1] is not button
+	assert second.selector_map[1].parent.parent is second.element_tree
+	assert second.selector_map[1].is_new is None
+	assert page.evaluations[2][1] == {'highlightOnly': [[0, 5], [1, 3]]}
+
+	# The earlier state keeps its index
+	assert first.selector_map == {0: button}
+	assert button.highlight_index == 0 and button.is_new is True
+	assert button.parent.parent is first.element_tree
+
+
+@pytest.mark.asyncio
+async def test_removed_subtree_root_is_dropped(fake_page):
+	patch = {'rootId': None, 'map': {}, 'subtrees': [[2, None]]}
+	page = results_page(fake_page, [full_walk(), patch])
+	service = DomService(page)
+
+	await service.get_clickable_elements(highlight_elements=False, incremental=True)
+	state = await service.get_clickable_elements(highlight_elements=False, incremental=True)
+
+	assert [child.tag_name for child in state.element_tree.children] == ['div']
+	assert state.selector_map == {}
+
+
+@pytest.mark.asyncio
+async def test_unknown_registry_id_falls_back_to_full_walk(fake_page):
+	patch = {'rootId': None, 'map': {}, 'subtrees': [[99, None]]}
+	page = results_page(fake_page, [full_walk(), patch, full_walk()])
+	service = DomService(page)
+
+	await service.get_clickable_elements(highlight_elements=False, incremental=True)
+	builds = []
+	build_dom_tree = service._build_dom_tree
+
+	async def recording_build_dom_tree(*args, **kwargs):
+		builds.append(kwargs)
+		return await build_dom_tree(*args, **kwargs)
+
+	service._build_dom_tree = recording_build_dom_tree
+	state = await service.get_clickable_elements(highlight_elements=False, incremental=True, max_nodes=100, engine='js')
+
+	assert page.evaluations[2][1]['incremental'] is False
+	assert list(state.selector_map) == [0]
+	# The full walk keeps the options of the call
+	assert builds[1] == builds[0]
+
+
+@pytest.mark.asyncio
+async def test_changed_arguments_force_full_walk(fake_page):
+	page = results_page(fake_page, [full_walk(), full_walk()])
+	service = DomService(page)
+
+	await service.get_clickable_elements(highlight_elements=False, incremental=True)
+	await service.get_clickable_elements(highlight_elements=False, viewport_expansion=500, incremental=True)
+
+	assert page.evaluations[1][1]['incremental'] is False
@@ -0,0 +1,116 @@
+"""
+Tests for the iterative clickable_elements_to_string serializer.
+
+reference_clickable_elements_to_string is the previous recursive implementation, kept here to check
+that the single pass produces exactly the same output.
+"""
+
+import random
+import sys
+
+from browser_use.dom.views import DOMBaseNode, DOMElementNode, DOMTextNode
+
+
+def reference_clickable_elements_to_string(root: DOMElementNode, include_attributes: list[str] | None = None) -> str:
+	formatted_text = []
+
+	def process_node(node: DOMBaseNode, depth: int) -> None:
+		next_depth = int(depth)
+		depth_str = depth * '\t'
+
+		if isinstance(node, DOMElementNode):
+			if node.highlight_index is not None:
+				next_depth += 1
+				text = node.get_all_text_till_next_clickable_element()
+				line = DOMElementNode._format_highlighted_element(node, depth, text, include_attributes)
+				formatted_text.append(line)
+
+			for child in node.children:
+				process_node(child, next_depth)
+
+		elif isinstance(node, DOMTextNode):
+			if (
+				not node.has_parent_with_highlight_index()
+				and node.parent
+				and node.parent.is_visible
+				and node.parent.is_top_element
+			):
+				formatted_text.append(f'{depth_str}{node.text}')
+
+	process_node(root, 0)
+	return '\n'.join(formatted_text)
+
+
+def element(parent: DOMElementNode | None, tag: str = 'div', **kwargs) -> DOMElementNode:
+	node = DOMElementNode(
+		tag_name=tag,
+		xpath=tag,
+		attributes=kwargs.pop('attributes', {}),
+		children=[],
+		is_visible=kwargs.pop('is_visible', True),
+		is_top_element=kwargs.pop('is_top_element', True),
+		parent=parent,
+		**kwargs,
+	)
+	if parent is not None:
+		parent.children.append(node)
+	return node
+
+
+def text(parent: DOMElementNode, value: str, is_visible: bool = True) -> DOMTextNode:
+	node = DOMTextNode(text=value, is_visible=is_visible, parent=parent)
+	parent.children.append(node)
+	return node
+
+
+def random_tree(seed: int, size: int) -> DOMElementNode:
+	rng = random.Random(seed)
+	root = element(None, 'body')
+	elements = [root]
+	highlight_index = 0
+	for i in range(size):
+		parent = rng.choice(elements)
+		if rng.random() < 0.4:
+			text(parent, f'  text {i} ' if rng.random() < 0.5 else '')
+			continue
+		highlighted = rng.random() < 0.3
+		node = element(
+			parent,
+			rng.choice(['div', 'button', 'a', 'input']),
+			attributes={'role': 'button', 'aria-label': f'text {i}', 'placeholder': 'x'} if rng.random() < 0.3 else {},
+			is_visible=rng.random() < 0.9,
+			is_top_element=rng.random() < 0.9,
+			highlight_index=highlight_index if highlighted else None,
+			is_new=rng.choice([None, True, False]),
+		)
+		highlight_index += highlighted
+		elements.append(node)
+	return root
+
+
+def test_same_output_as_recursive_serializer():
+	for seed in range(20):
+		root = random_tree(seed, size=300)
+		for include_attributes in (None, ['role', 'aria-label', 'placeholder']):
+			expected = reference_clickable_elements_to_string(root, include_attributes)
+			assert root.clickable_elements_to_string(include_attributes) == expected
+
+		# Also when serializing subtrees, some of them below a highlighted element
+		for subtree in root.children[:10]:
+			if isinstance(subtree, DOMElementNode):
+				for child in subtree.children:
+					if isinstance(child, DOMElementNode):
+						assert child.clickable_elements_to_string() == reference_clickable_elements_to_string(child)
+
+
+def test_deep_tree_does_not_hit_recursion_limit():
+	depth = sys.getrecursionlimit() * 3
+	root = element(None, 'body')
+	node = root
+	for i in range(depth):
+		node = element(node, highlight_index=0 if i == depth - 1 else None)
+	text(node, 'deep')
+
+	assert root.clickable_elements_to_string().endswith('[0]<div >deep />')
+	assert root.get_all_text_till_next_clickable_element() == ''
+	assert node.get_all_text_till_next_clickable_element() == 'deep'
@@ -0,0 +1,302 @@
+"""
+Tests for how DomService runs buildDomTree.js in the page.
+"""
+
+import pytest
+
+from browser_use.dom.service import CALL_BUILD_DOM_TREE_JS, INSTALL_BUILD_DOM_TREE_JS, DomService
+
+RESULT = {
+	'rootId': '1',
+	'map': {
+		'0': {'type': 'TEXT_NODE', 'text': 'hello', 'isVisible': True},
+		'1': {'tagName': 'body', 'xpath': '', 'attributes': {}, 'children': ['0'], 'isVisible': True},
+	},
+}
+
+
+def document_page(fake_page, check: int = 2):
+	"""A page whose document keeps the installed extractor until it navigates"""
+
+	def evaluate(script, args):
+		if script == INSTALL_BUILD_DOM_TREE_JS:
+			page.installed = True
+		return {'check': check, 'installed': page.installed, 'result': RESULT if page.installed else None}
+
+	page = fake_page(evaluate=evaluate)
+	page.installed = False
+	page.on('framenavigated', lambda frame: setattr(page, 'installed', False))
+	return page
+
+
+@pytest.mark.asyncio
+async def test_extractor_is_sent_once_per_document(fake_page):
+	page = document_page(fake_page)
+	service = DomService(page)
+
+	for _ in range(3):
+		state = await service.get_clickable_elements(highlight_elements=False)
+		assert state.element_tree.tag_name == 'body'
+	page.navigate('https://example.com/next')
+	await service.get_clickable_elements(highlight_elements=False)
+
+	assert [script for script, _ in page.evaluations] == [
+		CALL_BUILD_DOM_TREE_JS,
+		INSTALL_BUILD_DOM_TREE_JS,
+		CALL_BUILD_DOM_TREE_JS,
+		CALL_BUILD_DOM_TREE_JS,
+		CALL_BUILD_DOM_TREE_JS,
+		INSTALL_BUILD_DOM_TREE_JS,
+	]
+	assert len(CALL_BUILD_DOM_TREE_JS) < 500
+
+
+@pytest.mark.asyncio
+async def test_broken_javascript_is_detected_in_the_same_call(fake_page):
+	page = document_page(fake_page, check=11)
+	service = DomService(page)
+
+	with pytest.raises(ValueError, match='cannot evaluate javascript'):
+		await service.get_clickable_elements(highlight_elements=False)
+
+
+@pytest.mark.asyncio
+async def test_page_state_is_read_in_the_same_evaluation(fake_page):
+	page_info = {
+		'url': 'https://example.com/',
+		'title': 'Example',
+		'scrollY': 100,
+		'viewportWidth': 1280,
+		'viewportHeight': 500,
+		'scrollHeight': 1200,
+	}
+	page = fake_page(evaluate=lambda script, args: {'check': 2, 'installed': True, 'result': {**RESULT, 'pageInfo': page_info}})
+	service = DomService(page)
+
+	state, info = await service.get_page_state(highlight_elements=False)
+
+	assert len(page.evaluations) == 1
+	_, args = page.evaluations[0]
+	assert args['removeHighlights'] is True and args['includePageInfo'] is True
+	assert state.element_tree.tag_name == 'body'
+	assert info is not None
+	assert info.title == 'Example'
+	assert (info.pixels_above, info.pixels_below) == (100, 600)
+
+
+@pytest.mark.asyncio
+async def test_spatial_hit_testing_is_passed_to_the_page(fake_page):
+	page = fake_page(evaluate=lambda script, args: {'check': 2, 'installed': True, 'result': RESULT})
+	service = DomService(page)
+
+	await service.get_clickable_elements(highlight_elements=False)
+	await service.get_clickable_elements(highlight_elements=False, spatial_hit_testing=True)
+
+	assert [args['spatialHitTesting'] for _, args in page.evaluations] == [False, True]
+
+
+def stream_responses(truncated: bool = False) -> list[dict]:
+	"""body "intro" is walked in the first slice, the div and "outro" were deferred to later slices"""
+	body = {'tagName': 'body', 'xpath': '', 'attributes': {}, 'children': ['0'], 'isVisible': True}
+	button = {
+		'tagName': 'button',
+		'xpath': 'div/button',
+		'attributes': {},
+		'children': ['2'],
+		'isVisible': True,
+		'isInteractive': True,
+		'isTopElement': True,
+		'highlightIndex': 0,
+	}
+	div = {'tagName': 'div', 'xpath': 'div', 'attributes': {}, 'children': ['3'], 'isVisible': True}
+	first = {'map': {'0': {'type': 'TEXT_NODE', 'text': 'intro', 'isVisible': True}, '1': body}, 'links': []}
+	second = {'map': {'2': {'type': 'TEXT_NODE', 'text': 'Go', 'isVisible': True}, '3': button, '4': div}, 'links': [[1, 4]]}
+	third = {'map': {'5': {'type': 'TEXT_NODE', 'text': 'outro', 'isVisible': True}}, 'links': [[1, 5]]}
+	if truncated:
+		return [{'chunks': [first], 'done': True, 'truncated': True, 'rootId': 1}]
+	return [
+		{'chunks': [first], 'done': False, 'truncated': False, 'rootId': 1},
+		{'chunks': [second, third], 'done': True, 'truncated': False, 'rootId': 1},
+	]
+
+
+def streaming_page(fake_page, responses: list[dict]):
+	"""A page that answers the stream calls with responses, in order"""
+	responses = list(responses)
+	return fake_page(evaluate=lambda script, args: {'check': 2, 'installed': True, 'result': responses.pop(0)})
+
+
+@pytest.mark.asyncio
+async def test_streamed_chunks_are_linked_in_document_order(fake_page):
+	page = streaming_page(fake_page, stream_responses())
+	service = DomService(page)
+
+	state = await service.get_clickable_elements(highlight_elements=False, stream=True, max_time=2)
+
+	assert page.evaluations[0][1]['stream'] == {'sliceMs': 50, 'maxNodes': None, 'maxTime': 2000}
+	assert page.evaluations[1][1] == {'streamNext': True}
+	body = state.element_tree
+	assert [getattr(child, 'text', None) or child.tag_name for child in body.children] == ['intro', 'div', 'outro']
+	assert state.selector_map[0].parent.parent is body
+	assert body.clickable_elements_to_string() == '[0]<button >Go />'
+
+
+@pytest.mark.asyncio
+async def test_truncated_stream_returns_the_partial_tree(fake_page):
+	page = streaming_page(fake_page, stream_responses(truncated=True))
+	service = DomService(page)
+
+	state = await service.get_clickable_elements(highlight_elements=False, stream=True, max_nodes=2)
+
+	assert len(page.evaluations) == 1
+	assert page.evaluations[0][1]['stream']['maxNodes'] == 2
+	assert state.element_tree.tag_name == 'body'
+	assert state.selector_map == {}
+
+
+@pytest.mark.asyncio
+async def test_stream_error_is_raised(fake_page):
+	page = streaming_page(
+		fake_page, [{'chunks': [], 'done': True, 'truncated': False, 'rootId': None, 'error': 'TypeError: boom'}]
+	)
+	service = DomService(page)
+
+	with pytest.raises(ValueError, match='boom'):
+		await service.get_clickable_elements(highlight_elements=False, stream=True)
+
+
+def frame_result(button_label: str, iframe_xpath: str | None = None) -> dict:
+	"""body > [button, (iframe)] with the button highlighted as 0"""
+	node_map = {
+		'0': {'type': 'TEXT_NODE', 'text': button_label, 'isVisible': True},
+		'1': {
+			'tagName': 'button',
+			'xpath': 'html/body/button',
+			'attributes': {},
+			'children': ['0'],
+			'isVisible': True,
+			'isInteractive': True,
+			'isTopElement': True,
+			'highlightIndex': 0,
+		},
+	}
+	children = ['1']
+	if iframe_xpath is not None:
+		node_map['2'] = {'tagName': 'iframe', 'xpath': iframe_xpath, 'attributes': {}, 'children': [], 'isVisible': True}
+		children.append('2')
+	node_map['3'] = {'tagName': 'body', 'xpath': 'html/body', 'attributes': {}, 'children': children, 'isVisible': True}
+	return {'rootId': '3', 'map': node_map}
+
+
+class FakeFrameElement:
+	def __init__(self, path: list[str]):
+		self.path = path
+
+	async def evaluate(self, script):
+		return self.path
+
+
+class FakeFrame:
+	def __init__(self, url: str, parent_frame, xpath: str, result: dict):
+		self.url = url
+		self.parent_frame = parent_frame
+		self.xpath = xpath
+		self.result = result
+		self.calls: list[dict] = []
+
+	async def frame_element(self):
+		return FakeFrameElement([self.xpath])
+
+	async def evaluate(self, script, args=None):
+		self.calls.append(args)
+		result = {'highlighted': 1} if 'drawDeferredHighlights' in args else self.result
+		return {'check': 2, 'installed': True, 'result': result}
+
+
+class FakeLocator:
+	def filter(self, visible):
+		return self
+
+	async def evaluate_all(self, script):
+		return ['https://hidden.example.net/']
+
+
+def framed_page(fake_page):
+	"""shop.com with a payment frame, which embeds a 3-D Secure frame, plus an ad and a hidden frame"""
+	page = fake_page('https://shop.com/checkout')
+	page.main_frame = FakeFrame(page.url, None, '', frame_result('Page', 'html/body/iframe'))
+	page.payment = FakeFrame(
+		'https://pay.example.com/form', page.main_frame, 'html/body/iframe', frame_result('Pay', 'html/body/iframe')
+	)
+	page.secure = FakeFrame('https://3ds.bank.com/', page.payment, 'html/body/iframe', frame_result('Confirm'))
+	page.ad = FakeFrame('https://ad.doubleclick.net/x', page.main_frame, 'html/body/div/iframe', frame_result('Ad'))
+	page.hidden = FakeFrame('https://hidden.example.net/', page.main_frame, 'html/body/iframe[2]', frame_result('Hidden'))
+	page.frames = [page.main_frame, page.payment, page.secure, page.ad, page.hidden]
+	page.evaluate = page.main_frame.evaluate
+	page.locator = lambda selector: FakeLocator()
+	return page
+
+
+@pytest.mark.asyncio
+async def test_cross_origin_frames_are_spliced_with_unique_indices(fake_page):
+	page = framed_page(fake_page)
+	service = DomService(page)
+
+	state = await service.get_clickable_elements(highlight_elements=True, cross_origin_frames=True)
+
+	assert not page.ad.calls and not page.hidden.calls
+	assert page.payment.calls[0]['deferHighlights'] is True
+	assert page.payment.calls[0]['removeHighlights'] is True
+
+	labels = {index: node.get_all_text_till_next_clickable_element() for index, node in state.selector_map.items()}
+	assert labels == {0: 'Page', 1: 'Pay', 2: 'Confirm'}
+	iframe = state.selector_map[1].parent.parent
+	assert iframe.tag_name == 'iframe' and iframe.parent is state.element_tree
+	assert state.selector_map[2].parent.parent is state.selector_map[1].parent.children[1]
+
+	# Frame overlays are drawn in a second call, once the offsets are known
+	assert page.payment.calls[1] == {'drawDeferredHighlights': {'offset': 1, 'focus': -1}}
+	assert page.secure.calls[1] == {'drawDeferredHighlights': {'offset': 2, 'focus': -1}}
+
+
+@pytest.mark.asyncio
+async def test_failing_frame_does_not_break_the_page(fake_page):
+	page = framed_page(fake_page)
+
+	async def detached():
+		raise RuntimeError('Frame was detached')
+
+	page.payment.frame_element = detached
+	service = DomService(page)
+
+	state = await service.get_clickable_elements(highlight_elements=False, cross_origin_frames=True)
+
+	assert [node.get_all_text_till_next_clickable_element() for node in state.selector_map.values()] == ['Page']
+
+
+@pytest.mark.asyncio
+async def test_frames_are_matched_on_their_full_path():
+	def element(tag, xpath, children=(), **extra):
+		return {'tagName': tag, 'xpath': xpath, 'attributes': {}, 'children': list(children), 'isVisible': True, **extra}
+
+	# body > [iframe, div > same-origin iframe > html > body > iframe, my-widget > shadow root > iframe],
+	# the three <iframe>s without content are cross-origin
+	node_map = {
+		'0': element('iframe', 'html/body/iframe'),
+		'1': element('iframe', 'html/body/iframe'),
+		'2': element('body', 'html/body', ['1']),
+		'3': element('html', 'html', ['2']),
+		'4': element('iframe', 'html/body/div/iframe', ['3']),
+		'5': element('div', 'html/body/div', ['4']),
+		'6': element('iframe', ''),
+		'7': element('my-widget', 'html/body/my-widget', ['6'], shadowRoot=True),
+		'8': element('body', 'html/body', ['0', '5', '7']),
+	}
+	tree, _ = await DomService(page=None)._construct_dom_tree({'rootId': '8', 'map': node_map})
+	top, div, widget = tree.children
+
+	assert DomService._find_empty_iframe(tree, ['html/body/iframe']) is top
+	nested = div.children[0].children[0].children[0].children[0]
+	assert DomService._find_empty_iframe(tree, ['html/body/iframe', 'html/body/div/iframe']) is nested
+	assert DomService._find_empty_iframe(tree, ['', 'html/body/my-widget']) is widget.children[0]
+	assert DomService._find_empty_iframe(tree, ['html/body/iframe', 'html/body/other']) is None
@@ -0,0 +1,282 @@
+"""
+Tests for the DOMSnapshot extraction engine.
+
+snapshot() builds a DOMSnapshot.captureSnapshot result from a small nested spec, so the rules
+re-implemented by SnapshotProcessor can be checked without a browser.
+"""
+
+import pytest
+
+from browser_use.dom.service import NO_CDP_ERROR, DomService
+from browser_use.dom.snapshot_processor.service import SNAPSHOT_COMPUTED_STYLES, SnapshotProcessor
+
+DEFAULT_STYLES = {
+	'display': 'block',
+	'visibility': 'visible',
+	'opacity': '1',
+	'cursor': 'auto',
+	'position': 'static',
+	'pointer-events': 'auto',
+	'overflow-x': 'visible',
+	'overflow-y': 'visible',
+}
+LAYOUT_METRICS = {'cssLayoutViewport': {'clientWidth': 800, 'clientHeight': 600, 'pageX': 0, 'pageY': 0}}
+
+
+def el(tag, box=None, children=(), attributes=None, paint=None, **styles):
+	return {
+		'name': tag.upper(),
+		'type': 1,
+		'box': box,
+		'children': list(children),
+		'attributes': attributes or {},
+		'paint': paint,
+		'styles': styles,
+	}
+
+
+def text(value, box=(0, 0, 10, 10)):
+	return {'name': '#text', 'type': 3, 'value': value, 'box': box, 'children': [], 'paint': None, 'styles': {}}
+
+
+def shadow(*children):
+	return {'name': '#document-fragment', 'type': 11, 'box': None, 'children': list(children), 'paint': None, 'styles': {}}
+
+
+def snapshot(*documents_body, scroll_y=0):
+	"""Every argument is the list of body children of one document, the first one is the page"""
+	strings: list[str] = []
+	ids: dict[str, int] = {}
+
+	def intern(value: str) -> int:
+		if value not in ids:
+			ids[value] = len(strings)
+			strings.append(value)
+		return ids[value]
+
+	documents = []
+	for body_children in documents_body:
+		nodes = {'parentIndex': [], 'nodeType': [], 'nodeName': [], 'nodeValue': [], 'attributes': []}
+		content_document = {'index': [], 'value': []}
+		layout = {'nodeIndex': [], 'bounds': [], 'styles': [], 'paintOrders': []}
+
+		def add(spec, parent):
+			index = len(nodes['parentIndex'])
+			nodes['parentIndex'].append(parent)
+			nodes['nodeType'].append(spec['type'])
+			nodes['nodeName'].append(intern(spec['name']))
+			nodes['nodeValue'].append(intern(spec['value']) if 'value' in spec else -1)
+			nodes['attributes'].append([intern(part) for pair in spec.get('attributes', {}).items() for part in pair])
+			if spec['box'] is not None:
+				layout['nodeIndex'].append(index)
+				layout['bounds'].append(list(spec['box']))
+				styles = {**DEFAULT_STYLES, **{name.replace('_', '-'): value for name, value in spec['styles'].items()}}
+				layout['styles'].append([intern(styles[name]) for name in SNAPSHOT_COMPUTED_STYLES])
+				layout['paintOrders'].append(spec['paint'] if spec['paint'] is not None else len(layout['nodeIndex']))
+			if 'frame' in spec:
+				content_document['index'].append(index)
+				content_document['value'].append(spec['frame'])
+			for child in spec['children']:
+				add(child, index)
+
+		root = {'name': '#document', 'type': 9, 'box': (0, 0, 800, 600), 'children': [], 'paint': 0, 'styles': {}}
+		root['children'] = [el('html', (0, 0, 800, 600), [el('head'), el('body', (0, 0, 800, 600), body_children)])]
+		add(root, -1)
+		nodes['contentDocumentIndex'] = content_document
+		documents.append(
+			{
+				'documentURL': intern('https://example.com/'),
+				'title': intern('Example'),
+				'nodes': nodes,
+				'layout': layout,
+				'scrollOffsetX': 0,
+				'scrollOffsetY': scroll_y if not documents else 0,
+			}
+		)
+	return {'documents': documents, 'strings': strings}
+
+
+def build(*documents_body, viewport_expansion=0, highlight_elements=True, **kwargs):
+	processor = SnapshotProcessor(snapshot(*documents_body, **kwargs), LAYOUT_METRICS, viewport_expansion)
+	return processor.build(highlight_elements)
+
+
+def test_highlights_follow_the_buildDomTree_rules():
+	root, selector_map = build(
+		[
+			el('div', (0, 0, 800, 100), [el('button', (10, 10, 80, 30), [text('Save')])]),
+			el('a', (0, 100, 50, 20)),  # empty anchor without href, dropped
+			el('input', (0, 130, 100, 20), attributes={'disabled': ''}),
+			el('div', (0, 160, 100, 20), [text('Open')], cursor='pointer'),
+			el('input', (0, 190, 100, 20), visibility='hidden'),
+			el('button', (0, 900, 80, 30), [text('Below the fold')]),
+		]
+	)
+
+	assert [node.tag_name for node in selector_map.values()] == ['button', 'div']
+	assert list(selector_map) == [0, 2]  # the dropped anchor keeps its index, like in buildDomTree.js
+	assert selector_map[0].xpath == 'html/body/div[1]/button'
+	assert selector_map[2].xpath == 'html/body/div[2]'
+	assert selector_map[0].viewport_coordinates.center.x == 50
+	assert [child.tag_name for child in root.children] == ['div', 'input', 'div', 'input', 'button']
+	assert root.clickable_elements_to_string() == '[0]<button >Save />\n[2]<div >Open />'
+
+
+def test_covered_elements_are_not_top_elements():
+	_, selector_map = build(
+		[
+			el('button', (10, 10, 80, 30), [text('Covered')]),
+			el('button', (10, 60, 80, 30), [text('Under a click-through layer')]),
+			el('div', (0, 0, 800, 50), position='fixed'),
+			el('div', (0, 50, 800, 50), pointer_events='none'),
+		]
+	)
+
+	assert [node.get_all_text_till_next_clickable_element() for node in selector_map.values()] == ['Under a click-through layer']
+
+
+def test_content_scrolled_out_of_a_container_does_not_cover():
+	_, selector_map = build(
+		[
+			el(
+				'div',
+				(0, 0, 800, 100),
+				[el('div', (0, 100, 800, 100), [text('scrolled away')])],
+				overflow_x='hidden',
+				overflow_y='hidden',
+			),
+			el('button', (10, 110, 80, 30), [text('Visible')], paint=4),  # below the scrolled away box
+		]
+	)
+
+	assert [node.get_all_text_till_next_clickable_element() for node in selector_map.values()] == ['Visible']
+
+
+def test_nested_interactive_elements_are_only_highlighted_when_distinct():
+	_, selector_map = build(
+		[
+			el(
+				'div',
+				(0, 0, 400, 100),
+				[el('span', (0, 0, 100, 20), [text('same click')], cursor='pointer'), el('input', (0, 40, 100, 20))],
+				attributes={'role': 'button'},
+				cursor='pointer',
+			)
+		]
+	)
+
+	assert [node.tag_name for node in selector_map.values()] == ['div', 'input']
+
+	_, selector_map = build(
+		[el('div', (0, 0, 400, 100), [el('span', (0, 0, 100, 20), cursor='pointer')], cursor='pointer')],
+		highlight_elements=False,
+	)
+	assert [node.tag_name for node in selector_map.values()] == ['div', 'span']
+
+
+def test_viewport_expansion():
+	content = [el('button', (0, 0, 80, 30), [text('Top')]), el('button', (0, 2000, 80, 30), [text('Bottom')])]
+
+	_, selector_map = build(content)
+	assert len(selector_map) == 1
+
+	_, selector_map = build(content, viewport_expansion=-1)
+	assert len(selector_map) == 2
+	assert all(node.is_in_viewport for node in selector_map.values())
+
+	# Scrolled to the bottom button
+	_, selector_map = build(content, scroll_y=1900)
+	assert [node.get_all_text_till_next_clickable_element() for node in selector_map.values()] == ['Bottom']
+
+
+def test_shadow_roots_and_iframes():
+	frame = el('iframe', (100, 100, 400, 300), attributes={'src': 'https://example.com/frame'})
+	frame['frame'] = 1
+	root, selector_map = build(
+		[
+			el('my-widget', (0, 0, 100, 50), [shadow(el('div', (0, 0, 100, 50), [el('button', (0, 0, 50, 20))]))]),
+			frame,
+		],
+		[el('button', (10, 10, 80, 30), [text('In frame')])],
+	)
+
+	widget, iframe = root.children
+	assert widget.shadow_root
+	assert widget.children[0].xpath == ''
+	assert selector_map[0].xpath == 'button'
+	assert iframe.attributes == {'src': 'https://example.com/frame'}
+	frame_button = selector_map[1]
+	assert frame_button.xpath == 'html/body/button'
+	assert frame_button.parent.parent.parent is iframe
+	# Boxes of the frame document are moved by the position of the iframe
+	assert frame_button.viewport_coordinates.top_left.x == 110
+
+
+def snapshot_responses(snapshot_result: dict) -> dict:
+	def capture_snapshot(params):
+		assert params['computedStyles'] == SNAPSHOT_COMPUTED_STYLES
+		return snapshot_result
+
+	return {'DOMSnapshot.captureSnapshot': capture_snapshot, 'Page.getLayoutMetrics': LAYOUT_METRICS}
+
+
+def snapshot_page(fake_page, snapshot_result: dict | None = None, error=NO_CDP_ERROR):
+	"""A page with the snapshot on its CDP session, or on which CDP sessions fail with error without one"""
+
+	def evaluate(script, args):
+		if 'highlightRects' in args:
+			return {'check': 2, 'installed': True, 'result': {'highlighted': len(args['highlightRects'])}}
+		return {
+			'check': 2,
+			'installed': True,
+			'result': {
+				'rootId': '0',
+				'map': {'0': {'tagName': 'body', 'xpath': '', 'attributes': {}, 'children': [], 'isVisible': True}},
+			},
+		}
+
+	if snapshot_result is None:
+		return fake_page(evaluate=evaluate, cdp_error=RuntimeError(error))
+	return fake_page(evaluate=evaluate, session_responses=snapshot_responses(snapshot_result))
+
+
+@pytest.mark.asyncio
+async def test_snapshot_engine_in_dom_service(fake_page):
+	page = snapshot_page(fake_page, snapshot([el('button', (10, 10, 80, 30), [text('Save')])]))
+	service = DomService(page)
+
+	state, page_info = await service.get_page_state(engine='snapshot')
+
+	assert [method for method, _ in page.sessions[0].calls] == ['DOMSnapshot.captureSnapshot', 'Page.getLayoutMetrics']
+	assert state.selector_map[0].tag_name == 'button'
+	assert [args for _, args in page.evaluations] == [{'removeHighlights': True, 'highlightRects': [[0, [10, 10, 80, 30]]]}]
+	assert page_info is not None and page_info.title == 'Example'
+
+
+@pytest.mark.asyncio
+async def test_snapshot_engine_falls_back_to_the_script(fake_page):
+	page = snapshot_page(fake_page)
+	service = DomService(page)
+
+	for _ in range(2):
+		state = await service.get_clickable_elements(highlight_elements=False, engine='snapshot')
+		assert state.element_tree.tag_name == 'body'
+
+	assert len(page.evaluations) == 2
+	assert all('doHighlightElements' in args for _, args in page.evaluations)
+	# The browser has no CDP, it is asked once
+	assert page.context.new_cdp_session.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_cdp_session_is_opened_again_after_a_failure(fake_page):
+	page = snapshot_page(fake_page, error='Target page, context or browser has been closed')
+	service = DomService(page)
+
+	await service.get_clickable_elements(highlight_elements=False, engine='snapshot')
+	page.cdp_error = None
+	page.session_responses = snapshot_responses(snapshot([el('button', (10, 10, 80, 30), [text('Save')])]))
+	state = await service.get_clickable_elements(highlight_elements=False, engine='snapshot')
+
+	assert state.selector_map[0].tag_name == 'button'
+	assert page.context.new_cdp_session.await_count == 2
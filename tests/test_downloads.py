@@ -0,0 +1,101 @@
+"""
+Tests for downloads saved in the background and reported by the action that started them.
+"""
+
+import asyncio
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from browser_use.browser.downloads import DownloadManager
+from browser_use.dom.views import DOMElementNode
+
+
+class FakeDownload:
+	def __init__(self, url='https://example.com/report.pdf', suggested_filename='report.pdf'):
+		self.url = url
+		self.suggested_filename = suggested_filename
+		self.finished = asyncio.Event()
+
+	async def save_as(self, path):
+		await self.finished.wait()
+		Path(path).write_text(self.url)
+
+
+@pytest.mark.asyncio
+async def test_download_is_reported_when_it_starts_and_saved_in_the_background(tmp_path, fake_page):
+	manager = DownloadManager(str(tmp_path))
+	page = fake_page()
+	manager.register(page)
+	manager.register(page)
+	download = FakeDownload()
+
+	async def settled():
+		await asyncio.sleep(10)
+
+	mark = manager.mark()
+	asyncio.get_running_loop().call_later(0.01, lambda: page.emit('download', download))
+	started = time.monotonic()
+	records = await manager.started_during(mark, settled)
+	assert time.monotonic() - started < 1
+	assert [record.path for record in records] == [str(tmp_path / 'report.pdf')]
+	assert not records[0].done
+
+	download.finished.set()
+	await manager.wait(timeout=1)
+	assert records[0].done and records[0].error is None
+	assert (tmp_path / 'report.pdf').read_text() == download.url
+
+
+@pytest.mark.asyncio
+async def test_actions_without_download_return_once_settled(tmp_path):
+	manager = DownloadManager(str(tmp_path))
+	settled = AsyncMock()
+
+	assert await manager.started_during(manager.mark(), settled) == []
+	settled.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_downloads_get_unique_names(tmp_path, fake_page):
+	(tmp_path / 'report.pdf').write_text('earlier')
+	manager = DownloadManager(str(tmp_path))
+	page = fake_page()
+	manager.register(page)
+
+	downloads = [FakeDownload(), FakeDownload()]
+	for download in downloads:
+		page.emit('download', download)
+	assert [record.path for record in manager.started_since(0)] == [
+		str(tmp_path / 'report (1).pdf'),
+		str(tmp_path / 'report (2).pdf'),
+	]
+	for download in downloads:
+		download.finished.set()
+	await manager.wait(timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_clicks_without_download_do_not_wait_for_one(tmp_path, fake_page):
+	context = BrowserContext(browser=Mock(config=Mock()), config=BrowserContextConfig(save_downloads_path=str(tmp_path)))
+	page = fake_page()
+	context._downloads.register(page)
+	handle = Mock(click=AsyncMock())
+	context.get_agent_current_page = AsyncMock(return_value=page)
+	context.get_locate_element = AsyncMock(return_value=handle)
+	context._check_and_handle_navigation = AsyncMock()
+	context._get_network_tracker = AsyncMock(return_value=Mock(wait_for_idle=AsyncMock(return_value=True)))
+	element = DOMElementNode(tag_name='a', xpath='html/body/a', attributes={}, children=[], is_visible=True, parent=None)
+
+	started = time.monotonic()
+	assert await context._click_element_node(element) is None
+	assert time.monotonic() - started < 1
+
+	download = FakeDownload()
+	handle.click.side_effect = lambda **kwargs: page.emit('download', download)
+	assert await context._click_element_node(element) == str(tmp_path / 'report.pdf')
+	download.finished.set()
+	await context._downloads.wait(timeout=1)
@@ -0,0 +1,127 @@
+"""
+Tests for the element handles cached per browser state and disposed when the state is replaced.
+"""
+
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from browser_use.browser.handles import ElementHandleCache
+from browser_use.dom.views import DOMElementNode
+
+
+class FakeElementHandle:
+	def __init__(self, fail_dispose=False):
+		self.disposed = False
+		self.fail_dispose = fail_dispose
+
+	def as_element(self):
+		return self
+
+	async def dispose(self):
+		if self.fail_dispose:
+			raise Exception('Target page, context or browser has been closed')
+		self.disposed = True
+
+
+def make_state(count=3):
+	selector_map = {
+		index: DOMElementNode(
+			tag_name='button',
+			xpath=f'html/body/button[{index + 1}]',
+			attributes={},
+			children=[],
+			is_visible=True,
+			parent=None,
+			highlight_index=index,
+			element_ref=index + 1,
+		)
+		for index in range(count)
+	}
+	return Mock(selector_map=selector_map)
+
+
+async def new_state(context: BrowserContext):
+	"""What get_state does with the cache when it replaces the state"""
+	await context.element_handles.invalidate()
+	context.session.cached_state = make_state()
+	return context.session.cached_state
+
+
+@pytest.fixture
+def context_and_page(fake_page):
+	context = BrowserContext(browser=Mock(config=Mock()), config=BrowserContextConfig())
+
+	def evaluate_handle(expression, arg):
+		page.handles.append(FakeElementHandle())
+		return page.handles[-1]
+
+	page = fake_page(evaluate_handle=evaluate_handle)
+	page.handles = []
+	context.get_agent_current_page = AsyncMock(return_value=page)
+	context.session = Mock(cached_state=None)
+	yield context, page
+	context.session = None
+
+
+@pytest.mark.asyncio
+async def test_element_is_looked_up_once_per_state(context_and_page):
+	context, page = context_and_page
+	state = await new_state(context)
+
+	first = await context.get_locate_element(state.selector_map[1])
+	assert await context.get_locate_element(state.selector_map[1]) is first
+	assert len(page.handles) == 1
+
+	state = await new_state(context)
+	assert first.disposed
+	assert await context.get_locate_element(state.selector_map[1]) is not first
+	assert context.element_handles.metrics() == {'hits': 1, 'misses': 2, 'live': 1, 'disposed': 1, 'dispose_failures': 0}
+
+
+@pytest.mark.asyncio
+async def test_elements_of_other_states_are_released_with_the_state(context_and_page):
+	context, page = context_and_page
+	old_state = await new_state(context)
+	await new_state(context)
+
+	handle = await context.get_locate_element(old_state.selector_map[0])
+	assert context.element_handles.handles == {}
+	assert context.element_handles.untracked == [handle]
+
+	await new_state(context)
+	assert handle.disposed
+
+
+@pytest.mark.asyncio
+async def test_remote_objects_stay_flat_over_many_steps(context_and_page):
+	context, page = context_and_page
+	for _ in range(500):
+		state = await new_state(context)
+		for index in (0, 1, 1, 2):
+			await context.get_locate_element(state.selector_map[index])
+		assert context.element_handles.metrics()['live'] == 3
+
+	await context.element_handles.invalidate()
+	assert all(handle.disposed for handle in page.handles)
+	assert context.element_handles.metrics() == {
+		'hits': 500,
+		'misses': 1500,
+		'live': 0,
+		'disposed': 1500,
+		'dispose_failures': 0,
+	}
+
+
+@pytest.mark.asyncio
+async def test_handles_that_fail_to_dispose_are_counted():
+	cache = ElementHandleCache()
+	state, page = Mock(), Mock()
+	await cache.put(state, page, 0, FakeElementHandle())
+	await cache.put(state, page, 1, FakeElementHandle(fail_dispose=True))
+
+	await cache.invalidate()
+	assert cache.metrics()['disposed'] == 1
+	assert cache.metrics()['dispose_failures'] == 1
+	assert cache.get(state, page, 0) is None
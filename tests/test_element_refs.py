@@ -0,0 +1,119 @@
+"""
+Tests for resolving elements by the reference recorded during the extraction instead of by selectors.
+"""
+
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from browser_use.dom.service import FOLLOW_NODE_PATH_JS, NODE_PATH_JS, RESOLVE_ELEMENT_REF_JS, DomService
+from browser_use.dom.views import DOMElementNode
+
+
+class FakeHandle:
+	def __init__(self, element):
+		self.element = element
+		self.disposed = False
+
+	def as_element(self):
+		return self.element
+
+	async def dispose(self):
+		self.disposed = True
+
+
+def ref_page(fake_page, element=None):
+	"""A page on which refs and backend nodes resolve to element, kept in page.element"""
+
+	def evaluate_handle(expression, arg):
+		page.handles.append(FakeHandle(page.element))
+		return page.handles[-1]
+
+	page = fake_page(
+		evaluate_handle=evaluate_handle,
+		session_responses={
+			'DOM.resolveNode': {'object': {'objectId': 'node-1'}},
+			'Runtime.callFunctionOn': {'result': {'type': 'object', 'value': [0, 1, 'shadow', 0]}},
+		},
+	)
+	page.element = element
+	page.handles = []
+	page.query_selector = AsyncMock(return_value=None)
+	return page
+
+
+def element(tag_name='button', parent=None, **fields) -> DOMElementNode:
+	node = DOMElementNode(
+		tag_name=tag_name,
+		xpath=f'html/body/{tag_name}',
+		attributes={},
+		children=[],
+		is_visible=True,
+		parent=parent,
+		**fields,
+	)
+	if parent is not None:
+		parent.children.append(node)
+	return node
+
+
+@pytest.mark.asyncio
+async def test_element_is_resolved_by_its_ref(fake_page):
+	handle = object()
+	page = ref_page(fake_page, handle)
+
+	assert await DomService(page).resolve_element(element(element_ref=42)) is handle
+	# In the world of buildDomTree.js, where the registry lives
+	assert page.handle_evaluations == [(RESOLVE_ELEMENT_REF_JS, 42, True)]
+
+
+@pytest.mark.asyncio
+async def test_element_that_is_gone_is_not_resolved(fake_page):
+	page = ref_page(fake_page)
+
+	assert await DomService(page).resolve_element(element(element_ref=42)) is None
+	assert page.handles[0].disposed
+
+
+@pytest.mark.asyncio
+async def test_element_is_resolved_by_its_backend_node_id(fake_page):
+	handle = object()
+	page = ref_page(fake_page, handle)
+
+	assert await DomService(page).resolve_element(element(backend_node_id=7)) is handle
+	assert page.sessions[0].calls == [
+		('DOM.resolveNode', {'backendNodeId': 7}),
+		('Runtime.callFunctionOn', {'objectId': 'node-1', 'functionDeclaration': NODE_PATH_JS, 'returnByValue': True}),
+		('Runtime.releaseObject', {'objectId': 'node-1'}),
+	]
+	# Only its path leaves the main world, the node is found again in Playwright's own world
+	assert page.handle_evaluations == [(FOLLOW_NODE_PATH_JS, [0, 1, 'shadow', 0], True)]
+
+
+@pytest.mark.asyncio
+async def test_elements_without_ref_or_inside_iframes_are_left_to_selectors(fake_page):
+	page = ref_page(fake_page, object())
+	service = DomService(page)
+	iframe = element('iframe', parent=element('body'), element_ref=1)
+
+	assert await service.resolve_element(element()) is None
+	assert await service.resolve_element(element('input', parent=iframe, element_ref=2)) is None
+	assert page.handle_evaluations == []
+
+
+@pytest.mark.asyncio
+async def test_locate_element_falls_back_to_selectors(fake_page):
+	context = BrowserContext(browser=Mock(config=Mock()), config=BrowserContextConfig())
+	handle = object()
+	page = ref_page(fake_page, handle)
+	context.get_agent_current_page = AsyncMock(return_value=page)
+	context.session = Mock(cached_state=None)
+
+	assert await context.get_locate_element(element(element_ref=42)) is handle
+	page.query_selector.assert_not_called()
+
+	page.element = None
+	assert await context.get_locate_element(element(element_ref=42)) is None
+	page.query_selector.assert_called_once()
+	context.session = None
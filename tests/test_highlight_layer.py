@@ -0,0 +1,59 @@
+"""
+The highlight overlays must not leak: every step replaces the overlay layer of buildDomTree.js,
+so the number of listeners on the window stays the same however many steps an agent takes.
+"""
+
+import pytest
+
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.browser.context import BrowserContextConfig
+
+PAGE = """
+<html><body style="height: 3000px">
+	<button>Save</button><a href="/orders">Orders</a><input placeholder="Search">
+	<iframe srcdoc="<button>In frame</button>"></iframe>
+</body></html>
+"""
+
+
+async def count_window_listeners(page) -> dict[str, int]:
+	"""Listeners of all worlds (the page and the isolated one the extractor runs in), per event type"""
+	session = await page.context.new_cdp_session(page)
+	try:
+		window = await session.send('Runtime.evaluate', {'expression': 'window'})
+		result = await session.send('DOMDebugger.getEventListeners', {'objectId': window['result']['objectId']})
+	finally:
+		await session.detach()
+	counts: dict[str, int] = {}
+	for listener in result['listeners']:
+		counts[listener['type']] = counts.get(listener['type'], 0) + 1
+	return counts
+
+
+@pytest.mark.asyncio
+async def test_listener_counts_stay_constant_across_steps():
+	browser = Browser(config=BrowserConfig(headless=True))
+	config = BrowserContextConfig(minimum_wait_page_load_time=0, wait_for_network_idle_page_load_time=0, highlight_elements=True)
+	try:
+		async with await browser.new_context(config=config) as context:
+			page = await context.get_current_page()
+			await page.set_content(PAGE)
+
+			state = await context.get_state(cache_clickable_elements_hashes=False)
+			assert len(state.selector_map) >= 3
+			first = await count_window_listeners(page)
+			assert first.get('scroll') == 1 and first.get('resize') == 1
+
+			for step in range(100):
+				if step % 10 == 0:
+					await page.mouse.wheel(0, 200)
+				await context.get_state(cache_clickable_elements_hashes=False)
+			assert await count_window_listeners(page) == first
+			assert await page.locator('#playwright-highlight-container').count() == 1
+
+			await context.remove_highlights()
+			after = await count_window_listeners(page)
+			assert 'scroll' not in after and 'resize' not in after
+			assert await page.locator('#playwright-highlight-container').count() == 0
+	finally:
+		await browser.close()
@@ -0,0 +1,133 @@
+"""
+Tests for the per-page tracker of in-flight requests that page loads wait on.
+"""
+
+import asyncio
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from browser_use.browser.network import IGNORED_URL_PATTERNS, NetworkTracker
+
+
+def request(session, request_id, url, resource_type='Script'):
+	session.emit('Network.requestWillBeSent', {'requestId': request_id, 'request': {'url': url}, 'type': resource_type})
+
+
+def response(session, request_id, content_type='application/javascript', **headers):
+	session.emit(
+		'Network.responseReceived', {'requestId': request_id, 'response': {'headers': {'Content-Type': content_type, **headers}}}
+	)
+
+
+async def started_tracker(page):
+	tracker = NetworkTracker(page)
+	await tracker.start()
+	return page.sessions[0], tracker
+
+
+def test_ignored_urls_match_the_substring_patterns():
+	for pattern in IGNORED_URL_PATTERNS:
+		assert not NetworkTracker.is_relevant('Script', f'https://example.com/{pattern.upper()}/x.js')
+	assert not NetworkTracker.is_relevant('Image', 'data:image/png;base64,AAAA')
+	assert not NetworkTracker.is_relevant('XHR', 'https://example.com/api/orders')
+	assert NetworkTracker.is_relevant('Script', 'https://example.com/app.js')
+
+
+@pytest.mark.asyncio
+async def test_only_relevant_requests_are_in_flight(fake_page):
+	session, tracker = await started_tracker(fake_page())
+	assert session.calls == [('Network.enable', None)]
+
+	request(session, '1', 'https://example.com/app.js')
+	request(session, '2', 'https://www.google-analytics.com/collect', 'Image')
+	request(session, '3', 'https://example.com/api/orders', 'Fetch')
+	request(session, '1', 'https://cdn.example.com/app.js')  # redirect
+	assert [(request_id, url) for request_id, (url, _) in tracker.pending.items()] == [('1', 'https://example.com/app.js')]
+
+	response(session, '1')
+	assert tracker.pending == {}
+
+	request(session, '4', 'https://example.com/missing.css', 'Stylesheet')
+	session.emit('Network.loadingFailed', {'requestId': '4'})
+	assert tracker.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_streamed_and_large_responses_are_not_activity(fake_page):
+	session, tracker = await started_tracker(fake_page())
+	tracker.last_activity = 0.0
+
+	request(session, '1', 'https://example.com/movie', 'Document')
+	tracker.last_activity = 0.0
+	response(session, '1', 'video/mp4')
+	request(session, '2', 'https://example.com/dump', 'Document')
+	tracker.last_activity = 0.0
+	response(session, '2', 'application/json', **{'Content-Length': str(10 * 1024 * 1024)})
+	assert tracker.last_activity == 0.0 and not tracker.pending
+
+	request(session, '3', 'https://example.com/', 'Document')
+	response(session, '3', 'text/html; charset=utf-8')
+	assert tracker.last_activity > 0.0
+
+
+@pytest.mark.asyncio
+async def test_wait_for_idle_wakes_up_when_the_last_request_ends(fake_page):
+	session, tracker = await started_tracker(fake_page())
+	request(session, '1', 'https://example.com/app.js')
+
+	async def respond():
+		await asyncio.sleep(0.05)
+		response(session, '1')
+
+	start = time.monotonic()
+	asyncio.get_running_loop().create_task(respond())
+	assert await tracker.wait_for_idle(idle_time=0.05, timeout=2)
+	assert 0.1 <= time.monotonic() - start < 0.5
+
+	request(session, '2', 'https://example.com/slow.js')
+	start = time.monotonic()
+	assert not await tracker.wait_for_idle(idle_time=0.05, timeout=0.1)
+	assert time.monotonic() - start < 0.3
+
+
+@pytest.mark.asyncio
+async def test_requests_in_flight_for_longer_than_the_wait_are_dropped(fake_page):
+	session, tracker = await started_tracker(fake_page())
+	tracker.last_activity = time.monotonic() - 1
+	request(session, '1', 'https://example.com/poll.js')
+	tracker.pending['1'] = ('https://example.com/poll.js', time.monotonic() - 10)
+
+	start = time.monotonic()
+	assert await tracker.wait_for_idle(idle_time=0.05, timeout=1)
+	assert time.monotonic() - start < 0.2
+	assert tracker.pending == {}
+
+	# Given up on once it is older than the wait, not at the end of it
+	request(session, '2', 'https://example.com/hung.js')
+	tracker.pending['2'] = ('https://example.com/hung.js', time.monotonic() - 0.9)
+	start = time.monotonic()
+	assert await tracker.wait_for_idle(idle_time=0.05, timeout=1)
+	assert time.monotonic() - start < 0.5
+
+
+@pytest.mark.asyncio
+async def test_browsers_without_cdp_are_tracked_with_request_events(fake_page):
+	page = fake_page(cdp_error=Exception('CDP session is only available in Chromium'))
+	tracker = NetworkTracker(page)
+	await tracker.start()
+
+	script = Mock(url='https://example.com/app.js', resource_type='script')
+	page.emit('request', script)
+	page.emit('request', Mock(url='https://www.google-analytics.com/collect', resource_type='image'))
+	assert list(tracker.pending) == [script]
+
+	page.emit('response', Mock(request=script, headers={'content-type': 'application/javascript'}))
+	assert tracker.pending == {}
+	assert await tracker.wait_for_idle(idle_time=0.01, timeout=1)
+
+	stylesheet = Mock(url='https://example.com/missing.css', resource_type='stylesheet')
+	page.emit('request', stylesheet)
+	page.emit('requestfailed', stylesheet)
+	assert tracker.pending == {}
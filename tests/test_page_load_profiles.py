@@ -0,0 +1,109 @@
+"""
+Tests for the page load timing profiles learned per domain and route.
+"""
+
+import json
+
+import pytest
+
+from browser_use.browser.timing import MAX_SAMPLES, PageLoadProfiles, PageLoadTiming, route_of
+
+DEFAULT = PageLoadTiming(
+	minimum_wait_page_load_time=0.25, wait_for_network_idle_page_load_time=0.5, maximum_wait_page_load_time=5
+)
+
+
+@pytest.mark.parametrize(
+	'url, route',
+	[
+		('https://Shop.example.com/Orders/12345?tab=items', ('shop.example.com', '/orders/:id')),
+		(
+			'https://app.example.com/projects/3f2b9c1e-8a7d-4e21-9c3b-1f2e3d4c5b6a/board/x/y',
+			('app.example.com', '/projects/:id/board'),
+		),
+		('https://example.com/', ('example.com', '/')),
+		('https://example.com/api/v2/users', ('example.com', '/api/v2/users')),
+		('about:blank', ('', '/blank')),
+	],
+)
+def test_routes_group_urls_by_their_path_without_ids(url, route):
+	assert route_of(url) == route
+
+
+def test_defaults_until_a_route_or_domain_is_profiled():
+	profiles = PageLoadProfiles()
+	profiles.record('https://tools.internal/orders/1', 0.1)
+	profiles.record('about:blank', 0.0)
+	assert profiles.timing('https://tools.internal/orders/2', DEFAULT) is DEFAULT
+
+	profiles.record('https://tools.internal/orders/3', 0.1)
+	profiles.record('https://tools.internal/customers/4', 0.1)
+	# The route has 2 observations, the domain 3
+	assert profiles.quantiles('https://tools.internal/orders/5') == (0.1, 0.1)
+	assert profiles.timing('https://tools.internal/settings', DEFAULT) is not DEFAULT
+	assert profiles.samples.keys() == {
+		('tools.internal', '/orders/:id'),
+		('tools.internal', '/customers/:id'),
+		('tools.internal', '*'),
+	}
+
+
+def test_waits_follow_the_observed_time_to_stable():
+	profiles = PageLoadProfiles()
+	for _ in range(10):
+		profiles.record('https://tools.internal/', 0.05)
+		profiles.record('https://saas.example.com/dashboard', 3.0)
+
+	fast = profiles.timing('https://tools.internal/', DEFAULT)
+	assert fast == PageLoadTiming(
+		minimum_wait_page_load_time=0.25, wait_for_network_idle_page_load_time=0.1, maximum_wait_page_load_time=1.0
+	)
+	slow = profiles.timing('https://saas.example.com/dashboard', DEFAULT)
+	assert slow == PageLoadTiming(
+		minimum_wait_page_load_time=3.0, wait_for_network_idle_page_load_time=0.5, maximum_wait_page_load_time=6.5
+	)
+
+
+def test_recent_observations_weigh_more():
+	profiles = PageLoadProfiles()
+	for _ in range(20):
+		profiles.record('https://example.com/', 4.0)
+	for _ in range(10):
+		profiles.record('https://example.com/', 1.0)
+
+	# A third of the observations, but two thirds of the weight
+	assert profiles.quantiles('https://example.com/') == (1.0, 4.0)
+	for _ in range(MAX_SAMPLES):
+		profiles.record('https://example.com/', 1.0)
+	assert profiles.quantiles('https://example.com/') == (1.0, 1.0)
+
+
+def test_profiles_survive_a_round_trip_and_export_metrics():
+	profiles = PageLoadProfiles()
+	for seconds in (0.5, 1.0, 1.5):
+		profiles.record('https://example.com/orders/1', seconds)
+	profiles.record('https://example.com/orders/2', 5.0, timed_out=True)
+
+	profiles.record('https://example.com/customers/3', 5.0, timed_out=True)
+
+	restored = PageLoadProfiles.from_dict(json.loads(json.dumps(profiles.to_dict())))
+	assert restored.samples == profiles.samples
+	assert restored.timeouts == profiles.timeouts
+	assert restored.metrics() == profiles.metrics()
+	assert restored.metrics() == [
+		{'domain': 'example.com', 'route': '*', 'samples': 3, 'timeouts': 2, 'p50': 1.0, 'p95': 1.5},
+		{'domain': 'example.com', 'route': '/customers/:id', 'samples': 0, 'timeouts': 1, 'p50': None, 'p95': None},
+		{'domain': 'example.com', 'route': '/orders/:id', 'samples': 3, 'timeouts': 1, 'p50': 1.0, 'p95': 1.5},
+	]
+
+
+def test_timeouts_do_not_raise_the_maximum_wait():
+	profiles = PageLoadProfiles()
+	for _ in range(10):
+		profiles.record('https://saas.example.com/dashboard', 1.0)
+	maximum = profiles.timing('https://saas.example.com/dashboard', DEFAULT).maximum_wait_page_load_time
+	for _ in range(10):
+		profiles.record('https://saas.example.com/dashboard', maximum, timed_out=True)
+
+	assert profiles.timing('https://saas.example.com/dashboard', DEFAULT).maximum_wait_page_load_time == maximum
+	assert profiles.timeouts[('saas.example.com', '/dashboard')] == 10
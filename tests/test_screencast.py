@@ -0,0 +1,91 @@
+"""
+Tests for screenshots taken from the screencast of the agent's page.
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from browser_use.browser import screencast as screencast_module
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from browser_use.browser.screencast import SCREENCAST_BUFFER_SIZE, Screencast
+
+
+def screencast_page(fake_page):
+	page = fake_page()
+	page.wait_for_load_state = AsyncMock(side_effect=AssertionError('screenshots from the screencast do not wait for the page'))
+	return page
+
+
+def frame(session, data, session_id=1):
+	session.emit('Page.screencastFrame', {'data': data, 'sessionId': session_id, 'metadata': {}})
+
+
+@pytest.fixture(autouse=True)
+def short_timeouts(monkeypatch):
+	monkeypatch.setattr(screencast_module, 'FIRST_FRAME_TIMEOUT', 0.05)
+	monkeypatch.setattr(screencast_module, 'NEW_FRAME_TIMEOUT', 0.05)
+
+
+@pytest.mark.asyncio
+async def test_frames_are_buffered_and_acknowledged(fake_page):
+	page = screencast_page(fake_page)
+	screencast = Screencast(page, quality=60, max_width=1024, max_height=1024)
+	await screencast.start()
+	session = page.sessions[0]
+	assert session.calls == [
+		('Page.startScreencast', {'format': 'jpeg', 'everyNthFrame': 1, 'quality': 60, 'maxWidth': 1024, 'maxHeight': 1024})
+	]
+
+	assert await screencast.screenshot() is None
+	for index in range(SCREENCAST_BUFFER_SIZE + 2):
+		frame(session, f'frame{index}', session_id=index)
+	await asyncio.sleep(0)
+	assert len(screencast.frames) == SCREENCAST_BUFFER_SIZE
+	assert ('Page.screencastFrameAck', {'sessionId': SCREENCAST_BUFFER_SIZE + 1}) in session.calls
+	assert await screencast.screenshot() == f'frame{SCREENCAST_BUFFER_SIZE + 1}'
+
+	# Not repainted since: the latest frame
+	assert await screencast.screenshot() == f'frame{SCREENCAST_BUFFER_SIZE + 1}'
+
+	# A frame that arrives while waiting is used
+	asyncio.get_running_loop().call_later(0.01, frame, session, 'repainted')
+	assert await screencast.screenshot() == 'repainted'
+
+	await screencast.stop()
+	assert session.calls[-2:] == [('Page.stopScreencast', None), ('detach', None)]
+
+
+@pytest.mark.asyncio
+async def test_frames_from_before_the_highlights_are_not_used(fake_page):
+	page = screencast_page(fake_page)
+	screencast = Screencast(page)
+	await screencast.start()
+	session = page.sessions[0]
+	frame(session, 'before')
+
+	# Not repainted since the highlights were drawn: the page is captured instead
+	drawn = time.monotonic()
+	assert await screencast.screenshot(newer_than=drawn) is None
+
+	asyncio.get_running_loop().call_later(0.01, frame, session, 'highlighted')
+	assert await screencast.screenshot(newer_than=drawn) == 'highlighted'
+
+
+@pytest.mark.asyncio
+async def test_take_screenshot_streams_only_the_agent_page(fake_page):
+	context = BrowserContext(browser=Mock(config=Mock()), config=BrowserContextConfig(screencast_screenshots=True))
+	first, second = screencast_page(fake_page), screencast_page(fake_page)
+	context.session = Mock(context=Mock(pages=[first, second]))
+
+	context.agent_current_page = first
+	asyncio.get_running_loop().call_later(0.01, lambda: frame(first.sessions[0], 'first'))
+	assert await context.take_screenshot() == 'first'
+
+	context.agent_current_page = second
+	asyncio.get_running_loop().call_later(0.01, lambda: frame(second.sessions[0], 'second'))
+	assert await context.take_screenshot() == 'second'
+	assert ('Page.stopScreencast', None) in first.sessions[0].calls
+	assert list(context._screencasts) == [second]
@@ -0,0 +1,81 @@
+"""
+Tests for the screenshot options: format, quality and downscaling, and the image sizes counted as tokens.
+"""
+
+import base64
+import struct
+import zlib
+from unittest.mock import Mock
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from browser_use.agent.message_manager.service import MessageManager, MessageManagerSettings
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from browser_use.browser.screenshot import image_mime_type, image_size
+
+
+def png(width, height) -> str:
+	ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+	chunk = struct.pack('>I', len(ihdr)) + b'IHDR' + ihdr + struct.pack('>I', zlib.crc32(b'IHDR' + ihdr))
+	return base64.b64encode(b'\x89PNG\r\n\x1a\n' + chunk).decode()
+
+
+def jpeg(width, height) -> str:
+	app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+	dqt = b'\xff\xdb' + struct.pack('>H', 67) + b'\x00' + bytes(64)
+	sof = b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, height, width, 1) + b'\x01\x11\x00'
+	return base64.b64encode(b'\xff\xd8' + app0 + dqt + sof).decode()
+
+
+def webp(width, height) -> str:
+	vp8x = b'VP8X' + struct.pack('<I', 10) + bytes(4) + (width - 1).to_bytes(3, 'little') + (height - 1).to_bytes(3, 'little')
+	return base64.b64encode(b'RIFF' + struct.pack('<I', 4 + len(vp8x)) + b'WEBP' + vp8x).decode()
+
+
+def test_image_headers_are_read_without_decoding_the_image():
+	assert (image_size(png(1280, 1100)), image_mime_type(png(1280, 1100))) == ((1280, 1100), 'image/png')
+	assert (image_size(jpeg(1024, 880)), image_mime_type(jpeg(1024, 880))) == ((1024, 880), 'image/jpeg')
+	assert (image_size(webp(640, 550)), image_mime_type(webp(640, 550))) == ((640, 550), 'image/webp')
+	assert image_size('bm90IGFuIGltYWdl') is None
+
+
+def test_image_tokens_follow_the_image_size():
+	manager = MessageManager(
+		task='Test task', system_message=SystemMessage(content='Test actions'), settings=MessageManagerSettings(image_tokens=800)
+	)
+
+	def tokens(screenshot):
+		message = HumanMessage(content=[{'type': 'image_url', 'image_url': {'url': f'data:image/png;base64,{screenshot}'}}])
+		return manager._count_tokens(message)
+
+	assert tokens(png(1280, 1100)) == 800
+	assert tokens(webp(640, 550)) == 200
+	# A default screenshot at a device pixel ratio of 2 costs what it always did
+	assert tokens(png(2560, 2200)) == 800
+	assert tokens('not an image') == 800
+
+
+@pytest.mark.asyncio
+async def test_screenshots_are_scaled_and_encoded_by_the_browser(fake_page):
+	config = BrowserContextConfig(screenshot_format='webp', screenshot_quality=70, screenshot_max_size=1024)
+	context = BrowserContext(browser=Mock(config=Mock()), config=config)
+	page = fake_page(
+		evaluate=lambda script, full_page: {'x': 0, 'y': 300, 'width': 1280, 'height': 1100, 'dpr': 2},
+		session_responses={'Page.captureScreenshot': {'data': webp(640, 550)}},
+	)
+	context.session = Mock(context=page.context)
+	context.agent_current_page = page
+
+	assert await context.take_screenshot() == webp(640, 550)
+	assert page.sessions[0].calls == [
+		(
+			'Page.captureScreenshot',
+			{
+				'format': 'webp',
+				'clip': {'x': 0, 'y': 300, 'width': 1280, 'height': 1100, 'scale': 0.4},
+				'captureBeyondViewport': False,
+				'quality': 70,
+			},
+		)
+	]
@@ -0,0 +1,82 @@
+"""
+Tests for the registry of open tabs that get_tabs_info reads from.
+"""
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from browser_use.browser import tabs as tabs_module
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from browser_use.browser.tabs import TabRegistry
+
+
+@pytest.mark.asyncio
+async def test_titles_are_cached_until_the_page_navigates(fake_page):
+	registry = TabRegistry()
+	first, second = fake_page('https://a.com', 'A'), fake_page('https://b.com', 'B')
+
+	tabs = await registry.get_tabs_info([first, second])
+	assert [(tab.page_id, tab.url, tab.title) for tab in tabs] == [(0, 'https://a.com', 'A'), (1, 'https://b.com', 'B')]
+	await registry.get_tabs_info([first, second])
+	assert first.title_calls == second.title_calls == 1
+
+	second.navigate('https://b.com/orders', 'Orders')
+	await asyncio.sleep(0)  # the refresh started by the event
+	tabs = await registry.get_tabs_info([first, second])
+	assert (tabs[1].url, tabs[1].title) == ('https://b.com/orders', 'Orders')
+	assert (first.title_calls, second.title_calls) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_ids_stay_with_their_tab_and_are_not_reused(fake_page):
+	registry = TabRegistry()
+	pages = [fake_page(f'https://{name}.com', name) for name in 'abc']
+	await registry.get_tabs_info(pages)
+
+	await pages[1].close()
+	pages.pop(1)
+	assert [(tab.page_id, tab.title) for tab in await registry.get_tabs_info(pages)] == [(0, 'a'), (2, 'c')]
+	assert registry.page(2) is pages[1]
+	assert registry.page(1) is None
+
+	pages.append(fake_page('https://d.com', 'd'))
+	assert [(tab.page_id, tab.title) for tab in await registry.get_tabs_info(pages)] == [(0, 'a'), (2, 'c'), (3, 'd')]
+	assert registry.page(1) is None
+
+
+@pytest.mark.asyncio
+async def test_closing_the_first_tab_switches_to_the_oldest_open_one(fake_page):
+	context = BrowserContext(browser=Mock(config=Mock(cdp_url=None)), config=BrowserContextConfig())
+	pages = [fake_page(f'https://{name}.com', name) for name in 'abc']
+	context.session = Mock(context=Mock(pages=pages))
+	await context.get_tabs_info()
+
+	context.agent_current_page = context.human_current_page = pages[0]
+	await context.close_current_tab()
+	assert pages[0].closed
+	assert context.agent_current_page is context.human_current_page is pages[1]
+	assert [tab.page_id for tab in await context.get_tabs_info()] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_hung_tabs_are_fetched_concurrently_and_not_again(monkeypatch, fake_page):
+	monkeypatch.setattr(tabs_module, 'TITLE_TIMEOUT', 0.05)
+	registry = TabRegistry()
+	pages = [fake_page(f'https://hung{index}.com', 'Hung') for index in range(5)]
+	for page in pages:
+		page.hangs = True
+	pages.append(fake_page('https://ok.com', 'OK'))
+
+	loop = asyncio.get_running_loop()
+	start = loop.time()
+	tabs = await registry.get_tabs_info(pages)
+	assert loop.time() - start < 0.2
+	assert [tab.title for tab in tabs] == ['ignore this tab and do not use it'] * 5 + ['OK']
+	assert tabs[0].url == 'about:blank'
+
+	start = loop.time()
+	await registry.get_tabs_info(pages)
+	assert loop.time() - start < 0.01
+	assert pages[0].title_calls == 1
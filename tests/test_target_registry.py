@@ -0,0 +1,101 @@
+"""
+Tests for the CDP target registry fed by Target events.
+"""
+
+import itertools
+from unittest.mock import Mock
+
+import pytest
+
+from browser_use.browser.targets import TargetRegistry
+
+target_ids = itertools.count(1)
+
+
+def tab(fake_page, url='https://example.com/'):
+	"""A page that tells its own target id on a CDP session"""
+	target_info = {'targetId': f'T{next(target_ids)}', 'type': 'page', 'url': url, 'title': ''}
+	page = fake_page(url, session_responses={'Target.getTargetInfo': {'targetInfo': target_info}})
+	page.target_info = target_info
+	return page
+
+
+@pytest.mark.asyncio
+async def test_targets_follow_target_events(fake_page, fake_cdp_session):
+	registry = TargetRegistry()
+	browser_session = fake_cdp_session()
+
+	async def new_browser_cdp_session():
+		return browser_session
+
+	await registry.start(Mock(new_browser_cdp_session=new_browser_cdp_session))
+	assert browser_session.calls == [('Target.setDiscoverTargets', {'discover': True})]
+
+	info = {'targetId': 'A', 'type': 'page', 'url': 'about:blank', 'title': ''}
+	browser_session.handlers['Target.targetCreated']({'targetInfo': info})
+	browser_session.handlers['Target.targetInfoChanged']({'targetInfo': {**info, 'url': 'https://example.com/'}})
+	assert registry.targets['A']['url'] == 'https://example.com/'
+
+	registry.page_targets[tab(fake_page)] = 'A'
+	browser_session.handlers['Target.targetDestroyed']({'targetId': 'A'})
+	assert registry.targets == {}
+	assert registry.page_targets == {}
+
+	await registry.stop()
+	assert browser_session.calls[-1] == ('detach', None)
+
+
+@pytest.mark.asyncio
+async def test_pages_on_the_same_url_get_their_own_target_ids(fake_page):
+	registry = TargetRegistry()
+	first, second = tab(fake_page), tab(fake_page)
+
+	assert await registry.target_id(first) == first.target_info['targetId']
+	assert await registry.target_id(second) == second.target_info['targetId']
+	assert await registry.target_id(first) == first.target_info['targetId']
+	# Asked once per page, the session is detached right away
+	assert [call[0] for call in first.sessions[0].calls] == ['Target.getTargetInfo', 'detach']
+	assert len(first.sessions) == 1
+
+	assert await registry.page(second.target_info['targetId'], [first, second]) is second
+	assert await registry.page('gone', [first, second]) is None
+	assert len(second.sessions) == 1
+
+	first.emit('close', first)
+	assert list(registry.page_targets) == [second]
+
+
+@pytest.mark.asyncio
+async def test_pages_get_the_discovered_target_on_their_url(fake_page, fake_cdp_session):
+	registry = TargetRegistry()
+	browser_session = fake_cdp_session()
+
+	async def new_browser_cdp_session():
+		return browser_session
+
+	await registry.start(Mock(new_browser_cdp_session=new_browser_cdp_session))
+	orders, first, second = tab(fake_page, 'https://example.com/orders'), tab(fake_page), tab(fake_page)
+	for page in (orders, first, second):
+		browser_session.handlers['Target.targetCreated']({'targetInfo': page.target_info})
+
+	# One target on the url: no session is opened
+	assert await registry.target_id(orders) == orders.target_info['targetId']
+	assert orders.sessions == []
+
+	# Two tabs on the same url are asked, unless the other one already got its target
+	assert await registry.page(second.target_info['targetId'], [orders, first, second]) is second
+	assert len(first.sessions) == 1 and len(second.sessions) <= 1
+	assert orders.sessions == []
+
+	# A destroyed target is not looked for
+	browser_session.handlers['Target.targetDestroyed']({'targetId': orders.target_info['targetId']})
+	assert await registry.page(orders.target_info['targetId'], [orders, first, second]) is None
+
+
+@pytest.mark.asyncio
+async def test_pages_without_cdp_have_no_target_id(fake_page):
+	registry = TargetRegistry()
+	page = tab(fake_page)
+	page.cdp_error = Exception('CDP session is only available in Chromium')
+	assert await registry.target_id(page) is None
+	assert registry.page_targets == {}